@@ -0,0 +1,10 @@
+"""Performance benchmarks of pyaro.
+
+Run all benchmarks at a given scale and write the results as json with
+
+    python -m benchmarks run --scale small --output results.json
+
+and compare two result files, e.g. from different commits, with
+
+    python -m benchmarks compare old.json new.json
+"""
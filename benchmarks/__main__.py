@@ -0,0 +1,104 @@
+import argparse
+import datetime
+import json
+import logging
+import platform
+import subprocess
+import sys
+import warnings
+
+import numpy as np
+
+import pyaro
+
+from .suite import SCALES, list_benchmarks, run_benchmarks
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"], check=True, capture_output=True, text=True
+        )
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+
+def run(args):
+    names = args.benchmarks if args.benchmarks else None
+    results = run_benchmarks(scale=args.scale, names=names, repeat=args.repeat)
+    report = {
+        "metadata": {
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "pyaro": pyaro.__version__,
+            "numpy": np.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+    for result in results:
+        if "skipped" in result:
+            print(f"{result['name']:40s} skipped: {result['skipped']}")
+        else:
+            print(f"{result['name']:40s} {result['seconds']:10.4f}s")
+
+
+def compare(args):
+    with open(args.old) as fh:
+        old = {(r["name"], r["scale"]): r for r in json.load(fh)["results"]}
+    with open(args.new) as fh:
+        new = {(r["name"], r["scale"]): r for r in json.load(fh)["results"]}
+    failed = False
+    for key, result in new.items():
+        if key not in old or "seconds" not in result or "seconds" not in old[key]:
+            continue
+        ratio = result["seconds"] / old[key]["seconds"]
+        mark = ""
+        if ratio > args.threshold:
+            mark = "  REGRESSION"
+            failed = True
+        print(
+            f"{key[0]:40s} {old[key]['seconds']:10.4f}s -> {result['seconds']:10.4f}s ({ratio:5.2f}x){mark}"
+        )
+    return 1 if failed else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    sub = parser.add_subparsers(dest="command", required=True)
+    prun = sub.add_parser("run", help="run benchmarks")
+    prun.add_argument("--scale", choices=list(SCALES), default="small")
+    prun.add_argument("--repeat", type=int, default=3)
+    prun.add_argument("--output", help="json file to write the results to")
+    prun.add_argument(
+        "benchmarks", nargs="*", help="benchmarks to run, defaults to all"
+    )
+    plist = sub.add_parser("list", help="list benchmarks")
+    pcompare = sub.add_parser("compare", help="compare two json result files")
+    pcompare.add_argument("old")
+    pcompare.add_argument("new")
+    pcompare.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="ratio new/old to report as regression, default 1.2",
+    )
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    elif args.command == "list":
+        print("\n".join(list_benchmarks()))
+    elif args.command == "compare":
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    # e.g. all-NaN topography around coastal synthetic stations
+    warnings.simplefilter("ignore", RuntimeWarning)
+    main()
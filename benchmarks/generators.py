@@ -0,0 +1,93 @@
+"""Synthetic data generators for the benchmarks."""
+
+import csv
+
+import numpy as np
+
+from pyaro.timeseries import Flag, NpStructuredData, StationTable
+
+# region covered by the test topography files in tests/testdata/datadir_elevation
+LAT_RANGE = (57.1, 60.9)
+LON_RANGE = (-1.9, 9.9)
+COUNTRIES = np.array(["NO", "SE", "DK", "FI", "GB", "DE"])
+START_TIME = np.datetime64("2020-01-01 00:00:00")
+
+
+def synthetic_stations(stations: int, seed: int = 1) -> StationTable:
+    """Random stations within LAT_RANGE and LON_RANGE.
+
+    :param stations: number of stations
+    :param seed: random seed
+    :return: a StationTable
+    """
+    rng = np.random.default_rng(seed)
+    return StationTable.from_columns(
+        [f"station{i}" for i in range(stations)],
+        rng.uniform(*LAT_RANGE, stations),
+        rng.uniform(*LON_RANGE, stations),
+        rng.uniform(0, 1500, stations),
+        country=COUNTRIES[rng.integers(0, len(COUNTRIES), stations)],
+    )
+
+
+def synthetic_data(
+    rows: int, stations: StationTable, variable: str = "NOx", seed: int = 1
+) -> NpStructuredData:
+    """Hourly observations distributed round-robin over the stations, like a
+    synchronized hourly network.
+
+    :param rows: number of data rows
+    :param stations: stations of the data
+    :param variable: variable name
+    :param seed: random seed
+    :return: NpStructuredData with rows data-points
+    """
+    rng = np.random.default_rng(seed)
+    station_idx = np.arange(rows) % len(stations)
+    hours = np.arange(rows) // len(stations)
+    start_times = START_TIME + hours.astype("timedelta64[h]")
+    data = np.empty(rows, dtype=NpStructuredData._dtype)
+    data["values"] = rng.normal(10, 3, rows)
+    data["stations"] = stations.names[station_idx]
+    data["latitudes"] = stations.latitudes[station_idx]
+    data["longitudes"] = stations.longitudes[station_idx]
+    data["altitudes"] = stations.altitudes[station_idx]
+    data["start_times"] = start_times
+    data["end_times"] = start_times + np.timedelta64(1, "h")
+    data["flags"] = rng.choice(
+        [Flag.VALID, Flag.INVALID, Flag.BELOW_THRESHOLD], rows, p=[0.9, 0.05, 0.05]
+    )
+    data["standard_deviations"] = np.nan
+    npdata = NpStructuredData()
+    npdata.set_data(variable, "ug/m3", data)
+    return npdata
+
+
+def write_synthetic_csv(path, data: NpStructuredData) -> None:
+    """Write data in the default column-layout of the csv_timeseries reader.
+
+    :param path: output file
+    :param data: data to write
+    """
+    with open(path, "w", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        for value, station, lat, lon, start, end in zip(
+            data.values.tolist(),
+            data.stations.tolist(),
+            data.latitudes.tolist(),
+            data.longitudes.tolist(),
+            data.start_times.astype(str).tolist(),
+            data.end_times.astype(str).tolist(),
+        ):
+            writer.writerow(
+                (
+                    data.variable,
+                    station,
+                    lon,
+                    lat,
+                    value,
+                    data.units,
+                    start.replace("T", " "),
+                    end.replace("T", " "),
+                )
+            )
@@ -0,0 +1,451 @@
+"""Benchmark definitions and runner."""
+
+import bz2
+import gzip
+import logging
+import lzma
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+import pyaro
+from pyaro.timeseries import Data, MultiReader, NpStructuredData, Station, filters
+from pyaro.timeseries.AutoFilterReaderEngine import AutoFilterReader
+from pyaro.timeseries.FilterCache import FilterCache
+from pyaro.timeseries.FilterPlanner import FilterPlanner
+
+from .generators import synthetic_data, synthetic_stations, write_synthetic_csv
+
+logger = logging.getLogger(__name__)
+
+TESTDATA = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "..", "tests", "testdata"
+)
+
+# rows and stations of the synthetic datasets, csv_rows limits the size of written csv-files
+SCALES = {
+    "small": dict(rows=10_000, stations=100, csv_rows=10_000),
+    "medium": dict(rows=1_000_000, stations=1_000, csv_rows=100_000),
+    "large": dict(rows=10_000_000, stations=10_000, csv_rows=1_000_000),
+    "huge": dict(rows=100_000_000, stations=100_000, csv_rows=10_000_000),
+}
+
+# kwargs for benchmarking registered filters, unlisted filters use their defaults
+FILTER_KWARGS = {
+    "variables": {"reader_to_new": {"NOx": "nitrogen_oxides"}},
+    "stations": {"exclude": [f"station{i}" for i in range(0, 100, 3)]},
+    "countries": {"include": ["NO", "SE"]},
+    "bounding_boxes": {"include": [(60, 8, 58, 0)]},
+    "within_radius": {"points": [(59.91, 10.75), (58.97, 5.73)], "radius": 100_000},
+    "colocated_stations": {"distance": 5_000, "altitude": 1_500},
+    "duplicates": {},
+    "time_bounds": {
+        "startend_include": [("2020-01-01 00:00:00", "2020-06-01 00:00:00")]
+    },
+    "time_resolution": {"resolutions": ["1 hour"]},
+    "flags": {"exclude": [pyaro.timeseries.Flag.INVALID]},
+    "time_variable_station": {
+        "exclude": [
+            ("2020-01-02 00:00:00", "2020-01-05 00:00:00", "NOx", f"station{i}")
+            for i in range(10)
+        ]
+    },
+    "altitude": {"min_altitude": 200, "max_altitude": 1000},
+    "relaltitude": {
+        "topo_file": os.path.join(TESTDATA, "datadir_elevation", "topography.nc"),
+        "rdiff": 300,
+    },
+    "valleyfloor_relaltitude": {
+        "topo": os.path.join(TESTDATA, "datadir_elevation", "gtopo30_subset.nc"),
+        "lower": 100,
+        "upper": 1000,
+    },
+}
+
+# the filter chain used for the AutoFilterReader.data benchmark
+CHAIN = ["countries", "flags", "time_bounds", "altitude", "duplicates"]
+# a chain with expensive filters first, for the planner benchmark
+UNORDERED_CHAIN = ["duplicates", "time_bounds", "countries", "altitude"]
+
+
+class BenchmarkSkipped(Exception):
+    pass
+
+
+class SyntheticReader(AutoFilterReader):
+    """An in-memory AutoFilterReader on synthetic data"""
+
+    def __init__(self, data: dict[str, Data], stations: dict[str, Station], filters=[]):
+        self._data = data
+        self._stations = stations
+        self._set_filters(filters)
+
+    def _unfiltered_data(self, varname) -> Data:
+        return self._data[varname]
+
+    def _unfiltered_stations(self) -> dict[str, Station]:
+        return self._stations
+
+    def _unfiltered_variables(self) -> list[str]:
+        return list(self._data.keys())
+
+    def close(self):
+        pass
+
+
+class Context:
+    """Synthetic data of one scale, generated on first use."""
+
+    def __init__(self, scale: str, workdir: str):
+        self.scale = scale
+        self.workdir = workdir
+        self.rows = SCALES[scale]["rows"]
+        self.stations_count = SCALES[scale]["stations"]
+        self.csv_rows = SCALES[scale]["csv_rows"]
+        self._stations = None
+        self._data = None
+        self._csvfile = None
+
+    @property
+    def stations(self):
+        if self._stations is None:
+            self._stations = synthetic_stations(self.stations_count)
+        return self._stations
+
+    @property
+    def data(self) -> NpStructuredData:
+        if self._data is None:
+            self._data = synthetic_data(self.rows, self.stations)
+        return self._data
+
+    @property
+    def csvfile(self) -> str:
+        if self._csvfile is None:
+            self._csvfile = os.path.join(self.workdir, f"synthetic_{self.scale}.csv")
+            write_synthetic_csv(self._csvfile, self.data.slice(slice(0, self.csv_rows)))
+        return self._csvfile
+
+    def compressed_csvfile(self, compression: str) -> str:
+        """The csvfile compressed with gz, bz2 or xz."""
+        path = f"{self.csvfile}.{compression}"
+        if not os.path.exists(path):
+            module = {"gz": gzip, "bz2": bz2, "xz": lzma}[compression]
+            with open(self.csvfile, "rb") as src, module.open(path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+        return path
+
+
+_benchmarks = {}
+
+
+def benchmark(name: str):
+    """Register a benchmark function taking a Context. The function returns a
+    callable which is timed, and optionally the number of rows it processes."""
+
+    def register(func):
+        _benchmarks[name] = func
+        return func
+
+    return register
+
+
+@benchmark("csv_ingest")
+def csv_ingest(ctx: Context):
+    path = ctx.csvfile
+
+    def run():
+        with pyaro.open_timeseries("csv_timeseries", path, filters=[]) as ts:
+            ts.data("NOx")
+
+    return run, ctx.csv_rows
+
+
+def _csv_ingest_compressed(compression: str):
+    def setup(ctx: Context):
+        path = ctx.compressed_csvfile(compression)
+
+        def run():
+            with pyaro.open_timeseries("csv_timeseries", path, filters=[]) as ts:
+                ts.data("NOx")
+
+        return run, ctx.csv_rows
+
+    return setup
+
+
+for _compression in ("gz", "bz2", "xz"):
+    benchmark(f"csv_ingest_{_compression}")(_csv_ingest_compressed(_compression))
+
+
+@benchmark("npy_ingest")
+def npy_ingest(ctx: Context):
+    from pyaro.npyreader import write_timeseries
+
+    path = os.path.join(ctx.workdir, f"store_{ctx.scale}")
+    if not os.path.exists(path):
+        write_timeseries(SyntheticReader({"NOx": ctx.data}, ctx.stations), path)
+
+    def run():
+        with pyaro.open_timeseries("npy_timeseries", path, filters=[]) as ts:
+            ts.data("NOx").values.sum()
+
+    return run, ctx.rows
+
+
+@benchmark("data_append")
+def data_append(ctx: Context):
+    data = ctx.data
+    chunks = 10
+    chunk = len(data) // chunks
+    columns = dict(
+        value=data.values[:chunk],
+        station=data.stations[:chunk],
+        latitude=data.latitudes[:chunk],
+        longitude=data.longitudes[:chunk],
+        altitude=data.altitudes[:chunk],
+        start_time=data.start_times[:chunk],
+        end_time=data.end_times[:chunk],
+        flag=data.flags[:chunk],
+        standard_deviation=data.standard_deviations[:chunk],
+    )
+
+    def run():
+        new = NpStructuredData(data.variable, data.units)
+        for _ in range(chunks):
+            new.append(**columns)
+
+    return run, chunk * chunks
+
+
+@benchmark("data_aggregate_daily")
+def data_aggregate_daily(ctx: Context):
+    data = ctx.data
+
+    def run():
+        data.aggregate("daily", min_coverage=0.75)
+
+    return run, len(data)
+
+
+@benchmark("data_for_station")
+def data_for_station(ctx: Context):
+    data = ctx.data
+    stations = list(ctx.stations)
+
+    def run():
+        # a fresh copy, so the station-index is built in each run
+        new = data.slice(slice(None))
+        for station in stations:
+            new.for_station(station).values.mean()
+
+    return run, len(data)
+
+
+@benchmark("data_sort")
+def data_sort(ctx: Context):
+    data = ctx.data
+
+    def run():
+        data.slice(slice(None)).sorted()
+
+    return run, len(data)
+
+
+@benchmark("filter_duplicates_sorted")
+def filter_duplicates_sorted(ctx: Context):
+    data = ctx.data.sorted()
+    stations = ctx.stations
+    duplicates = filters.get("duplicates")
+
+    def run():
+        duplicates.filter_data(data, stations, [data.variable])
+
+    return run, len(data)
+
+
+@benchmark("data_slice_mask")
+def data_slice_mask(ctx: Context):
+    data = ctx.data
+    mask = data.values > 10
+
+    def run():
+        data.slice(mask)
+
+    return run, len(data)
+
+
+@benchmark("data_slice_index")
+def data_slice_index(ctx: Context):
+    data = ctx.data
+    index = np.flatnonzero(data.values > 10)
+
+    def run():
+        data.slice(index)
+
+    return run, len(data)
+
+
+def _filter_benchmark(name: str):
+    def setup(ctx: Context):
+        try:
+            filt = filters.get(name, **FILTER_KWARGS.get(name, {}))
+        except ModuleNotFoundError as ex:
+            raise BenchmarkSkipped(str(ex))
+        data = ctx.data
+        stations = ctx.stations
+        variables = [data.variable]
+        try:
+            filt.filter_stations(stations)
+        except ModuleNotFoundError as ex:
+            raise BenchmarkSkipped(str(ex))
+
+        def run():
+            filt.filter_stations(stations)
+            filt.filter_data(data, stations, variables)
+
+        return run, len(data)
+
+    return setup
+
+
+def register_filter_benchmarks():
+    """Register one benchmark for every filter in the FilterFactory"""
+    for name in filters.list():
+        if f"filter_{name}" not in _benchmarks:
+            benchmark(f"filter_{name}")(_filter_benchmark(name))
+
+
+@benchmark("reader_data_chain")
+def reader_data_chain(ctx: Context):
+    chain = {name: FILTER_KWARGS[name] for name in CHAIN}
+    reader = SyntheticReader({"NOx": ctx.data}, ctx.stations, filters=chain)
+
+    def run():
+        reader.data("NOx")
+
+    return run, len(ctx.data)
+
+
+@benchmark("reader_data_chain_planned")
+def reader_data_chain_planned(ctx: Context):
+    chain = {name: FILTER_KWARGS[name] for name in UNORDERED_CHAIN}
+    reader = SyntheticReader({"NOx": ctx.data}, ctx.stations, filters=chain)
+    reader.set_filter_planner(FilterPlanner(min_rows=0))
+
+    def run():
+        reader.data("NOx")
+
+    return run, len(ctx.data)
+
+
+@benchmark("reader_data_chain_unplanned")
+def reader_data_chain_unplanned(ctx: Context):
+    chain = {name: FILTER_KWARGS[name] for name in UNORDERED_CHAIN}
+    reader = SyntheticReader({"NOx": ctx.data}, ctx.stations, filters=chain)
+
+    def run():
+        reader.data("NOx")
+
+    return run, len(ctx.data)
+
+
+@benchmark("reader_data_chain_cached")
+def reader_data_chain_cached(ctx: Context):
+    chain = {name: FILTER_KWARGS[name] for name in CHAIN}
+    reader = SyntheticReader({"NOx": ctx.data}, ctx.stations, filters=chain)
+    reader.set_filter_cache(FilterCache())
+    # fill the cache, the benchmark measures the repeated calls
+    reader.data("NOx")
+
+    def run():
+        reader.data("NOx")
+
+    return run, len(ctx.data)
+
+
+@benchmark("reader_data_many")
+def reader_data_many(ctx: Context):
+    chain = {name: FILTER_KWARGS[name] for name in CHAIN}
+    data = {f"var{i}": ctx.data for i in range(5)}
+    reader = SyntheticReader(data, ctx.stations, filters=chain)
+
+    def run():
+        reader.data_many(reader.variables())
+
+    return run, 5 * len(ctx.data)
+
+
+@benchmark("reader_multi")
+def reader_multi(ctx: Context):
+    parts = np.array_split(np.arange(len(ctx.data)), 4)
+    readers = [
+        SyntheticReader({"var": ctx.data.slice(part)}, ctx.stations) for part in parts
+    ]
+
+    def run():
+        MultiReader(readers).data("var")
+
+    return run, len(ctx.data)
+
+
+@benchmark("export_pandas")
+def export_pandas(ctx: Context):
+    try:
+        import pandas
+    except ImportError as ex:
+        raise BenchmarkSkipped(str(ex))
+    data = ctx.data
+
+    def run():
+        pyaro.timeseries_data_to_pd(data)
+
+    return run, len(data)
+
+
+def list_benchmarks() -> list[str]:
+    register_filter_benchmarks()
+    return list(_benchmarks)
+
+
+def run_benchmarks(
+    scale: str = "small", names: list[str] | None = None, repeat: int = 3
+) -> list[dict]:
+    """Run benchmarks and return their results
+
+    :param scale: one of SCALES
+    :param names: benchmarks to run, defaults to None meaning all
+    :param repeat: repetitions of each benchmark, the minimum time is reported
+    :return: list of results, one dict per benchmark
+    """
+    if names is None:
+        names = list_benchmarks()
+    else:
+        register_filter_benchmarks()
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        ctx = Context(scale, workdir)
+        for name in names:
+            result = dict(
+                name=name, scale=scale, rows=ctx.rows, stations=ctx.stations_count
+            )
+            try:
+                run, rows = _benchmarks[name](ctx)
+                times = []
+                for _ in range(repeat):
+                    start_time = time.perf_counter()
+                    run()
+                    times.append(time.perf_counter() - start_time)
+                result.update(
+                    processed_rows=rows,
+                    seconds=min(times),
+                    times=times,
+                    rows_per_second=rows / min(times) if min(times) > 0 else None,
+                )
+            except BenchmarkSkipped as ex:
+                result.update(skipped=str(ex))
+            logger.info("%s", result)
+            results.append(result)
+    return results
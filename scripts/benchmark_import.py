@@ -0,0 +1,51 @@
+"""Benchmark the start-up time of a fresh python process opening a csv-file with pyaro,
+i.e. `import pyaro; pyaro.open_timeseries("csv_timeseries", ...)`.
+
+Usage: python3 scripts/benchmark_import.py [repetitions]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+TEST_FILE = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)),
+    "..",
+    "tests",
+    "testdata",
+    "datadir",
+    "csvReader_testdata.csv",
+)
+
+CODE = f"""
+import sys
+import pyaro
+with pyaro.open_timeseries("csv_timeseries", {TEST_FILE!r}, filters=[]) as ts:
+    ts.data("SOx")
+print(len(sys.modules))
+"""
+
+
+def run_once() -> tuple[float, int]:
+    start_time = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", CODE], check=True, capture_output=True, text=True
+    )
+    end_time = time.perf_counter()
+    return end_time - start_time, int(out.stdout.strip())
+
+
+if __name__ == "__main__":
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    run_once()  # warm up file-system caches
+    times = []
+    for _ in range(repetitions):
+        duration, modules = run_once()
+        times.append(duration)
+
+    print(f"modules loaded: {modules}")
+    print(
+        f"import and open: median {statistics.median(times):.3f}s, min {min(times):.3f}s ({repetitions} runs)"
+    )
@@ -3,8 +3,8 @@ from importlib import metadata
 __version__ = metadata.version(__package__)
 
 from .plugins import list_timeseries_engines, open_timeseries
-
-try:
-    from .pandas_helpers import timeseries_data_to_pd
-except:
-    pass
+from .pandas_helpers import timeseries_data_to_pd
+from .arrow_helpers import (
+    timeseries_data_to_arrow,
+    timeseries_data_to_arrow_record_batch,
+)
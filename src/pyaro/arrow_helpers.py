@@ -0,0 +1,43 @@
+import numpy as np
+from .timeseries.Data import Data
+
+
+def timeseries_data_to_arrow_record_batch(data: Data):
+    """Convert pyaro.Data to a pyarrow RecordBatch
+
+    Numeric and time columns are handed to arrow as contiguous numpy arrays, the stations
+    column is dictionary-encoded. Variable and units are stored in the schema metadata.
+
+    :param data: a pyaro Data object
+    :return: a pyarrow RecordBatch
+    """
+    import pyarrow as pa
+
+    arrays = []
+    for col in data.keys():
+        values = np.ascontiguousarray(getattr(data, col))
+        if col == "stations":
+            names, codes = np.unique(values, return_inverse=True)
+            arrays.append(
+                pa.DictionaryArray.from_arrays(
+                    pa.array(codes.astype(np.int32)), pa.array(names)
+                )
+            )
+        else:
+            arrays.append(pa.array(values))
+    return pa.RecordBatch.from_arrays(
+        arrays,
+        names=list(data.keys()),
+        metadata={"variable": data.variable, "units": data.units},
+    )
+
+
+def timeseries_data_to_arrow(data: Data):
+    """Convert pyaro.Data to a pyarrow Table, see timeseries_data_to_arrow_record_batch
+
+    :param data: a pyaro Data object
+    :return: a pyarrow Table
+    """
+    import pyarrow as pa
+
+    return pa.Table.from_batches([timeseries_data_to_arrow_record_batch(data)])
@@ -1,21 +1,76 @@
 import csv
+import datetime
 import glob
+import itertools
 import logging
+from operator import itemgetter
 import os
 
 import numpy as np
 
 import pyaro.timeseries.AutoFilterReaderEngine
-from pyaro.timeseries import Data, Flag, NpStructuredData, Station
+from pyaro.timeseries import Data, Flag, NpStructuredData, Station, StationTable
+
+from .Compression import COMPRESSION_SUFFIXES, open_text
+from .CountryLookup import CountryLookup
 
 logger = logging.getLogger(__name__)
 
+# number of csv-rows converted at once
+_CHUNK_ROWS = 1 << 16
+
+
+class _TimeParser:
+    """Convert time-strings to datetime64[s], memoizing the repetitive timestamps.
+
+    :param time_format: None for ISO 8601 as understood by numpy.datetime64,
+        "epoch" for seconds since 1970-01-01 UTC, or a datetime.strptime format
+    """
+
+    _max_memo = 1_000_000
+    _iso_formats = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
+
+    def __init__(self, time_format: str | None = None):
+        self._format = time_format
+        self._memo: dict[str, int] = {}
 
-def _lookup_function():
-    from geocoder_reverse_natural_earth import Geocoder_Reverse_NE
+    def _convert(self, strings: list[str]) -> np.ndarray:
+        """convert unique strings to seconds since epoch"""
+        if self._format is None:
+            return np.array(strings, dtype="datetime64[s]").astype(np.int64)
+        if self._format in self._iso_formats and all(len(x) == 19 for x in strings):
+            # numpy parses these formats directly, but is more lenient than strptime
+            times = np.array(strings, dtype="datetime64[s]")
+            sep = self._format[8]
+            if all(x[10] == sep for x in strings):
+                return times.astype(np.int64)
+        seconds = []
+        for x in strings:
+            dt = datetime.datetime.strptime(x, self._format)
+            if dt.tzinfo is not None:
+                dt = dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+            seconds.append(np.datetime64(dt, "s").astype(np.int64))
+        return np.array(seconds, dtype=np.int64)
 
-    geo = Geocoder_Reverse_NE()
-    return lambda lat, lon: geo.lookup_nearest(lat, lon)["ISO_A2_EH"]
+    def parse(self, strings: list[str]) -> np.ndarray:
+        """Parse a column of time-strings.
+
+        :param strings: list of time-strings
+        :return: 1dim datetime64[s] array
+        """
+        if self._format == "epoch":
+            seconds = np.array(strings, dtype=np.float64)
+            return np.round(seconds).astype(np.int64).astype("datetime64[s]")
+        memo = self._memo
+        new = [x for x in dict.fromkeys(strings) if x not in memo]
+        if new:
+            if len(memo) + len(new) > self._max_memo:
+                memo.clear()
+            memo.update(zip(new, self._convert(new).tolist()))
+        seconds = np.fromiter(
+            (memo[x] for x in strings), dtype=np.int64, count=len(strings)
+        )
+        return seconds.astype("datetime64[s]")
 
 
 class CSVTimeseriesReader(pyaro.timeseries.AutoFilterReaderEngine.AutoFilterReader):
@@ -56,6 +111,9 @@ class CSVTimeseriesReader(pyaro.timeseries.AutoFilterReaderEngine.AutoFilterRead
         csvreader_kwargs={"delimiter": ","},
         skip_header_rows: int = 0,
         filters=[],
+        country_lookup_cache: str | None = None,
+        time_format: str | None = None,
+        sort_data: bool = False,
     ):
         """open a new csv timeseries-reader
 
@@ -64,7 +122,10 @@ class CSVTimeseriesReader(pyaro.timeseries.AutoFilterReaderEngine.AutoFilterRead
             add all csv-files under `/data/csvdir/`, recursively.
             All multi-files need to have the same csv-format.
             If filename_or_obj_or_url is a directory, all *.csv file in this directory will be read,
-            i.e. it is mapped to glob:/directory/*.csv
+            i.e. it is mapped to glob:/directory/*.csv, including compressed *.csv.gz, *.csv.bz2,
+            *.csv.xz and *.csv.zst files.
+            Compressed files are detected by their suffix or content, and decompressed while
+            reading. zstd requires the zstandard package on python < 3.14.
         :param columns: mapping of column in the csv-file to key, see col_keys().
             Column-numbering starts with 0.
             If column is a string rather than a integer, it is a constant value and not
@@ -73,12 +134,29 @@ class CSVTimeseriesReader(pyaro.timeseries.AutoFilterReaderEngine.AutoFilterRead
         :variable_units: dict translating variable-names to units, e.g. overwrite units given in columns
             IMPORTANT: Overriding these units does *not* perform unit conversion.
         :country_lookup: use pyaro_readers.geocoder_reverse_natural_earth to lookup country-codes from lat/lon
+            of each station
         :csvreader_kwargs: kwargs send directly to csv.reader module
+        :skip_header_rows: number of rows to skip at the beginning of each file
         :filters: default auto-filter filters
+        :country_lookup_cache: json-file caching the looked up country-codes between runs,
+            see CountryLookup
+        :time_format: format of start_time and end_time, defaults to None meaning ISO 8601,
+            e.g. 1997-01-01 00:00:00. "epoch" for seconds since 1970-01-01 UTC, or any
+            datetime.strptime format, e.g. %d.%m.%Y %H:%M
+        :sort_data: sort the data of each variable by station and start_time after reading,
+            see Data.sorted, defaults to False
         """
         if os.path.isdir(filename):
-            filename = "glob:" + filename + "/*.csv"
-        if filename.startswith("glob:"):
+            directory = filename
+            filename = "glob:" + directory + "/*.csv"
+            self._file_iterator = itertools.chain(
+                glob.iglob(filename[5:]),
+                *[
+                    glob.iglob(f"{directory}/*.csv{suffix}")
+                    for suffix in COMPRESSION_SUFFIXES
+                ],
+            )
+        elif filename.startswith("glob:"):
             self._file_iterator = glob.iglob(filename[5:], recursive=True)
         else:
             self._file_iterator = [filename]
@@ -88,94 +166,134 @@ class CSVTimeseriesReader(pyaro.timeseries.AutoFilterReaderEngine.AutoFilterRead
         self._set_filters(filters)
         self._extra_metadata = tuple(set(columns.keys()) - set(self.col_keys()))
         self._skip_header_rows = skip_header_rows
-        if country_lookup:
-            lookupISO2 = _lookup_function()
-        else:
-            lookupISO2 = None
+        self._time_parser = _TimeParser(time_format)
         for path in self._file_iterator:
             logger.debug("%s: %s", filename, path)
-            self._read_single_file(
-                path, columns, variable_units, lookupISO2, csvreader_kwargs
-            )
+            self._read_single_file(path, columns, variable_units, csvreader_kwargs)
+        # the memo of parsed times is only needed while reading
+        self._time_parser = None
+        if country_lookup:
+            self._lookup_countries(CountryLookup(country_lookup_cache))
+        if sort_data:
+            for variable, data in self._data.items():
+                self._data[variable] = data.sorted()
+        self._stations = StationTable(self._stations)
 
-    def _read_single_file(
-        self, filename, columns, variable_units, country_lookup, csvreader_kwargs
-    ):
-        with open(filename, newline="") as csvfile:
+    def _lookup_countries(self, country_lookup: CountryLookup):
+        """set the country of all stations from their coordinates"""
+        stations = list(self._stations.values())
+        countries = country_lookup.lookup(
+            [station.latitude for station in stations],
+            [station.longitude for station in stations],
+        )
+        for station, country in zip(stations, countries.tolist()):
+            fields = {key: station[key] for key in station.keys()}
+            fields["country"] = country
+            station.set_fields(fields)
+
+    def _read_single_file(self, filename, columns, variable_units, csvreader_kwargs):
+        with open_text(filename) as csvfile:
             crd = csv.reader(csvfile, **csvreader_kwargs)
             for _ in range(self._skip_header_rows):
                 _header = next(crd)
-            for row in crd:
-                r = {}
-                extra_metadata = {}
-                for t in self.col_keys():
-                    if isinstance(columns[t], str):
-                        r[t] = columns[t]
-                    else:
-                        r[t] = row[columns[t]]
-                for t in self._extra_metadata:
-                    if isinstance(columns[t], str):
-                        extra_metadata[t] = columns[t]
-                    else:
-                        extra_metadata[t] = row[columns[t]]
-
-                for t in (
-                    "value",
-                    "latitude",
-                    "longitude",
-                    "altitude",
-                    "standard_deviation",
-                ):
-                    r[t] = float(r[t])
-                for t in ("start_time", "end_time"):
-                    r[t] = np.datetime64(r[t])
-
-                if r["variable"] in variable_units:
-                    r["units"] = variable_units[r["variable"]]
-                if country_lookup is not None:
-                    r["country"] = country_lookup(r["latitude"], r["longitude"])
-                if r["variable"] in self._data:
-                    da = self._data[r["variable"]]
-                    if da.units != r["units"]:
-                        raise Exception(
-                            f"unit change from '{da.units}' to '{r['units']}'"
-                        )
-                else:
-                    da = NpStructuredData(r["variable"], r["units"])
-                    self._data[r["variable"]] = da
-                da.append(
-                    *[
-                        r[x]
-                        for x in (
-                            "value",
-                            "station",
-                            "latitude",
-                            "longitude",
-                            "altitude",
-                            "start_time",
-                            "end_time",
-                            "flag",
-                            "standard_deviation",
-                        )
-                    ]
+            while True:
+                rows = list(itertools.islice(crd, _CHUNK_ROWS))
+                if not rows:
+                    break
+                self._add_rows(rows, columns, variable_units)
+
+    def _column(self, rows, column) -> np.ndarray:
+        """a string column of the rows, or a constant column"""
+        if isinstance(column, str):
+            return np.full(len(rows), column)
+        return np.array(list(map(itemgetter(column), rows)))
+
+    def _float_column(self, rows, column) -> np.ndarray:
+        """a float column of the rows, or a constant column"""
+        if isinstance(column, str):
+            return np.full(len(rows), float(column))
+        return np.fromiter(
+            map(float, map(itemgetter(column), rows)), dtype=np.float64, count=len(rows)
+        )
+
+    def _add_rows(self, rows, columns, variable_units):
+        """add a chunk of csv-rows, converting whole columns at once"""
+        r = {}
+        for t in ("variable", "units", "station", "country"):
+            r[t] = self._column(rows, columns[t])
+        for t in (
+            "value",
+            "latitude",
+            "longitude",
+            "altitude",
+            "standard_deviation",
+        ):
+            r[t] = self._float_column(rows, columns[t])
+        if isinstance(columns["flag"], str):
+            r["flag"] = np.full(len(rows), int(columns["flag"]), dtype=np.int16)
+        else:
+            r["flag"] = self._column(rows, columns["flag"]).astype(np.int16)
+        for t in ("start_time", "end_time"):
+            if isinstance(columns[t], str):
+                r[t] = np.repeat(self._time_parser.parse([columns[t]]), len(rows))
+            else:
+                r[t] = self._time_parser.parse(list(map(itemgetter(columns[t]), rows)))
+
+        _, first_rows = np.unique(r["station"], return_index=True)
+        # stations in order of appearance
+        for i in np.sort(first_rows).tolist():
+            station = str(r["station"][i])
+            if len(station) > 64:
+                raise Exception(f"station name too long, max 64char: {station}")
+            if station in self._stations:
+                continue
+            station_fields = {
+                "station": station,
+                "longitude": float(r["longitude"][i]),
+                "latitude": float(r["latitude"][i]),
+                "altitude": float(r["altitude"][i]),
+                "country": str(r["country"][i]),
+                "url": "",
+                "long_name": station,
+            }
+            station_metadata = {
+                key: (
+                    columns[key]
+                    if isinstance(columns[key], str)
+                    else rows[i][columns[key]]
                 )
-                if not r["station"] in self._stations:
-                    station_fields = {
-                        "station": r["station"],
-                        "longitude": r["longitude"],
-                        "latitude": r["latitude"],
-                        "altitude": r["altitude"],
-                        "country": r["country"],
-                        "url": "",
-                        "long_name": r["station"],
-                    }
-                    station_metadata = {
-                        key: extra_metadata[key] for key in self._extra_metadata
-                    }
-
-                    self._stations[r["station"]] = Station(
-                        station_fields, station_metadata
-                    )
+                for key in self._extra_metadata
+            }
+            self._stations[station] = Station(station_fields, station_metadata)
+
+        for variable in dict.fromkeys(r["variable"].tolist()):
+            idx = np.flatnonzero(r["variable"] == variable)
+            if variable in variable_units:
+                units = variable_units[variable]
+            else:
+                units = str(r["units"][idx[0]])
+                changed = r["units"][idx] != units
+                if np.any(changed):
+                    new_units = r["units"][idx][changed][0]
+                    raise Exception(f"unit change from '{units}' to '{new_units}'")
+            if variable in self._data:
+                da = self._data[variable]
+                if da.units != units:
+                    raise Exception(f"unit change from '{da.units}' to '{units}'")
+            else:
+                da = NpStructuredData(variable, units)
+                self._data[variable] = da
+            da.append(
+                r["value"][idx],
+                r["station"][idx],
+                r["latitude"][idx],
+                r["longitude"][idx],
+                r["altitude"][idx],
+                r["start_time"][idx],
+                r["end_time"][idx],
+                r["flag"][idx],
+                r["standard_deviation"][idx],
+            )
 
     @classmethod
     def col_keys(cls):
@@ -188,6 +306,17 @@ class CSVTimeseriesReader(pyaro.timeseries.AutoFilterReaderEngine.AutoFilterRead
     def metadata(self) -> dict:
         return self._metadata
 
+    def set_thread_safe(self, thread_safe: bool = True) -> None:
+        super().set_thread_safe(thread_safe)
+        if thread_safe:
+            # compute the lazily cached station-codes and station-index, the shared
+            # data and stations are not modified afterwards
+            for data in self._data.values():
+                data.station_codes()
+            self._stations.unique_countries
+            if len(self._stations) > 0:
+                self._stations.index(next(iter(self._stations)))
+
     def _unfiltered_data(self, varname) -> Data:
         return self._data[varname]
 
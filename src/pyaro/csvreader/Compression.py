@@ -0,0 +1,87 @@
+import bz2
+import contextlib
+import gzip
+import importlib
+import io
+import lzma
+
+# buffer size of the compressed file and the decompressed text
+BUFFER_SIZE = 1 << 20
+
+#: file-suffixes of the supported compressions
+COMPRESSION_SUFFIXES = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".lzma": "xz",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+}
+
+_MAGIC_BYTES = {
+    b"\x1f\x8b": "gzip",
+    b"\xfd7zXZ\x00": "xz",
+    b"\x28\xb5\x2f\xfd": "zstd",
+}
+
+
+def detect_compression(filename: str, head: bytes = b"") -> str | None:
+    """Detect the compression of a file by its suffix, or by the magic bytes at the
+    start of the file.
+
+    :param filename: file name
+    :param head: first bytes of the file, defaults to b""
+    :return: gzip, bz2, xz, zstd or None for uncompressed files
+    """
+    for suffix, compression in COMPRESSION_SUFFIXES.items():
+        if str(filename).endswith(suffix):
+            return compression
+    for magic, compression in _MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return compression
+    # BZh, the block-size 1-9 and the magic of the first block, since BZh alone
+    # might also start a text-file
+    if head[:3] == b"BZh" and head[3:4].isdigit() and head[4:10] == b"1AY&SY":
+        return "bz2"
+    return None
+
+
+def _zstd_reader(raw):
+    # python >= 3.14 has zstd in the standard library, otherwise use zstandard
+    try:
+        zstd = importlib.import_module("compression.zstd")
+        return zstd.ZstdFile(raw)
+    except ImportError:
+        pass
+    try:
+        zstandard = importlib.import_module("zstandard")
+    except ImportError as ex:
+        raise ModuleNotFoundError(
+            "reading zstd-compressed files is missing required dependency 'zstandard'. Please install to read these files."
+        ) from ex
+    return zstandard.ZstdDecompressor().stream_reader(raw, read_size=BUFFER_SIZE)
+
+
+@contextlib.contextmanager
+def open_text(filename: str, newline: str | None = ""):
+    """Open a possibly compressed text-file for reading, decompressing while reading.
+    To be used as context manager, e.g. `with open_text(filename) as fh:`
+
+    :param filename: file name
+    :param newline: see open(), defaults to "" as needed by csv.reader
+    :return: a text stream
+    """
+    with open(filename, "rb", buffering=BUFFER_SIZE) as raw:
+        compression = detect_compression(filename, raw.peek(10)[:10])
+        if compression is None:
+            stream = raw
+        elif compression == "gzip":
+            stream = gzip.GzipFile(fileobj=raw)
+        elif compression == "bz2":
+            stream = bz2.BZ2File(raw)
+        elif compression == "xz":
+            stream = lzma.LZMAFile(raw)
+        else:
+            stream = io.BufferedReader(_zstd_reader(raw), buffer_size=BUFFER_SIZE)
+        with io.TextIOWrapper(stream, newline=newline) as text:
+            yield text
@@ -0,0 +1,92 @@
+import json
+import logging
+import os
+import pathlib
+from typing import Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _geocoder_lookup() -> Callable[[float, float], str]:
+    from geocoder_reverse_natural_earth import Geocoder_Reverse_NE
+
+    geo = Geocoder_Reverse_NE()
+    return lambda lat, lon: geo.lookup_nearest(lat, lon)["ISO_A2_EH"]
+
+
+class CountryLookup:
+    """Bulk lookup of ISO2 country-codes from coordinates.
+
+    Each unique coordinate is looked up only once. Results can be kept in a json-file
+    keyed by the rounded coordinates, so that reading the same stations again doesn't
+    need the geocoder at all.
+
+    :param cache_file: json-file to read and store looked up countries, defaults to None,
+        meaning no persistent cache
+    :param precision: number of decimals of the coordinates used as key, defaults to 4 (~10m)
+    :param lookup: function from latitude and longitude to country-code, defaults to None,
+        meaning the nearest country from geocoder_reverse_natural_earth
+    """
+
+    def __init__(
+        self,
+        cache_file: str | os.PathLike | None = None,
+        precision: int = 4,
+        lookup: Callable[[float, float], str] | None = None,
+    ):
+        self._cache_file = None if cache_file is None else pathlib.Path(cache_file)
+        self._precision = precision
+        self._lookup = lookup
+        self._cache: dict[str, str] = {}
+        if self._cache_file is not None and self._cache_file.exists():
+            with open(self._cache_file) as fh:
+                self._cache = json.load(fh)
+
+    def _key(self, latitude: float, longitude: float) -> str:
+        return f"{latitude:.{self._precision}f},{longitude:.{self._precision}f}"
+
+    def lookup(self, latitudes, longitudes) -> np.ndarray:
+        """Countries of many coordinates.
+
+        :param latitudes: 1dim array of latitudes
+        :param longitudes: 1dim array of longitudes
+        :return: 1dim array of country-codes
+        """
+        coords = np.round(
+            np.column_stack(
+                [
+                    np.asarray(latitudes, dtype=np.float64),
+                    np.asarray(longitudes, dtype=np.float64),
+                ]
+            ),
+            self._precision,
+        )
+        coords += 0.0  # no negative zeros in the keys
+        if len(coords) == 0:
+            return np.array([], dtype=str)
+        unique_coords, inverse = np.unique(coords, axis=0, return_inverse=True)
+        keys = [self._key(lat, lon) for lat, lon in unique_coords.tolist()]
+        missing = [i for i, key in enumerate(keys) if key not in self._cache]
+        if missing:
+            if self._lookup is None:
+                self._lookup = _geocoder_lookup()
+            logger.debug("looking up %d of %d coordinates", len(missing), len(keys))
+            for i in missing:
+                lat, lon = unique_coords[i]
+                self._cache[keys[i]] = self._lookup(float(lat), float(lon))
+            self._save()
+        countries = np.array([self._cache[key] for key in keys], dtype=str)
+        return countries[inverse.reshape(-1)]
+
+    def _save(self) -> None:
+        if self._cache_file is None:
+            return
+        # write to a temporary file first, so a concurrent reader never sees a partial file
+        tmp_file = self._cache_file.with_name(
+            f"{self._cache_file.name}.{os.getpid()}.tmp"
+        )
+        with open(tmp_file, "w") as fh:
+            json.dump(self._cache, fh)
+        os.replace(tmp_file, self._cache_file)
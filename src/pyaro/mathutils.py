@@ -1,3 +1,5 @@
+import itertools
+
 import numpy as np
 
 
@@ -19,3 +21,232 @@ def haversine(lon1, lat1, lon2, lat2):
     c = 2 * np.arcsin(np.sqrt(a))
     m = EARTH_RADIUS * c
     return m
+
+
+def unit_vectors(latitudes, longitudes) -> np.ndarray:
+    """3D cartesian coordinates of points on the unit sphere.
+
+    :param latitudes: latitudes in degrees_north
+    :param longitudes: longitudes in degrees_east
+    :return: array of shape (n, 3)
+    """
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64).reshape(-1))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64).reshape(-1))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def chord_length(distance):
+    """Chord length on the unit sphere of a great-circle distance.
+
+    :param distance: distance in meters
+    :return: distance of unit_vectors
+    """
+    angle = np.minimum(np.asarray(distance, dtype=np.float64) / EARTH_RADIUS, np.pi)
+    return 2 * np.sin(angle / 2)
+
+
+def _distance(chord):
+    """great-circle distance in meters of a chord length on the unit sphere"""
+    distance = 2 * EARTH_RADIUS * np.arcsin(np.clip(chord / 2, 0, 1))
+    return np.where(np.isinf(chord), np.inf, distance)
+
+
+def _cKDTree():
+    try:
+        from scipy.spatial import cKDTree
+    except ImportError:
+        return None
+    return cKDTree
+
+
+class SpatialIndex:
+    """Index of points on the earth for fast nearest-neighbour and radius queries.
+
+    The points are stored as 3D coordinates on the unit sphere, so distances are valid
+    across the date-line and near the poles. The index uses a KD-tree from scipy if
+    installed, and otherwise a vectorized brute-force search in chunks.
+
+    :param latitudes: latitudes of the points in degrees_north
+    :param longitudes: longitudes of the points in degrees_east
+    :param names: optional names of the points, e.g. station-ids, defaults to None
+    """
+
+    # maximum number of pairwise distances computed at once by the brute-force search
+    _CHUNK_SIZE = 1 << 22
+
+    def __init__(self, latitudes, longitudes, names=None):
+        self._points = unit_vectors(latitudes, longitudes)
+        self.names = None if names is None else np.asarray(names)
+        tree = _cKDTree()
+        self._tree = None if tree is None or len(self) == 0 else tree(self._points)
+
+    @classmethod
+    def from_stations(cls, stations) -> "SpatialIndex":
+        """Index the stations of e.g. Reader.stations().
+
+        :param stations: dictionary of station-id to Station, or a StationTable
+        :return: a SpatialIndex with the station-ids as names
+        """
+        from .timeseries.Station import StationTable
+
+        table = StationTable.from_stations(stations)
+        return cls(table.latitudes, table.longitudes, names=table.names)
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _chunks(self, points: np.ndarray):
+        step = max(1, self._CHUNK_SIZE // max(1, len(self)))
+        for start in range(0, len(points), step):
+            yield start, points[start : start + step]
+
+    def query(self, latitudes, longitudes, k: int = 1) -> tuple[np.ndarray, np.ndarray]:
+        """Find the k nearest points of the index.
+
+        :param latitudes: latitudes of the query points in degrees_north
+        :param longitudes: longitudes of the query points in degrees_east
+        :param k: number of neighbours, defaults to 1
+        :return: tuple of distances in meters and indices of the nearest points, with
+            shape (n,) for k=1 and (n, k) otherwise. Missing neighbours, when the index
+            has less than k points, have distance inf and index len(self).
+        """
+        distances, indices = self._query(unit_vectors(latitudes, longitudes), k)
+        if k == 1:
+            return distances[:, 0], indices[:, 0]
+        return distances, indices
+
+    def _query(self, points: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """query of unit-vectors, see query"""
+        chords = np.full((len(points), k), np.inf)
+        indices = np.full((len(points), k), len(self), dtype=np.intp)
+        n = min(k, len(self))
+        if n > 0 and self._tree is not None:
+            c, i = self._tree.query(points, k=n)
+            chords[:, :n] = c.reshape(len(points), n)
+            indices[:, :n] = i.reshape(len(points), n)
+        elif n > 0:
+            for start, chunk in self._chunks(points):
+                # select the candidates by the dot-product, 1 - chord^2 / 2
+                dots = chunk @ self._points.T
+                if n < len(self):
+                    idx = np.argpartition(-dots, n - 1, axis=1)[:, :n]
+                else:
+                    idx = np.broadcast_to(np.arange(n), (len(chunk), n))
+                # exact chord-lengths, the dot-product is imprecise for short distances
+                c = np.linalg.norm(chunk[:, None, :] - self._points[idx], axis=2)
+                order = np.argsort(c, axis=1, kind="stable")
+                rows = slice(start, start + len(chunk))
+                chords[rows, :n] = np.take_along_axis(c, order, axis=1)
+                indices[rows, :n] = np.take_along_axis(idx, order, axis=1)
+        return _distance(chords), indices
+
+    def query_radius(self, latitudes, longitudes, radius: float) -> list[np.ndarray]:
+        """Find all points of the index within a radius.
+
+        :param latitudes: latitudes of the query points in degrees_north
+        :param longitudes: longitudes of the query points in degrees_east
+        :param radius: radius in meters
+        :return: list with a sorted array of indices for each query point
+        """
+        points = unit_vectors(latitudes, longitudes)
+        chord = chord_length(radius)
+        if self._tree is not None:
+            return [
+                np.sort(np.asarray(idx, dtype=np.intp))
+                for idx in self._tree.query_ball_point(points, chord)
+            ]
+        result = []
+        # candidates by the dot-product with a margin for its rounding errors
+        min_dot = 1 - chord**2 / 2 - 1e-12
+        for _, chunk in self._chunks(points):
+            for point, row in zip(chunk, chunk @ self._points.T >= min_dot):
+                idx = np.flatnonzero(row)
+                c = np.linalg.norm(self._points[idx] - point, axis=1)
+                result.append(idx[c <= chord])
+        return result
+
+    def within_radius(self, latitudes, longitudes, radius: float) -> np.ndarray:
+        """Boolean mask of the points of the index within a radius of any query point.
+
+        :param latitudes: latitudes of the query points in degrees_north
+        :param longitudes: longitudes of the query points in degrees_east
+        :param radius: radius in meters
+        :return: boolean array of size len(self)
+        """
+        distances, _ = SpatialIndex(latitudes, longitudes)._query(self._points, 1)
+        return distances[:, 0] <= radius
+
+
+# number of grid-cells per axis of the unit-cube, small enough for int64 cell-keys
+_GRID_CELLS = 2**20
+
+
+def cluster_points(
+    latitudes,
+    longitudes,
+    distance: float,
+    altitudes=None,
+    max_altitude_difference: float = np.inf,
+) -> np.ndarray:
+    """Group points which are within a distance of each other, also transitively.
+
+    Candidate pairs are found with a grid on the unit sphere with cells of at least the
+    size of the distance, so only points in the same or neighbouring cells are compared.
+
+    :param latitudes: latitudes in degrees_north
+    :param longitudes: longitudes in degrees_east
+    :param distance: maximum great-circle distance in meters
+    :param altitudes: altitudes in meters, defaults to None, meaning no altitude check
+    :param max_altitude_difference: maximum altitude difference in meters, points with
+        unknown (nan) altitude are compared horizontally only, defaults to inf
+    :return: for each point, the index of the first point of its group
+    """
+    points = unit_vectors(latitudes, longitudes)
+    n = len(points)
+    labels = np.arange(n)
+    if n < 2:
+        return labels
+    max_chord = chord_length(distance)
+    cell_size = max(max_chord, 2 / _GRID_CELLS)
+    cells = np.floor(points / cell_size).astype(np.int64) + _GRID_CELLS // 2 + 1
+    # linear cell-keys, so that the key of a neighbour cell is a constant shift
+    size = _GRID_CELLS + 3
+    keys = (cells[:, 0] * size + cells[:, 1]) * size + cells[:, 2]
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    first, second = [], []
+    # half of the neighbour cells, the other half gives the same pairs
+    for offset in itertools.product((-1, 0, 1), repeat=3):
+        if offset < (0, 0, 0):
+            continue
+        shift = (offset[0] * size + offset[1]) * size + offset[2]
+        # sorted_keys + shift is sorted, so searchsorted runs through it in order
+        lo = np.searchsorted(sorted_keys, sorted_keys + shift, "left")
+        hi = np.searchsorted(sorted_keys, sorted_keys + shift, "right")
+        counts = hi - lo
+        i = np.repeat(order, counts)
+        # positions lo[k] ... hi[k] in sorted_keys, for all points k
+        starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+        j = order[starts + np.arange(len(i))]
+        pairs = i != j
+        first.append(i[pairs])
+        second.append(j[pairs])
+    i = np.concatenate(first)
+    j = np.concatenate(second)
+    close = np.linalg.norm(points[i] - points[j], axis=1) <= max_chord
+    if altitudes is not None:
+        altitudes = np.asarray(altitudes, dtype=np.float64)
+        close &= ~(np.abs(altitudes[i] - altitudes[j]) > max_altitude_difference)
+    i = i[close]
+    j = j[close]
+    # connected components: propagate the smallest index along the pairs, and
+    # shortcut the labels to the label of their label
+    while True:
+        old = labels
+        labels = labels.copy()
+        np.minimum.at(labels, j, labels[i])
+        np.minimum.at(labels, i, labels[j])
+        labels = labels[labels]
+        if np.array_equal(old, labels):
+            return labels
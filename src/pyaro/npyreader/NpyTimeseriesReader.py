@@ -0,0 +1,137 @@
+import json
+import logging
+import os
+
+import numpy as np
+
+import pyaro.timeseries.AutoFilterReaderEngine
+from pyaro.timeseries import Data, NpStructuredData, Station
+from pyaro.timeseries.Station import _stations_from_array
+
+logger = logging.getLogger(__name__)
+
+FORMAT = "pyaro-npy"
+VERSION = 1
+METADATA_FILE = "metadata.json"
+
+
+class NpyTimeseriesException(Exception):
+    pass
+
+
+def read_store_metadata(path: str) -> dict:
+    """Read the metadata.json of a npy_timeseries store.
+
+    :param path: directory of the store
+    :raises NpyTimeseriesException: if path is not a npy_timeseries store
+    :return: the store metadata
+    """
+    try:
+        with open(os.path.join(path, METADATA_FILE)) as fh:
+            store = json.load(fh)
+    except FileNotFoundError as ex:
+        raise NpyTimeseriesException(f"{path} is not a {FORMAT} store") from ex
+    if store.get("format") != FORMAT:
+        raise NpyTimeseriesException(f"{path} is not a {FORMAT} store")
+    if store.get("version", 0) > VERSION:
+        raise NpyTimeseriesException(
+            f"{path} has {FORMAT} version {store['version']}, supported up to {VERSION}"
+        )
+    return store
+
+
+class NpyTimeseriesReader(pyaro.timeseries.AutoFilterReaderEngine.AutoFilterReader):
+    """Reader of a directory of numpy .npy files, as written by write_timeseries.
+
+    The store contains:
+
+    * metadata.json with the reader metadata, the variables with their units and
+      data-files, and the station-file and station metadata
+    * a station-file, a structured array with the station fields
+    * one or more data-files per variable, structured arrays with the fields of
+      NpStructuredData, one for each time they were appended
+
+    Data-files are memory-mapped, so only the parts needed by the filters are read.
+    Variables with several data-files, i.e. of appended stores, are concatenated and
+    thereby read completely into memory on first use. Rewrite such stores, e.g. with
+    write_timeseries(..., overwrite=True), to memory-map them again.
+    """
+
+    def __init__(self, filename, mmap: bool = True, filters=[]):
+        """open a npy_timeseries store
+
+        :param filename: directory of the store
+        :param mmap: memory-map the data-files rather than reading them, defaults to True,
+            only effective for variables stored in a single data-file
+        :param filters: default auto-filter filters
+        """
+        self._path = str(filename)
+        self._store = read_store_metadata(self._path)
+        self._mmap_mode = "r" if mmap else None
+        self._set_filters(filters)
+        self._data = {}  # var -> NpStructuredData, loaded on first use
+
+        stations = np.load(
+            os.path.join(self._path, self._store["stations_file"]), allow_pickle=False
+        )
+        self._stations = _stations_from_array(stations, self._store["station_metadata"])
+
+    def metadata(self) -> dict:
+        metadata = dict(self._store["metadata"])
+        metadata["path"] = self._path
+        return metadata
+
+    def _load(self, varname) -> NpStructuredData:
+        variable = self._store["variables"][varname]
+        parts = [
+            np.load(
+                os.path.join(self._path, file),
+                mmap_mode=self._mmap_mode,
+                allow_pickle=False,
+            )
+            for file in variable["files"]
+        ]
+        if len(parts) == 1:
+            array = parts[0]
+        elif len(parts) == 0:
+            array = np.empty(0, dtype=NpStructuredData._dtype)
+        else:
+            logger.debug("%s: reading %d appended data-files", varname, len(parts))
+            array = np.concatenate(parts)
+        data = NpStructuredData()
+        data.set_data(
+            varname,
+            variable["units"],
+            array,
+            is_sorted=variable.get("sorted", False) and len(parts) == 1,
+        )
+        return data
+
+    def _unfiltered_data(self, varname) -> Data:
+        if varname not in self._data:
+            self._data[varname] = self._load(varname)
+        return self._data[varname]
+
+    def _variables_memory_usage(self) -> dict[str, int]:
+        # only the variables loaded so far, memory-mapped with their full size
+        return {var: data.memory_usage() for var, data in self._data.items()}
+
+    def _unfiltered_stations(self) -> dict[str, Station]:
+        return self._stations
+
+    def _unfiltered_variables(self) -> list[str]:
+        return list(self._store["variables"].keys())
+
+    def close(self):
+        self._data = {}
+
+
+class NpyTimeseriesEngine(pyaro.timeseries.AutoFilterReaderEngine.AutoFilterEngine):
+    def reader_class(self):
+        return NpyTimeseriesReader
+
+    def description(self):
+        return "Fast reader of memory-mapped numpy-files, written by pyaro.npyreader.write_timeseries"
+
+    def url(self):
+        return "https://github.com/metno/pyaro"
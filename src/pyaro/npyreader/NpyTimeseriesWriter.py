@@ -0,0 +1,203 @@
+import json
+import logging
+import os
+
+import numpy as np
+
+from pyaro.timeseries import Reader, StationTable
+from pyaro.timeseries.Data import _structured_array
+from pyaro.timeseries.Station import _stations_array
+
+from .NpyTimeseriesReader import (
+    FORMAT,
+    METADATA_FILE,
+    VERSION,
+    NpyTimeseriesException,
+    read_store_metadata,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _save(path: str, file: str, array: np.ndarray) -> None:
+    # write to a temporary file first, so readers never see partial files
+    tmp_file = os.path.join(path, f".{file}.tmp")
+    with open(tmp_file, "wb") as fh:
+        np.save(fh, array, allow_pickle=False)
+    os.replace(tmp_file, os.path.join(path, file))
+
+
+def _write_store_metadata(path: str, store: dict) -> None:
+    tmp_file = os.path.join(path, f".{METADATA_FILE}.tmp")
+    with open(tmp_file, "w") as fh:
+        json.dump(store, fh, default=str)
+    os.replace(tmp_file, os.path.join(path, METADATA_FILE))
+
+
+def _new_file(store: dict, prefix: str) -> str:
+    file = f"{prefix}-{store['next_file']:06d}.npy"
+    store["next_file"] += 1
+    return file
+
+
+def _merge_stations(
+    path: str, store: dict, stations: StationTable
+) -> tuple[StationTable | None, list[dict]]:
+    """stations of an existing store, extended by new stations, or None if there are
+    no new stations and the stored stations are kept"""
+    old = np.load(os.path.join(path, store["stations_file"]), allow_pickle=False)
+    new = ~np.isin(stations.names, old["station"])
+    if not np.any(new):
+        return None, store["station_metadata"]
+    stations = stations.take(new)
+    merged = StationTable.from_columns(
+        np.concatenate([old["station"], stations.names]),
+        np.concatenate([old["latitude"], stations.latitudes]),
+        np.concatenate([old["longitude"], stations.longitudes]),
+        np.concatenate([old["altitude"], stations.altitudes]),
+        country=np.concatenate([old["country"], stations.countries]),
+        long_name=np.concatenate([old["long_name"], stations.column("long_name")]),
+        url=np.concatenate([old["url"], stations.column("url")]),
+    )
+    metadata = store["station_metadata"] + [
+        stations[name].metadata for name in stations
+    ]
+    return merged, metadata
+
+
+def _row_keys(array: np.ndarray, names: np.ndarray) -> np.ndarray:
+    """(station, start_time) of each row as a single comparable value"""
+    keys = np.empty((len(array), 2), dtype=np.int64)
+    keys[:, 0] = np.searchsorted(names, array["stations"])
+    keys[:, 1] = array["start_times"].astype("datetime64[s]").astype(np.int64)
+    return keys.view(np.dtype((np.void, keys.itemsize * 2))).reshape(-1)
+
+
+def _new_rows(path: str, files: list[str], array: np.ndarray) -> np.ndarray:
+    """mask of the rows of array with a (station, start_time) not stored in files"""
+    stored = [
+        np.load(os.path.join(path, file), mmap_mode="r", allow_pickle=False)
+        for file in files
+    ]
+    # only the key columns of the stored data are read
+    stored = np.concatenate(
+        [part[["stations", "start_times"]] for part in stored]
+        + [np.empty(0, dtype=array[["stations", "start_times"]].dtype)]
+    )
+    names = np.unique(np.concatenate([stored["stations"], array["stations"]]))
+    return ~np.isin(_row_keys(array, names), _row_keys(stored, names))
+
+
+def write_timeseries(
+    reader: Reader,
+    path: str,
+    variables: list[str] | None = None,
+    overwrite: bool = False,
+    append: bool = False,
+    sort: bool = False,
+) -> None:
+    """Write all data and stations of a reader, with its filters applied, to a
+    npy_timeseries store, which can be opened with the npy_timeseries engine.
+
+    The data is written variable by variable, so only the data of one variable is
+    kept in memory at once.
+
+    With append, an existing store is extended without rewriting the existing data:
+    for each variable, the rows with a (station, start_time) not in the store yet
+    are written to a new data-file, and new stations and variables are added. This
+    allows e.g. nightly updates of a store from a source containing the full history,
+    including late data of earlier times. Rows already in the store are kept with
+    their stored values. Each append adds a data-file per variable, and variables of
+    several data-files are read into memory rather than memory-mapped, see
+    NpyTimeseriesReader, so rewrite stores with many appends from time to time.
+
+    :param reader: any pyaro.timeseries.Reader
+    :param path: directory of the store, created if it doesn't exist
+    :param variables: variables to write, defaults to None, meaning all variables
+    :param overwrite: replace an existing store, defaults to False
+    :param append: append rows not yet in an existing store, or create a new
+        store if none exists, defaults to False
+    :param sort: write the data sorted by station and start_time, see Data.sorted.
+        Variables stored sorted in a single file are read with the is_sorted flag,
+        defaults to False
+    :raises NpyTimeseriesException: if a store exists already and neither overwrite nor
+        append are given, or on unit changes when appending
+    """
+    os.makedirs(path, exist_ok=True)
+    exists = os.path.exists(os.path.join(path, METADATA_FILE))
+    old_files = []
+    next_file = 0
+    if exists and append:
+        store = read_store_metadata(path)
+    else:
+        if exists:
+            if not overwrite:
+                raise NpyTimeseriesException(f"{FORMAT} store exists already: {path}")
+            old_store = read_store_metadata(path)
+            # new file-names, the old files are removed once the new store is complete
+            next_file = old_store["next_file"]
+            old_files.append(old_store["stations_file"])
+            for variable in old_store["variables"].values():
+                old_files.extend(variable["files"])
+        store = {
+            "format": FORMAT,
+            "version": VERSION,
+            "metadata": reader.metadata(),
+            "variables": {},
+            "stations_file": None,
+            "station_metadata": [],
+            "next_file": next_file,
+        }
+
+    if variables is None:
+        variables = reader.variables()
+    stations = StationTable.from_stations(reader.stations())
+    if store["stations_file"] is not None:
+        stations, station_metadata = _merge_stations(path, store, stations)
+    else:
+        station_metadata = [stations[name].metadata for name in stations]
+    if stations is not None:
+        if store["stations_file"] is not None:
+            old_files.append(store["stations_file"])
+        store["stations_file"] = _new_file(store, "stations")
+        store["station_metadata"] = station_metadata
+        _save(path, store["stations_file"], _stations_array(stations))
+
+    for varname in variables:
+        data = reader.data(varname)
+        if sort:
+            data = data.sorted()
+        variable = store["variables"].setdefault(
+            varname, {"units": data.units, "files": [], "max_start_time": None}
+        )
+        if variable["units"] != data.units:
+            raise NpyTimeseriesException(
+                f"unit change of {varname} from '{variable['units']}' to '{data.units}'"
+            )
+        array = _structured_array(data)
+        if len(variable["files"]) > 0:
+            new = _new_rows(path, variable["files"], array)
+            logger.debug(
+                "%s: %d of %d rows in store already",
+                varname,
+                len(array) - np.count_nonzero(new),
+                len(array),
+            )
+            array = array[new]
+            if len(array) == 0:
+                continue
+        file = _new_file(store, "data")
+        _save(path, file, array)
+        variable["files"].append(file)
+        # appended files break the order of the concatenated data
+        variable["sorted"] = data.is_sorted and len(variable["files"]) == 1
+        if len(array) > 0:
+            max_start_time = array["start_times"].max()
+            if variable["max_start_time"] is not None:
+                last = np.datetime64(variable["max_start_time"], "s")
+                max_start_time = max(max_start_time, last)
+            variable["max_start_time"] = str(max_start_time)
+    # the metadata is written last and marks the store as complete
+    _write_store_metadata(path, store)
+    for file in old_files:
+        os.remove(os.path.join(path, file))
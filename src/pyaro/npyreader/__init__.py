@@ -0,0 +1,3 @@
+from .NpyTimeseriesReader import NpyTimeseriesEngine, NpyTimeseriesReader
+from .NpyTimeseriesWriter import write_timeseries
+from .export import export_timeseries
@@ -0,0 +1,106 @@
+"""Command-line export of any pyaro timeseries source to a npy_timeseries store.
+
+Example, appending the new data of a csv-file to a store in a nightly job::
+
+    pyaro-export csv_timeseries /data/obs.csv.gz /data/obs_store --append \
+        --filters '{"flags": {"include": [0]}}'
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+import pyaro
+
+from .NpyTimeseriesWriter import write_timeseries
+
+
+def export_timeseries(
+    engine: str,
+    source: str,
+    path: str,
+    filters: dict | list = [],
+    open_kwargs: dict = {},
+    variables: list[str] | None = None,
+    overwrite: bool = False,
+    append: bool = False,
+    sort: bool = False,
+) -> None:
+    """Open a source with a pyaro engine and write it to a npy_timeseries store.
+
+    :param engine: name of the engine, see pyaro.list_timeseries_engines()
+    :param source: filename_or_obj_or_url of the source
+    :param path: directory of the store
+    :param filters: filters applied to the source, defaults to []
+    :param open_kwargs: further arguments to open the source, defaults to {}
+    :param variables: variables to write, defaults to None, meaning all variables
+    :param overwrite: replace an existing store, defaults to False
+    :param append: append rows not yet in an existing store, defaults to False
+    :param sort: write the data sorted by station and start_time, defaults to False
+    """
+    with pyaro.open_timeseries(engine, source, filters=filters, **open_kwargs) as ts:
+        write_timeseries(
+            ts,
+            path,
+            variables=variables,
+            overwrite=overwrite,
+            append=append,
+            sort=sort,
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="pyaro-export",
+        description="Export a pyaro timeseries source to a fast npy_timeseries store.",
+    )
+    parser.add_argument("engine", help="pyaro timeseries engine, e.g. csv_timeseries")
+    parser.add_argument("source", help="filename or url of the source")
+    parser.add_argument("store", help="directory of the npy_timeseries store")
+    parser.add_argument(
+        "--filters", type=json.loads, default=[], help="filters as json-dict"
+    )
+    parser.add_argument(
+        "--open-kwargs",
+        type=json.loads,
+        default={},
+        help="further arguments of the engine as json-dict",
+    )
+    parser.add_argument(
+        "--variables", nargs="+", default=None, help="variables to export"
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--append",
+        action="store_true",
+        help="append rows of stations and start-times not yet in an existing store",
+    )
+    mode.add_argument(
+        "--overwrite", action="store_true", help="replace an existing store"
+    )
+    parser.add_argument(
+        "--sort",
+        action="store_true",
+        help="write the data sorted by station and start-time",
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    export_timeseries(
+        args.engine,
+        args.source,
+        args.store,
+        filters=args.filters,
+        open_kwargs=args.open_kwargs,
+        variables=args.variables,
+        overwrite=args.overwrite,
+        append=args.append,
+        sort=args.sort,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,25 @@
-import numpy as np
-import pandas as pd
 from .timeseries.Data import Data
 
 
-def timeseries_data_to_pd(data: Data):
+def timeseries_data_to_pd(
+    data: Data, categorical_stations: bool = False, copy: bool = True
+):
     """Convert pyaro.Data to a pandas dataframe
 
+    The dataframe is build directly from the data-columns, keeping their dtypes.
+
     :param data: a pyaro Data object
+    :param categorical_stations: convert the stations column to a pandas Categorical,
+        defaults to False
+    :param copy: copy the data-columns, defaults to True. With False, the dataframe
+        shares memory with the data, which readers may cache and return again, so
+        in-place changes of the dataframe, e.g. df["values"] *= 2, change the data
+        of later Reader.data() calls unless pandas Copy-on-Write is enabled
     :return: a pandas dataframe
     """
-    size = len(data)
-    index = np.arange(size)
-    cols = list(data.keys())
-    vals = []
-    df = pd.DataFrame(index=index, columns=cols)
-    for col in cols:
-        df[col] = data[col]
-    return df
+    import pandas as pd
+
+    columns = {col: getattr(data, col) for col in data.keys()}
+    if categorical_stations:
+        columns["stations"] = pd.Categorical(columns["stations"])
+    return pd.DataFrame(columns, copy=copy)
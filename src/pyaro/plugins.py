@@ -1,3 +1,4 @@
+from collections.abc import Mapping
 import functools
 import sys
 import warnings
@@ -11,31 +12,70 @@ from .timeseries.Engine import Engine as TimeseriesEngine
 from .timeseries.Reader import Reader as TimeseriesReader
 
 
-def build_timeseries_engines(entrypoints: EntryPoints) -> dict[str, TimeseriesEngine]:
-    backend_entrypoints: dict[str, TimeseriesEngine] = {}
-    for entrypoint in entrypoints:
-        name = entrypoint.name
-        if name in backend_entrypoints:
-            warnings.warn(
-                f"found multiple versions of {entrypoint.group} entrypoint {name} for {entrypoint.value}"
-            )
-            continue
+class LazyEngines(Mapping):
+    """A read-only dictionary of engines, which loads and instantiates an engine
+    from its entrypoint only on first access by name.
+
+    Engines failing to load are warned about and behave as missing keys.
+
+    :param entrypoints: entrypoints of the engines
+    """
+
+    def __init__(self, entrypoints: EntryPoints):
+        self._entrypoints = {}
+        for entrypoint in entrypoints:
+            name = entrypoint.name
+            if name in self._entrypoints:
+                warnings.warn(
+                    f"found multiple versions of {entrypoint.group} entrypoint {name} for {entrypoint.value}"
+                )
+                continue
+            self._entrypoints[name] = entrypoint
+        self._engines: dict[str, TimeseriesEngine] = {}
+        self._failed: set[str] = set()
+
+    def __getitem__(self, name) -> TimeseriesEngine:
+        if name in self._engines:
+            return self._engines[name]
+        if name not in self._entrypoints or name in self._failed:
+            raise KeyError(name)
         try:
-            backend = entrypoint.load()
-            backend_entrypoints[name] = backend()
+            backend = self._entrypoints[name].load()
+            self._engines[name] = backend()
         except Exception as ex:
+            self._failed.add(name)
             warnings.warn(f"Engine {name!r} loading failed:\n{ex}", RuntimeWarning)
-    return backend_entrypoints
+            raise KeyError(name) from ex
+        return self._engines[name]
+
+    def __contains__(self, name) -> bool:
+        return name in self._entrypoints and name not in self._failed
+
+    def __iter__(self):
+        return (name for name in self._entrypoints if name not in self._failed)
+
+    def __len__(self) -> int:
+        return len(self._entrypoints.keys() - self._failed)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self)})"
+
+
+def build_timeseries_engines(entrypoints: EntryPoints) -> LazyEngines:
+    return LazyEngines(entrypoints)
 
 
 @functools.lru_cache(maxsize=1)
-def list_timeseries_engines() -> dict[str, TimeseriesEngine]:
+def list_timeseries_engines() -> Mapping[str, TimeseriesEngine]:
     """
     Return a dictionary of available timeseries_readers and their objects.
 
+    The engines are only imported and instantiated when accessed by name, e.g. listing
+    the names does not import the engines' dependencies.
+
     Returns
     -------
-    dictionary
+    read-only dictionary
 
     Notes
     -----
@@ -0,0 +1,131 @@
+import numpy as np
+
+from .Data import Data, Flag, NpStructuredData
+
+
+class AggregationException(Exception):
+    pass
+
+
+#: aggregation frequencies and their datetime64 units
+FREQUENCIES = {
+    "hourly": "h",
+    "daily": "D",
+    "monthly": "M",
+    "yearly": "Y",
+}
+
+#: supported aggregation methods
+METHODS = ("mean", "min", "max", "count", "std")
+
+
+def aggregate(
+    data: Data, freq: str, how: str = "mean", min_coverage: float = 0.0
+) -> NpStructuredData:
+    """Aggregate data per station to hourly, daily, monthly or yearly periods.
+
+    Rows are assigned to the period of their start_time. NaN values are ignored. The
+    coverage of a period is the summed duration of its valid measurements, limited to
+    the period, relative to the length of the period.
+
+    :param data: the data to aggregate
+    :param freq: one of hourly, daily, monthly or yearly
+    :param how: one of mean, min, max, count or std (sample standard deviation),
+        defaults to mean
+    :param min_coverage: minimum coverage of a period between 0 and 1, periods with
+        less coverage or without valid values are removed, defaults to 0
+    :raises AggregationException: on unknown freq or how
+    :return: data with one row per station and period, with the start and end of the
+        period as start_times and end_times, and the standard deviation of the values
+        of the period as standard_deviations
+    """
+    if freq not in FREQUENCIES:
+        raise AggregationException(
+            f"unknown freq '{freq}', use one of {list(FREQUENCIES)}"
+        )
+    if how not in METHODS:
+        raise AggregationException(f"unknown how '{how}', use one of {list(METHODS)}")
+    unit = FREQUENCIES[freq]
+
+    ids, codes = data.station_codes()
+    start_times = data.start_times.astype("datetime64[s]")
+    periods = start_times.astype(f"datetime64[{unit}]").astype(np.int64)
+    first_period = periods.min() if len(periods) > 0 else 0
+    periods -= first_period
+    # one integer key per station and period, sorted by station, then by time
+    keys = codes.astype(np.int64) * (periods.max(initial=0) + 1) + periods
+    if data.is_sorted:
+        # sorted by station and start_time, so also by station and period
+        order = np.arange(len(keys))
+    else:
+        order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    is_first = np.empty(len(keys), dtype=bool)
+    is_first[:1] = True
+    np.not_equal(sorted_keys[1:], sorted_keys[:-1], out=is_first[1:])
+    starts = np.flatnonzero(is_first)
+    groups = np.empty(len(keys), dtype=np.intp)
+    groups[order] = np.cumsum(is_first) - 1
+    ngroups = len(starts)
+
+    period_starts = (
+        (periods[order[starts]] + first_period)
+        .astype(f"datetime64[{unit}]")
+        .astype("datetime64[s]")
+    )
+    period_ends = (
+        (periods[order[starts]] + first_period + 1)
+        .astype(f"datetime64[{unit}]")
+        .astype("datetime64[s]")
+    )
+
+    values = data.values.astype(np.float64)
+    valid = ~np.isnan(values)
+    counts = np.bincount(groups[valid], minlength=ngroups)
+    sums = np.bincount(groups[valid], weights=values[valid], minlength=ngroups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+        # two-pass variance, numerically stable for large offsets
+        deviations = values[valid] - means[groups[valid]]
+        squares = np.bincount(
+            groups[valid], weights=deviations * deviations, minlength=ngroups
+        )
+        stds = np.sqrt(squares / (counts - 1))
+    stds[counts < 2] = np.nan
+
+    if how == "mean":
+        result = means
+    elif how == "count":
+        result = counts.astype(np.float64)
+    elif how == "std":
+        result = stds
+    else:
+        reduce = np.fmin if how == "min" else np.fmax
+        result = reduce.reduceat(values[order], starts) if ngroups > 0 else means
+
+    keep = counts > 0
+    if min_coverage > 0:
+        end_times = data.end_times.astype("datetime64[s]")
+        # measurement durations, limited to the period of their start
+        ends = np.minimum(end_times, period_ends[groups])
+        durations = (ends - start_times).astype(np.float64)
+        covered = np.bincount(
+            groups[valid], weights=np.maximum(durations[valid], 0), minlength=ngroups
+        )
+        lengths = (period_ends - period_starts).astype(np.float64)
+        keep &= covered >= min_coverage * lengths
+
+    first_rows = order[starts[keep]]
+    array = np.empty(np.count_nonzero(keep), dtype=NpStructuredData._dtype)
+    array["values"] = result[keep]
+    array["stations"] = ids[codes[first_rows]]
+    array["latitudes"] = data.latitudes[first_rows]
+    array["longitudes"] = data.longitudes[first_rows]
+    array["altitudes"] = data.altitudes[first_rows]
+    array["start_times"] = period_starts[keep]
+    array["end_times"] = period_ends[keep]
+    array["flags"] = Flag.VALID
+    array["standard_deviations"] = stds[keep]
+    aggregated = NpStructuredData()
+    aggregated.set_data(data.variable, data.units, array, is_sorted=True)
+    return aggregated
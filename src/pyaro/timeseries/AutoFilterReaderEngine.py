@@ -1,10 +1,15 @@
 import abc
+from concurrent.futures import ThreadPoolExecutor
 import inspect
+from .Concurrency import SingleFlight
 from .Data import Data
-from .Station import Station
-from .Reader import Reader
+from .Station import Station, stations_memory_usage
+from .Reader import Reader, _memory_report
 from .Engine import Engine
 from .Filter import VariableNameFilter, Filter, filters, FilterFactory
+from .FilterCache import FilterCache
+from .FilterPlanner import FilterPlanner
+from .Instrumentation import FilterInstrumentation
 
 
 class UnknownFilterException(Exception):
@@ -23,8 +28,21 @@ class AutoFilterReader(Reader):
     filters are given.
 
     The implementation must also use _set_filters() to add the filters from __init__.
+
+    Timing and cardinality of each filter can be recorded with enable_instrumentation(),
+    and the filters can be reordered for performance with set_filter_planner(). Filter
+    results can be reused between calls with set_filter_cache().
+
+    A reader can be shared by several threads, e.g. in a threaded web-service, after
+    set_thread_safe(). Filters and FilterCache lock their lazily initialized state in
+    any mode.
     """
 
+    _instrumentation: FilterInstrumentation | None = None
+    _planner: FilterPlanner | None = None
+    _filter_cache: FilterCache | None = None
+    _data_flight: SingleFlight | None = None
+
     @classmethod
     def supported_filters(cls) -> list[Filter]:
         """Get the default list of implemented filters.
@@ -32,7 +50,7 @@ class AutoFilterReader(Reader):
         :return: list of filters
         """
         # remember to add all filters here also to the api.rst documentation
-        supported = "variables,stations,countries,bounding_boxes,duplicates,time_bounds,time_resolution,flags,time_variable_station,altitude,relaltitude,valleyfloor_relaltitude".split(
+        supported = "variables,stations,countries,bounding_boxes,within_radius,colocated_stations,duplicates,time_bounds,time_resolution,flags,time_variable_station,altitude,relaltitude,valleyfloor_relaltitude".split(
             ","
         )
         return [filters.get(name) for name in supported]
@@ -61,6 +79,105 @@ class AutoFilterReader(Reader):
         """
         return self._filters
 
+    def enable_instrumentation(
+        self, callback=None, trace_memory: bool = False
+    ) -> FilterInstrumentation:
+        """Record wall time, rows and stations in and out (and optionally memory)
+        of each filter applied in data, stations and variables.
+
+        :param callback: function called with each FilterMeasurement, defaults to None
+        :param trace_memory: measure allocated memory with tracemalloc, defaults to False
+        :return: the instrumentation, containing the report
+        """
+        self.disable_instrumentation()
+        self._instrumentation = FilterInstrumentation(callback, trace_memory)
+        return self._instrumentation
+
+    def disable_instrumentation(self) -> None:
+        """Stop recording filter measurements, and memory tracing started by them."""
+        if self._instrumentation is not None:
+            self._instrumentation.close()
+        self._instrumentation = None
+
+    @property
+    def instrumentation(self) -> FilterInstrumentation | None:
+        """The instrumentation enabled with enable_instrumentation, or None"""
+        return self._instrumentation
+
+    def set_filter_planner(
+        self, planner: FilterPlanner | None = FilterPlanner()
+    ) -> None:
+        """Reorder the commuting filters in data() by estimated cost and selectivity.
+
+        :param planner: the planner, defaults to a FilterPlanner with default settings,
+            None disables planning
+        """
+        self._planner = planner
+
+    def set_filter_cache(self, cache: FilterCache | None) -> None:
+        """Cache the results of the filters in data() and stations(), e.g. to avoid
+        recomputing expensive station filters like relaltitude for the same data.
+
+        :param cache: the cache, e.g. FilterCache(cache_dir=...), None disables caching
+        """
+        self._filter_cache = cache
+
+    @property
+    def filter_cache(self) -> FilterCache | None:
+        """The cache set with set_filter_cache, or None"""
+        return self._filter_cache
+
+    def set_thread_safe(self, thread_safe: bool = True) -> None:
+        """Allow concurrent calls of data(), stations() and variables() from several
+        threads on this reader.
+
+        In thread-safe mode, concurrent data() calls for the same variable are evaluated
+        only once and share the resulting Data, which must therefore not be modified in
+        place. Readers with lazily initialized state initialize it here. The filters,
+        planner, instrumentation and cache must be set before sharing the reader.
+
+        :param thread_safe: enable or disable the thread-safe mode, defaults to True
+        """
+        self._data_flight = SingleFlight() if thread_safe else None
+
+    @property
+    def thread_safe(self) -> bool:
+        """True if the thread-safe mode is enabled, see set_thread_safe"""
+        return self._data_flight is not None
+
+    def _cached_filters(self, filters: list[Filter]) -> list[Filter]:
+        if self._filter_cache is None:
+            return filters
+        return [self._filter_cache.cached(fi) for fi in filters]
+
+    def _apply_filter(self, fi: Filter, method: str, *args, variable=None):
+        if self._instrumentation is None:
+            return getattr(fi, method)(*args)
+        return self._instrumentation.apply(fi, method, *args, variable=variable)
+
+    def memory_report(self) -> dict:
+        """Memory held by the reader in bytes, i.e. of the unfiltered data and stations,
+        and the results in memory of the filter cache, see Data.memory_usage.
+
+        :return: dictionary with the memory of each variable as "variables",
+            of the stations as "stations", of the filter cache as "filter_cache"
+            and the sum as "total"
+        """
+        stations = stations_memory_usage(self._unfiltered_stations())
+        cache = 0 if self._filter_cache is None else self._filter_cache.nbytes
+        return _memory_report(
+            self._variables_memory_usage(), stations, filter_cache=cache
+        )
+
+    def _variables_memory_usage(self) -> dict[str, int]:
+        """Memory of the unfiltered data of each variable, readers reading data on
+        demand in _unfiltered_data should overwrite this to report only data in memory.
+        """
+        return {
+            var: self._unfiltered_data(var).memory_usage()
+            for var in self._unfiltered_variables()
+        }
+
     @abc.abstractmethod
     def _unfiltered_data(self, varname) -> Data:
         pass
@@ -76,25 +193,62 @@ class AutoFilterReader(Reader):
     def variables(self) -> list[str]:
         vars = self._unfiltered_variables()
         for fi in self._get_filters():
-            vars = fi.filter_variables(vars)
+            vars = self._apply_filter(fi, "filter_variables", vars)
         return vars
 
     def stations(self) -> dict[str, Station]:
         stats = self._unfiltered_stations()
-        for fi in self._get_filters():
-            stats = fi.filter_stations(stats)
+        for fi in self._cached_filters(self._get_filters()):
+            stats = self._apply_filter(fi, "filter_stations", stats)
         return stats
 
-    def data(self, varname) -> Data:
-        for fi in self._get_filters():
+    def _filtered_data(self, varname, filters, stats, vars) -> Data:
+        for fi in filters:
             if isinstance(fi, VariableNameFilter):
                 varname = fi.reader_varname(varname)
         dat = self._unfiltered_data(varname)
+        if self._planner is not None:
+            filters = self._planner.plan(filters, dat, stats, vars)
+        for fi in self._cached_filters(filters):
+            dat = self._apply_filter(
+                fi, "filter_data", dat, stats, vars, variable=varname
+            )
+        return dat
+
+    def _all_filtered_data(self, varname) -> Data:
         stats = self._unfiltered_stations()
         vars = self._unfiltered_variables()
-        for fi in self._get_filters():
-            dat = fi.filter_data(dat, stats, vars)
-        return dat
+        return self._filtered_data(varname, self._get_filters(), stats, vars)
+
+    def data(self, varname) -> Data:
+        if self._data_flight is not None:
+            return self._data_flight.do(varname, self._all_filtered_data, varname)
+        return self._all_filtered_data(varname)
+
+    def data_many(self, varnames: list[str], max_workers: int = 0) -> dict[str, Data]:
+        """Return all data for several variables.
+
+        Stations and variables are retrieved only once, and the filters are prepared
+        (see Filter.prepare) once for all variables, e.g. the station-reduction of
+        station-filters is computed only once.
+
+        :param varnames: variable names as returned from variables
+        :param max_workers: evaluate the variables in a thread pool with this many
+            threads, defaults to 0, meaning sequential evaluation
+        :return: a dictionary from variable name to data object
+        """
+        varnames = list(varnames)
+        stats = self._unfiltered_stations()
+        vars = self._unfiltered_variables()
+        filters = [fi.prepare(stats, vars) for fi in self._get_filters()]
+
+        def filtered_data(varname):
+            return self._filtered_data(varname, filters, stats, vars)
+
+        if max_workers > 0:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                return dict(zip(varnames, executor.map(filtered_data, varnames)))
+        return {var: filtered_data(var) for var in varnames}
 
 
 class AutoFilterEngine(Engine):
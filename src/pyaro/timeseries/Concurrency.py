@@ -0,0 +1,61 @@
+from concurrent.futures import Future
+import threading
+from typing import Callable, Hashable
+
+
+class SingleFlight:
+    """Deduplicate concurrent evaluations of the same key.
+
+    The first thread calling do for a key evaluates the function, other threads
+    calling do with the same key meanwhile wait for and share its result or exception.
+    Results are not kept after the evaluation, use a cache for that.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs):
+        """Evaluate func(*args, **kwargs), or wait for a running evaluation of key.
+
+        :param key: key identifying the evaluation
+        :param func: function to evaluate
+        :return: the result of func
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as ex:
+            call.set_exception(ex)
+            raise
+        else:
+            call.set_result(result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return result
+
+
+_INSTANCE_LOCKS_LOCK = threading.Lock()
+
+
+def instance_lock(obj) -> threading.RLock:
+    """The lock of the lazily initialized state of an object, created on first use.
+
+    The lock is stored as _lazy_lock in the __dict__ of obj, classes using it should
+    drop it in __getstate__ to stay picklable.
+
+    :param obj: any object with a __dict__
+    :return: a reentrant lock
+    """
+    lock = obj.__dict__.get("_lazy_lock")
+    if lock is None:
+        with _INSTANCE_LOCKS_LOCK:
+            lock = obj.__dict__.setdefault("_lazy_lock", threading.RLock())
+    return lock
@@ -15,6 +15,129 @@ class Flag(IntEnum):
     BELOW_THRESHOLD = 2
 
 
+_FACTORIZE_CHUNK = 1 << 16
+
+
+def _factorize(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Integer-code an array, like np.unique(values, return_inverse=True).
+
+    Sorting wide unicode strings is slow, so strings are hashed to uint64 first, and
+    only the hashes are sorted. Hash collisions are detected by comparing the
+    strings, falling back to np.unique.
+
+    :param values: 1dim array
+    :return: sorted unique values and codes, with uniques[codes] == values
+    """
+    n = len(values)
+    if n == 0:
+        return values[:0].copy(), np.zeros(0, dtype=np.intp)
+    if values.dtype.kind != "U":
+        return np.unique(values, return_inverse=True)
+
+    # a (n, nchars) uint32 view on the code-points, also for strided columns
+    chars = values[:, None].view(np.uint32)
+    multipliers = np.random.default_rng(0).integers(
+        1, 2**63, chars.shape[1], dtype=np.uint64
+    )
+    hashes = np.empty(n, dtype=np.uint64)
+    for start in range(0, n, _FACTORIZE_CHUNK):
+        chunk = np.ascontiguousarray(chars[start : start + _FACTORIZE_CHUNK])
+        # strings are zero-padded, zeros don't contribute to the hash
+        used = np.flatnonzero(chunk.any(axis=0))
+        width = used[-1] + 1 if len(used) > 0 else 0
+        hashes[start : start + _FACTORIZE_CHUNK] = (
+            chunk[:, :width].astype(np.uint64) @ multipliers[:width]
+        )
+    _, codes = np.unique(hashes, return_inverse=True)
+    first = np.empty(codes.max() + 1, dtype=np.intp)
+    first[codes] = np.arange(n)
+    uniques = values[first]
+    for start in range(0, n, _FACTORIZE_CHUNK):
+        part = slice(start, start + _FACTORIZE_CHUNK)
+        if np.any(uniques[codes[part]] != values[part]):
+            return np.unique(values, return_inverse=True)
+
+    order = np.argsort(uniques)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return uniques[order], rank[codes]
+
+
+def _station_index(
+    ids: np.ndarray, codes: np.ndarray, is_sorted: bool = False
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """CSR-index of integer-coded stations, see Data.station_index"""
+    if is_sorted:
+        # rows are already grouped by station
+        order = np.arange(len(codes))
+    else:
+        order = np.argsort(codes, kind="stable")
+    offsets = np.zeros(len(ids) + 1, dtype=np.intp)
+    np.cumsum(np.bincount(codes, minlength=len(ids)), out=offsets[1:])
+    return ids, order, offsets
+
+
+def _sort_order(codes: np.ndarray, start_times: np.ndarray) -> np.ndarray:
+    """Stable order of rows by station-code and start_time. Both are combined to a
+    single int64 key if possible, which sorts faster than a lexsort."""
+    if len(codes) == 0:
+        return np.zeros(0, dtype=np.intp)
+    times = start_times.astype("datetime64[s]").astype(np.int64)
+    first = times.min()
+    span = int(times.max()) - int(first) + 1
+    if (int(codes.max()) + 1) * span < 2**63:
+        return np.argsort(
+            codes.astype(np.int64) * span + (times - first), kind="stable"
+        )
+    return np.lexsort((times, codes))
+
+
+def _keeps_order(index) -> bool:
+    """Check if a slice-index keeps the rows in their order"""
+    if isinstance(index, slice):
+        return index.step is None or index.step > 0
+    index = np.asarray(index)
+    if index.dtype == bool:
+        return True
+    return index.ndim == 1 and bool(np.all(index[1:] > index[:-1]))
+
+
+def _rows(order: np.ndarray, start: int, end: int) -> slice | np.ndarray:
+    """rows order[start:end] as slice if they are contiguous, giving views on slicing"""
+    if end > start and order[end - 1] - order[start] == end - start - 1:
+        return slice(int(order[start]), int(order[end - 1]) + 1)
+    return order[start:end]
+
+
+def _structured_array(data, out: np.ndarray | None = None) -> np.ndarray:
+    """copy any Data to a structured array with the fields of NpStructuredData
+
+    :param out: array of len(data) to copy into, defaults to a new array
+    """
+    if out is None:
+        out = np.empty(len(data), dtype=NpStructuredData._dtype)
+    for key in out.dtype.names:
+        out[key] = getattr(data, key)
+    return out
+
+
+def _owner(array: np.ndarray) -> np.ndarray:
+    """the array owning the memory of a view"""
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+def _buffers_nbytes(arrays) -> int:
+    """size of the distinct memory buffers of arrays, counting shared buffers once"""
+    owners = {}
+    for array in arrays:
+        if isinstance(array, np.ndarray):
+            owner = _owner(array)
+            owners[id(owner)] = owner.nbytes
+    return sum(owners.values())
+
+
 class Data(abc.ABC):
     """Baseclass for data returned from a pyaro.timeseries.Reader.
 
@@ -81,6 +204,142 @@ class Data(abc.ABC):
         """
         raise NotImplementedError
 
+    def station_codes(self) -> tuple[np.ndarray, np.ndarray]:
+        """The stations as integer codes, e.g. for fast filtering by lookup tables.
+
+        Implementations may cache the codes, and may return station-ids not
+        present in the data.
+
+        :return: sorted station-ids and an integer array of the size of data,
+            with ids[codes] == stations
+        """
+        return _factorize(self.stations)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of all data-fields of all rows in bytes
+
+        :return: number of bytes
+        """
+        return sum(getattr(self, key).nbytes for key in self.keys())
+
+    def memory_usage(self) -> int:
+        """Memory held by the data in bytes. This includes unused capacity and
+        the complete arrays this data is a view of, and cached values like the
+        station-codes. Memory-mapped data is counted as if it was read.
+
+        :return: number of bytes
+        """
+        return _buffers_nbytes(getattr(self, key) for key in self.keys())
+
+    @property
+    def is_sorted(self) -> bool:
+        """True if the rows are known to be sorted by station and start_time, see sorted.
+        Filters may then use faster algorithms.
+
+        :return: True if known to be sorted, False if unknown
+        """
+        return False
+
+    def sorted(self):  # -> Self: for 3.11
+        """Get the data with rows sorted by station and start_time, keeping the order
+        of rows with equal station and start_time.
+
+        :return: a new Data object, or this object if already sorted
+        """
+        if self.is_sorted:
+            return self
+        return self.slice(_sort_order(self.station_codes()[1], self.start_times))
+
+    def station_index(
+        self, compute: bool = True
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+        """The rows of each station as index in CSR layout: the rows of station ids[i]
+        are order[offsets[i]:offsets[i+1]], in their original order.
+
+        Implementations may cache the index.
+
+        :param compute: compute the index if not cached, defaults to True
+        :return: sorted station-ids, the row-numbers sorted by station and the
+            offsets of each station in these row-numbers, of size len(ids) + 1, or
+            None if compute is False and the index is not cached
+        """
+        if not compute:
+            return None
+        return _station_index(*self.station_codes())
+
+    def station_slices(self) -> "dict[str, slice | np.ndarray]":
+        """The rows of all stations of the data, to be used with Data.slice. The rows
+        of a station are a slice if they are contiguous, e.g. for data sorted by station,
+        and an index array otherwise.
+
+        :return: dict of station-id to rows
+        """
+        ids, order, offsets = self.station_index()
+        return {
+            station: _rows(order, offsets[i], offsets[i + 1])
+            for i, station in enumerate(ids.tolist())
+            if offsets[i + 1] > offsets[i]
+        }
+
+    def for_station(self, station: str):  # -> Self: for 3.11
+        """Get the data of one station, without scanning all rows. The data of a
+        station with contiguous rows shares the memory of this data.
+
+        :param station: station-id
+        :return: a new Data object with the rows of the station, empty for unknown
+            stations
+        """
+        ids, order, offsets = self.station_index()
+        i = np.searchsorted(ids, station)
+        if i < len(ids) and ids[i] == station:
+            return self.slice(_rows(order, offsets[i], offsets[i + 1]))
+        return self.slice(slice(0, 0))
+
+    def aggregate(
+        self, freq: str, how: str = "mean", min_coverage: float = 0.0
+    ) -> "NpStructuredData":
+        """Aggregate the data per station to hourly, daily, monthly or yearly periods,
+        without conversion to pandas.
+
+        :param freq: one of hourly, daily, monthly or yearly
+        :param how: one of mean, min, max, count or std, defaults to mean
+        :param min_coverage: minimum fraction of a period covered by valid measurements,
+            periods with less coverage are removed, defaults to 0
+        :return: new data with one row per station and period,
+            see pyaro.timeseries.Aggregation.aggregate
+        """
+        from .Aggregation import aggregate
+
+        return aggregate(self, freq, how, min_coverage)
+
+    def rename(self, variable: str):  # -> Self: for 3.11
+        """Get the data with another variable name, without copying the data.
+
+        The default implementation wraps the data, implementations should overwrite
+        this to return an object of their own type.
+
+        :param variable: new variable name
+        :return: data with the new variable name, or this object if unchanged
+        """
+        if variable == self.variable:
+            return self
+        from .Wrappers import VariableNameChangingReaderData
+
+        return VariableNameChangingReaderData(self, variable)
+
+    def share(self, stations=None, owner: bool = True):
+        """Copy the data, and optionally stations, into shared memory, to use them in
+        other processes without copying, see pyaro.timeseries.SharedMemory.
+
+        :param stations: stations of the data, defaults to None
+        :param owner: remove the shared memory on close, defaults to True
+        :return: a SharedData, to be closed after use
+        """
+        from .SharedMemory import SharedData
+
+        return SharedData.create(self, stations, owner)
+
     @property
     @abc.abstractmethod
     def latitudes(self) -> np.ndarray:
@@ -195,6 +454,11 @@ class DynamicRecArray:
         self.capacity = len(data)
         self._data = data
 
+    @property
+    def nbytes(self) -> int:
+        """allocated bytes, including the unused capacity"""
+        return _owner(self._data).nbytes
+
     @property
     def data(self):
         if self.capacity != self.length:
@@ -231,6 +495,9 @@ class NpStructuredData(Data):
         self._variable = variable
         self._units = units
         self._data = DynamicRecArray(self._dtype)
+        self._station_codes = None
+        self._station_index = None
+        self._is_sorted = False
 
     def __len__(self) -> int:
         """Number of data-points"""
@@ -269,6 +536,9 @@ class NpStructuredData(Data):
         :param flag: defaults to Flag.VALID
         :param standard_deviation: defaults to np.nan
         """
+        self._station_codes = None
+        self._station_index = None
+        self._is_sorted = False
         if type(value).__module__ == np.__name__:  # numpy array handling
             self._data.append_array(
                 values=value,
@@ -302,7 +572,9 @@ class NpStructuredData(Data):
         )
         return
 
-    def set_data(self, variable: str, units: str, data: np.array):
+    def set_data(
+        self, variable: str, units: str, data: np.array, is_sorted: bool = False
+    ):
         """Initialization code for the data.
         Only known data-fields will be read from data, i.e. it is not
         possible to extend TimeseriesData without subclassing.
@@ -310,6 +582,7 @@ class NpStructuredData(Data):
         :param variable: variable name
         :param units: variable units
         :param data: a numpy structured array with all fields (see append)
+        :param is_sorted: data is sorted by stations and start_times, defaults to False
         :raises KeyError: on missing field
         :raises Exception: if not all data-ndarrays have same size
         :raises Exception: if not all data-fields are ndarrays
@@ -324,13 +597,85 @@ class NpStructuredData(Data):
         self._variable = variable
         self._units = units
         self._data.set_data(data)
+        self._station_codes = None
+        self._station_index = None
+        self._is_sorted = is_sorted
         return
 
     def slice(self, index):
         newData = NpStructuredData()
-        newData.set_data(self.variable, self.units, self._data.data[index])
+        newData.set_data(
+            self.variable,
+            self.units,
+            self._data.data[index],
+            self._is_sorted and _keeps_order(index),
+        )
+        if self._station_codes is not None:
+            ids, codes = self._station_codes
+            newData._station_codes = (ids, codes[index])
+        return newData
+
+    def rename(self, variable: str):  # -> Self: for 3.11
+        if variable == self._variable:
+            return self
+        newData = NpStructuredData()
+        newData.set_data(variable, self._units, self._data.data, self._is_sorted)
+        newData._station_codes = self._station_codes
+        newData._station_index = self._station_index
         return newData
 
+    @property
+    def is_sorted(self) -> bool:
+        return self._is_sorted
+
+    def sorted(self):  # -> Self: for 3.11
+        """Get the data sorted by station and start_time, with the is_sorted flag set.
+
+        :return: a new NpStructuredData, or this object if already sorted
+        """
+        if self._is_sorted:
+            return self
+        order = _sort_order(self.station_codes()[1], self.start_times)
+        newData = self.slice(order)
+        newData._is_sorted = True
+        return newData
+
+    def station_codes(self) -> tuple[np.ndarray, np.ndarray]:
+        """The stations as integer codes, computed once and kept in slices.
+
+        :return: sorted station-ids and an integer array of the size of data,
+            with ids[codes] == stations
+        """
+        if self._station_codes is None:
+            self._station_codes = _factorize(self.stations)
+        return self._station_codes
+
+    def station_index(
+        self, compute: bool = True
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray] | None:
+        """The rows of each station in CSR layout, computed once, see Data.station_index
+
+        :param compute: compute the index if not cached, defaults to True
+        :return: sorted station-ids, row-numbers sorted by station and offsets
+        """
+        if self._station_index is None and compute:
+            ids, codes = self.station_codes()
+            self._station_index = _station_index(ids, codes, self._is_sorted)
+        return self._station_index
+
+    @property
+    def nbytes(self) -> int:
+        return len(self) * self._data.dtype.itemsize
+
+    def memory_usage(self) -> int:
+        cached = [
+            array
+            for arrays in (self._station_codes, self._station_index)
+            if arrays is not None
+            for array in arrays
+        ]
+        return self._data.nbytes + _buffers_nbytes(cached)
+
     @property
     def variable(self) -> str:
         """Variable name for all the data
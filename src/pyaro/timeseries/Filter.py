@@ -1,47 +1,88 @@
 from functools import cache
 import json
 import logging
-import math
 import abc
 from collections import defaultdict
 import csv
 from datetime import datetime
+import importlib
+import importlib.util
 import inspect
 import pathlib
 import re
-import sys
+import threading
 import types
 from typing import Any
 
 import numpy as np
 import numpy.typing as npt
 
-from .Data import Data, Flag
-from .Station import Station
+from .Concurrency import instance_lock
+from .Data import Data, Flag, NpStructuredData, _structured_array
+from .Station import Station, StationTable
 
-from ..mathutils import haversine
+from ..mathutils import SpatialIndex, cluster_points, haversine
 
 
-try:
-    # Optional dependencies required for relative altitude filter.
-    import xarray as xr
-    from cf_units import Unit
-except ImportError:
-    pass
-
 logger = logging.getLogger(__name__)
 
 
+@cache
+def _module_available(name: str) -> bool:
+    """Check if an optional dependency is installed, without importing it.
+
+    :param name: module name
+    :return: True if the module can be imported
+    """
+    return importlib.util.find_spec(name) is not None
+
+
+def _import_optional(module: str, package: str, filter_name: str) -> types.ModuleType:
+    """Import an optional dependency on first use.
+
+    :param module: module name
+    :param package: name of the package providing the module
+    :param filter_name: name of the filter requiring the dependency
+    :raises ModuleNotFoundError: if the dependency is not installed
+    :return: the module
+    """
+    try:
+        return importlib.import_module(module)
+    except ImportError as ex:
+        raise ModuleNotFoundError(
+            f"{filter_name} filter is missing required dependency '{package}'. Please install to use this filter."
+        ) from ex
+
+
 class Filter(abc.ABC):
     """Base-class for all filters used from pyaro-Readers"""
 
     time_format = "%Y-%m-%d %H:%M:%S"
 
+    #: Data columns the per-row decision of filter_data depends on, for filters which keep
+    #: or remove each row independently of all other rows. None for all other filters, e.g.
+    #: filters changing data or depending on other rows, which are never reordered by the
+    #: FilterPlanner.
+    row_columns: tuple[str, ...] | None = None
+    #: Approximate cost per data-row relative to a simple comparison, used by the FilterPlanner.
+    relative_cost: float = 1.0
+
     def __init__(self, **kwargs):
         """constructor of Filters. All filters must have a default constructor without kwargs
         for an empty filter object"""
         return
 
+    @property
+    def _lock(self) -> threading.RLock:
+        """lock of the lazily initialized state of the filter"""
+        return instance_lock(self)
+
+    def __getstate__(self):
+        # locks can't be pickled, they are recreated on first use
+        state = self.__dict__.copy()
+        state.pop("_lazy_lock", None)
+        return state
+
     def args(self) -> dict[str, Any]:
         """retrieve the kwargs possible to retrieve a new object of this filter with filter restrictions
 
@@ -92,6 +133,26 @@ class Filter(abc.ABC):
         """
         return variables
 
+    def prepare(self, stations: dict[str, Station], variables: list[str]) -> "Filter":
+        """Precompute the parts of this filter which depend only on stations and variables,
+        e.g. before calling filter_data on the data of many variables.
+
+        :param stations: stations-dict of a reader, e.g. from a Reader.stations() call
+        :param variables: variables of a reader, e.g. from a Reader.variables() call
+        :return: a filter giving the same filter_data results as this filter for these
+            stations and variables, by default this filter itself
+        """
+        return self
+
+    def commutes_with(self, other: "Filter") -> bool:
+        """Check if applying this and the other filter in any order gives the same data.
+        Two filters commute if either of them declares so.
+
+        :param other: another filter
+        :return: True if both are row-wise filters, see row_columns
+        """
+        return self.row_columns is not None and other.row_columns is not None
+
     def __repr__(self):
         return f"{type(self).__name__}(**{self.init_kwargs()})"
 
@@ -179,11 +240,20 @@ class FilterCollection:
     """A collection of DataIndexFilters which can be applied together.
 
     :param filterlist: _description_, defaults to []
+    :param instrumentation: a pyaro.timeseries.Instrumentation.FilterInstrumentation recording
+        timing and cardinality of each filter, defaults to None
+    :param planner: a pyaro.timeseries.FilterPlanner.FilterPlanner reordering commuting
+        filters by cost and selectivity, defaults to None
+    :param cache: a pyaro.timeseries.FilterCache.FilterCache reusing filter results,
+        defaults to None
     :return: _description_
     """
 
-    def __init__(self, filterlist=[]):
+    def __init__(self, filterlist=[], instrumentation=None, planner=None, cache=None):
         self._filters = []
+        self.instrumentation = instrumentation
+        self.planner = planner
+        self.cache = cache
         tmp_filterlist = []
         if isinstance(filterlist, dict):
             for name, kwargs in filterlist.items():
@@ -211,8 +281,18 @@ class FilterCollection:
         :param variables: variables of a reader, i.e. retrieved by ts.variables()
         :return: _description_
         """
-        for fi in self._filters:
-            data = fi.filter_data(data, stations, variables)
+        filters = self._filters
+        if self.planner is not None:
+            filters = self.planner.plan(filters, data, stations, variables)
+        if self.cache is not None:
+            filters = [self.cache.cached(fi) for fi in filters]
+        for fi in filters:
+            if self.instrumentation is None:
+                data = fi.filter_data(data, stations, variables)
+            else:
+                data = self.instrumentation.apply(
+                    fi, "filter_data", data, stations, variables, variable=data.variable
+                )
         return data
 
     def filter(self, ts_reader, variable: str) -> Data:
@@ -257,8 +337,8 @@ class VariableNameFilter(Filter):
     def init_kwargs(self):
         return {
             "reader_to_new": self._reader_to_new,
-            "include": list(self._include),
-            "exclude": list(self._exclude),
+            "include": sorted(self._include),
+            "exclude": sorted(self._exclude),
         }
 
     def name(self):
@@ -282,11 +362,7 @@ class VariableNameFilter(Filter):
 
     def filter_data(self, data, stations, variables) -> Data:
         """Translate data's variable"""
-        from .Wrappers import VariableNameChangingReaderData
-
-        return VariableNameChangingReaderData(
-            data, self._reader_to_new.get(data.variable, data.variable)
-        )
+        return data.rename(self._reader_to_new.get(data.variable, data.variable))
 
     def filter_variables(self, variables: list[str]) -> list[str]:
         """change variable name and reduce variables applying include and exclude parameters
@@ -328,21 +404,124 @@ class StationReductionFilter(DataIndexFilter):
     """Abstract method for all filters, which work on reducing the number of stations only.
 
     The filtering of stations has to be implemented by subclasses, while filtering of data
-    is already implemented.
+    is already implemented. Subclasses may implement filter_stations by a vectorized
+    station_mask on the columns of a StationTable, using _filter_stations_by_mask.
     """
 
+    row_columns = ("stations",)
+
     @abc.abstractmethod
     def filter_stations(self, stations: dict[str, Station]) -> dict[str, Station]:
         pass
 
+    def station_mask(self, stations: StationTable) -> npt.NDArray[np.bool_]:
+        """Boolean mask of the stations kept by this filter.
+
+        :param stations: a StationTable
+        :return: boolean array of the size of stations
+        """
+        stat_names = _station_names(self.filter_stations(stations))
+        return np.isin(stations.names, stat_names)
+
+    def _filter_stations_by_mask(
+        self, stations: dict[str, Station]
+    ) -> dict[str, Station]:
+        """Implementation of filter_stations using station_mask.
+
+        :param stations: dict of stations or a StationTable
+        :return: a StationTable if stations is a StationTable, otherwise a dict
+        """
+        table = StationTable.from_stations(stations)
+        mask = self.station_mask(table)
+        if isinstance(stations, StationTable):
+            return table.take(mask)
+        return {name: stations[name] for name in table.names[mask].tolist()}
+
     def filter_data_idx(
         self, data: Data, stations: dict[str, Station], variables: list[str]
     ):
-        stat_names = self.filter_stations(stations).keys()
-        dstations = data.stations
-        stat_names = np.fromiter(stat_names, dtype=dstations.dtype)
-        index = np.isin(dstations, stat_names)
-        return index
+        stat_names = _station_names(self.filter_stations(stations))
+        return _data_station_rows(data, stat_names)
+
+    def prepare(self, stations: dict[str, Station], variables: list[str]) -> Filter:
+        return _PreparedStationReductionFilter(self, stations)
+
+
+def _data_station_mask(data: Data, stat_names: np.ndarray) -> npt.NDArray[np.bool_]:
+    """Boolean mask of the data-rows at the given stations, using a lookup table on
+    the integer-coded stations of the data"""
+    ids, codes = data.station_codes()
+    return np.isin(ids, stat_names)[codes]
+
+
+# maximum fraction of rows selected by row-ranges instead of a boolean mask
+_STATION_RANGES_FRACTION = 0.125
+
+
+def _data_station_rows(data: Data, stat_names: np.ndarray) -> np.ndarray:
+    """Index of the data-rows at the given stations. If the station-index of the
+    data is available and few rows are selected, the rows are gathered from the
+    ranges of the stations, otherwise a boolean mask is used."""
+    index = data.station_index(compute=False)
+    if index is None:
+        return _data_station_mask(data, stat_names)
+    ids, order, offsets = index
+    keep = np.isin(ids, stat_names)
+    counts = np.diff(offsets)[keep]
+    total = counts.sum()
+    if total > _STATION_RANGES_FRACTION * len(data):
+        return keep[data.station_codes()[1]]
+    # positions offsets[i] ... offsets[i+1] in order, for all kept stations i
+    starts = np.repeat(offsets[:-1][keep] - np.cumsum(counts) + counts, counts)
+    return np.sort(order[starts + np.arange(total)])
+
+
+def _station_names(stations: dict[str, Station]) -> np.ndarray:
+    """station-ids of a stations-dict as numpy array"""
+    if isinstance(stations, StationTable):
+        return stations.names
+    return np.array(list(stations.keys()), dtype=str)
+
+
+class _PreparedStationReductionFilter(StationReductionFilter):
+    """A StationReductionFilter with the filtered stations computed once for a
+    fixed stations-dict, see Filter.prepare.
+
+    :param filter: the original filter
+    :param stations: the stations-dict the filter is prepared for
+    """
+
+    def __init__(self, filter: StationReductionFilter, stations: dict[str, Station]):
+        self._filter = filter
+        self._stations = stations
+        self._filtered_stations = filter.filter_stations(stations)
+        self._names = _station_names(self._filtered_stations)
+
+    def init_kwargs(self):
+        return self._filter.init_kwargs()
+
+    def name(self):
+        return self._filter.name()
+
+    def filter_stations(self, stations: dict[str, Station]) -> dict[str, Station]:
+        if stations is self._stations:
+            return self._filtered_stations
+        return self._filter.filter_stations(stations)
+
+    def filter_data_idx(
+        self, data: Data, stations: dict[str, Station], variables: list[str]
+    ):
+        if stations is not self._stations:
+            return self._filter.filter_data_idx(data, stations, variables)
+        return _data_station_rows(data, self._names)
+
+    def prepare(self, stations: dict[str, Station], variables: list[str]) -> Filter:
+        if stations is self._stations:
+            return self
+        return self._filter.prepare(stations, variables)
+
+    def __repr__(self):
+        return repr(self._filter)
 
 
 @registered_filter
@@ -353,7 +532,7 @@ class StationFilter(StationReductionFilter):
         return
 
     def init_kwargs(self):
-        return {"include": list(self._include), "exclude": list(self._exclude)}
+        return {"include": sorted(self._include), "exclude": sorted(self._exclude)}
 
     def name(self):
         return "stations"
@@ -366,8 +545,25 @@ class StationFilter(StationReductionFilter):
             return False
         return True
 
+    def station_mask(self, stations: StationTable) -> npt.NDArray[np.bool_]:
+        return _include_exclude_mask(stations.names, self._include, self._exclude)
+
     def filter_stations(self, stations: dict[str, Station]) -> dict[str, Station]:
-        return {s: v for s, v in stations.items() if self.has_station(s)}
+        return self._filter_stations_by_mask(stations)
+
+
+def _include_exclude_mask(
+    values: np.ndarray, include: set, exclude: set
+) -> npt.NDArray[np.bool_]:
+    """Vectorized include/exclude test, an empty include means all included"""
+    # no dtype=values.dtype, it would truncate names longer than all values
+    if len(include) > 0:
+        mask = np.isin(values, np.array(list(include)))
+    else:
+        mask = np.ones(values.shape, dtype=bool)
+    if len(exclude) > 0:
+        mask &= ~np.isin(values, np.array(list(exclude)))
+    return mask
 
 
 @registered_filter
@@ -384,7 +580,7 @@ class CountryFilter(StationReductionFilter):
         return
 
     def init_kwargs(self):
-        return {"include": list(self._include), "exclude": list(self._exclude)}
+        return {"include": sorted(self._include), "exclude": sorted(self._exclude)}
 
     def name(self):
         return "countries"
@@ -397,8 +593,15 @@ class CountryFilter(StationReductionFilter):
             return False
         return True
 
+    def station_mask(self, stations: StationTable) -> npt.NDArray[np.bool_]:
+        # decide once per country, then gather per station
+        keep = _include_exclude_mask(
+            stations.unique_countries, self._include, self._exclude
+        )
+        return keep[stations.country_codes]
+
     def filter_stations(self, stations: dict[str, Station]) -> dict[str, Station]:
-        return {s: v for s, v in stations.items() if self.has_country(v.country)}
+        return self._filter_stations_by_mask(stations)
 
 
 class BoundingBoxException(Exception):
@@ -454,7 +657,7 @@ class BoundingBoxFilter(StationReductionFilter):
         return True
 
     def init_kwargs(self):
-        return {"include": list(self._include), "exclude": list(self._exclude)}
+        return {"include": sorted(self._include), "exclude": sorted(self._exclude)}
 
     def name(self):
         return "bounding_boxes"
@@ -489,13 +692,195 @@ class BoundingBoxFilter(StationReductionFilter):
 
         return inside_include & outside_exclude
 
+    def contains(
+        self, latitudes: np.ndarray, longitudes: np.ndarray
+    ) -> npt.NDArray[np.bool_]:
+        """Vectorized version of has_location.
+
+        :param latitudes: latitude coordinates in degree_north [-90, 90]
+        :param longitudes: longitude coordinates in degree_east [-180, 180]
+        :return: boolean array
+        """
+        if len(self._include) == 0:
+            mask = np.ones(latitudes.shape, dtype=bool)
+        else:
+            mask = np.zeros(latitudes.shape, dtype=bool)
+            for n, e, s, w in self._include:
+                mask |= (
+                    (s <= latitudes)
+                    & (latitudes <= n)
+                    & (w <= longitudes)
+                    & (longitudes <= e)
+                )
+        for n, e, s, w in self._exclude:
+            mask &= ~(
+                (s <= latitudes)
+                & (latitudes <= n)
+                & (w <= longitudes)
+                & (longitudes <= e)
+            )
+        return mask
+
+    def station_mask(self, stations: StationTable) -> npt.NDArray[np.bool_]:
+        return self.contains(stations.latitudes, stations.longitudes)
+
     def filter_stations(self, stations: dict[str, Station]) -> dict[str, Station]:
+        return self._filter_stations_by_mask(stations)
+
+
+@registered_filter
+class WithinRadiusFilter(StationReductionFilter):
+    """Filter keeping the stations within a great-circle distance of any of the given
+    points, e.g. the locations of a campaign or the grid-points of a model domain.
+
+    :param points: list of (latitude, longitude) tuples in degrees, defaults to [],
+        meaning no filtering
+    :param radius: radius around the points in meters, defaults to 0
+    :param exclude: remove the stations within the radius instead of keeping them,
+        defaults to False
+    """
+
+    def __init__(
+        self,
+        points: list[tuple[float, float]] = [],
+        radius: float = 0,
+        exclude: bool = False,
+    ):
+        self._points = [(float(lat), float(lon)) for lat, lon in points]
+        self._radius = radius
+        self._exclude = exclude
+        self._index = None
+
+    def init_kwargs(self):
         return {
-            s: v
-            for s, v in stations.items()
-            if self.has_location(v.latitude, v.longitude)
+            "points": sorted(self._points),
+            "radius": self._radius,
+            "exclude": self._exclude,
         }
 
+    def name(self):
+        return "within_radius"
+
+    @property
+    def index(self) -> SpatialIndex:
+        """spatial index of the points"""
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    points = np.array(self._points, dtype=np.float64).reshape(-1, 2)
+                    self._index = SpatialIndex(points[:, 0], points[:, 1])
+        return self._index
+
+    def station_mask(self, stations: StationTable) -> npt.NDArray[np.bool_]:
+        if len(self._points) == 0:
+            # like all filters, a no-op with default arguments
+            return np.ones(len(stations), dtype=bool)
+        distances, _ = self.index.query(stations.latitudes, stations.longitudes)
+        mask = distances <= self._radius
+        if self._exclude:
+            return ~mask
+        return mask
+
+    def filter_stations(self, stations: dict[str, Station]) -> dict[str, Station]:
+        return self._filter_stations_by_mask(stations)
+
+
+@registered_filter
+class ColocatedStationFilter(Filter):
+    """Merge stations reported under several station-ids at the same site into one
+    canonical station, the first station-id in sorted order of each group.
+
+    Stations are grouped if they are within the horizontal distance and altitude
+    difference of each other, also transitively. The other stations of a group are
+    removed, and their data is assigned to the canonical station and its coordinates.
+    Data-rows reported at several of the merged stations are kept, use the duplicates
+    filter afterwards to remove them.
+
+    :param distance: maximum horizontal distance in meters, defaults to 10
+    :param altitude: maximum altitude difference in meters, stations with unknown
+        altitude are compared horizontally only, defaults to 10
+    """
+
+    def __init__(self, distance: float = 10, altitude: float = 10):
+        self._distance = distance
+        self._altitude = altitude
+        self._prepared = None
+
+    def init_kwargs(self):
+        return {"distance": self._distance, "altitude": self._altitude}
+
+    def name(self):
+        return "colocated_stations"
+
+    def canonical_stations(
+        self, stations: dict[str, Station]
+    ) -> tuple[StationTable, np.ndarray]:
+        """Group the stations.
+
+        :param stations: dict of stations or a StationTable
+        :return: the stations sorted by station-id as StationTable, and for each of these
+            stations the index of its canonical station
+        """
+        if self._prepared is not None and self._prepared[0] is stations:
+            return self._prepared[1]
+        table = StationTable.from_stations(stations)
+        table = table.take(np.argsort(table.names, kind="stable"))
+        canonical = cluster_points(
+            table.latitudes,
+            table.longitudes,
+            self._distance,
+            altitudes=table.altitudes,
+            max_altitude_difference=self._altitude,
+        )
+        return table, canonical
+
+    def filter_stations(self, stations: dict[str, Station]) -> dict[str, Station]:
+        table, canonical = self.canonical_stations(stations)
+        names = table.names[canonical == np.arange(len(table))]
+        if isinstance(stations, StationTable):
+            return stations.take(np.isin(stations.names, names))
+        return {name: stations[name] for name in names.tolist()}
+
+    def filter_data(
+        self, data: Data, stations: dict[str, Station], variables: list[str]
+    ) -> Data:
+        table, canonical = self.canonical_stations(stations)
+        ids, codes = data.station_codes()
+        # position of the data-stations in the table, len(table) for unknown stations
+        pos = np.searchsorted(table.names, ids)
+        known = pos < len(table)
+        known[known] = table.names[pos[known]] == ids[known]
+        merged = np.zeros(len(ids), dtype=bool)
+        merged[known] = canonical[pos[known]] != pos[known]
+        if not np.any(merged):
+            return data
+        target_pos = canonical[pos[merged]]
+        rows = merged[codes]
+
+        array = _structured_array(data)
+        # single pass over all merged rows, looked up by the station-codes
+        new_ids = ids.copy()
+        new_ids[merged] = table.names[target_pos]
+        array["stations"][rows] = new_ids[codes[rows]]
+        for key, column in (
+            ("latitudes", table.latitudes),
+            ("longitudes", table.longitudes),
+            ("altitudes", table.altitudes),
+        ):
+            values = np.zeros(len(ids), dtype=column.dtype)
+            values[merged] = column[target_pos]
+            array[key][rows] = values[codes[rows]]
+        result = NpStructuredData()
+        result.set_data(data.variable, data.units, array)
+        unique_ids, inverse = np.unique(new_ids, return_inverse=True)
+        result._station_codes = (unique_ids, inverse.reshape(-1)[codes])
+        return result
+
+    def prepare(self, stations: dict[str, Station], variables: list[str]) -> Filter:
+        prepared = ColocatedStationFilter(**self.init_kwargs())
+        prepared._prepared = (stations, self.canonical_stations(stations))
+        return prepared
+
 
 @registered_filter
 class FlagFilter(DataIndexFilter):
@@ -505,6 +890,9 @@ class FlagFilter(DataIndexFilter):
     :param exclude: flags to exclude, defaults to [], meaning none
     """
 
+    row_columns = ("flags",)
+    relative_cost = 0.5
+
     def __init__(self, include: list[Flag] = [], exclude: list[Flag] = []):
         self._include = set(include)
         if len(include) == 0:
@@ -513,13 +901,14 @@ class FlagFilter(DataIndexFilter):
             all_include = self._include
         self._exclude = set(exclude)
         self._valid = all_include.difference(self._exclude)
+        self._valid_array = np.fromiter(self._valid, dtype=np.int16)
         return
 
     def name(self):
         return "flags"
 
     def init_kwargs(self):
-        return {"include": list(self._include), "exclude": list(self._exclude)}
+        return {"include": sorted(self._include), "exclude": sorted(self._exclude)}
 
     def usable_flags(self):
         return self._valid
@@ -527,8 +916,7 @@ class FlagFilter(DataIndexFilter):
     def filter_data_idx(
         self, data: Data, stations: dict[str, Station], variables: list[str]
     ):
-        validflags = np.fromiter(self._valid, dtype=data.flags.dtype)
-        index = np.isin(data.flags, validflags)
+        index = np.isin(data.flags, self._valid_array)
         return index
 
 
@@ -575,6 +963,8 @@ class TimeBoundsFilter(DataIndexFilter):
 
     """
 
+    row_columns = ("start_times", "end_times")
+
     def __init__(
         self,
         start_include: list[TimeBound] = [],
@@ -630,8 +1020,8 @@ class TimeBoundsFilter(DataIndexFilter):
             "start_exclude": self._datetime_list_to_str_list(self._start_exclude),
             "startend_include": self._datetime_list_to_str_list(self._startend_include),
             "startend_exclude": self._datetime_list_to_str_list(self._startend_exclude),
-            "end_include": self._datetime_list_to_str_list(self._startend_include),
-            "end_exclude": self._datetime_list_to_str_list(self._startend_exclude),
+            "end_include": self._datetime_list_to_str_list(self._end_include),
+            "end_exclude": self._datetime_list_to_str_list(self._end_exclude),
         }
 
     def _index_from_include_exclude(
@@ -726,9 +1116,13 @@ class TimeVariableStationFilter(DataIndexFilter):
 
     """
 
+    row_columns = ("stations", "start_times")
+    relative_cost = 2.0
+
     def __init__(self, exclude=[], exclude_from_csvfile=""):
         csvexclude = self._excludes_from_csv(exclude_from_csvfile)
         self._exclude = self._order_exclude(exclude + csvexclude)
+        self._exclude_arrays = self._parse_exclude(self._exclude)
 
     def _excludes_from_csv(self, file):
         csvexcludes = []
@@ -766,6 +1160,28 @@ class TimeVariableStationFilter(DataIndexFilter):
             retval[variable][start_time][end_time].append(station)
         return retval
 
+    def _parse_exclude(self, exclude):
+        """Parse the ordered excludes once to a dict of:
+        [variable] -> list[(start_time, end_time, stations-array)]
+
+        :param exclude: ordered excludes, see _order_exclude
+        """
+        retval = {}
+        for variable, start_times in exclude.items():
+            retval[variable] = []
+            for start_time, end_times in start_times.items():
+                start_time_dt = np.datetime64(
+                    datetime.strptime(start_time, self.time_format)
+                )
+                for end_time, stations in end_times.items():
+                    end_time_dt = np.datetime64(
+                        datetime.strptime(end_time, self.time_format)
+                    )
+                    retval[variable].append(
+                        (start_time_dt, end_time_dt, np.array(stations, dtype=str))
+                    )
+        return retval
+
     def init_kwargs(self):
         retval = []
         for var, start_times in sorted(self._exclude.items()):
@@ -785,18 +1201,16 @@ class TimeVariableStationFilter(DataIndexFilter):
     ):
         idx = data.start_times.astype(bool)
         idx |= True
-        if data.variable in self._exclude:
-            for start_time, end_times in self._exclude[data.variable].items():
-                start_time_dt = datetime.strptime(start_time, self.time_format)
-                for end_time, stations in end_times.items():
-                    end_time_dt = datetime.strptime(end_time, self.time_format)
-                    dstations = data.stations
-                    stat_names = np.fromiter(stations, dtype=dstations.dtype)
-                    exclude_idx = np.isin(dstations, stat_names)
-                    exclude_idx &= (start_time_dt <= data.start_times) & (
-                        end_time_dt > data.start_times
-                    )
-                    idx &= np.logical_not(exclude_idx)
+        if data.variable in self._exclude_arrays:
+            dstart_times = data.start_times
+            for start_time_dt, end_time_dt, stat_names in self._exclude_arrays[
+                data.variable
+            ]:
+                exclude_idx = _data_station_mask(data, stat_names)
+                exclude_idx &= (start_time_dt <= dstart_times) & (
+                    end_time_dt > dstart_times
+                )
+                idx &= np.logical_not(exclude_idx)
         return idx
 
 
@@ -811,10 +1225,17 @@ class DuplicateFilter(DataIndexFilter):
     """
 
     default_keys = ["stations", "start_times", "end_times"]
+    relative_cost = 20.0
 
     def __init__(self, duplicate_keys: list[str] | None = None):
         self._keys = duplicate_keys
 
+    def commutes_with(self, other: Filter) -> bool:
+        """Row-wise filters commute with the duplicate filter if they only depend on the
+        duplicate keys, since they then keep or remove all duplicates together."""
+        keys = self.default_keys if self._keys is None else self._keys
+        return other.row_columns is not None and set(other.row_columns) <= set(keys)
+
     def init_kwargs(self):
         if self._keys is None:
             return {}
@@ -831,8 +1252,37 @@ class DuplicateFilter(DataIndexFilter):
             xkeys = self.default_keys
         else:
             xkeys = self._keys
+        if data.is_sorted and set(xkeys) == set(self.default_keys):
+            return self._sorted_unique_idx(data)
         return np.unique(data[xkeys], return_index=True)[1]
 
+    def _sorted_unique_idx(self, data: Data) -> np.ndarray:
+        """Index of the first of the duplicates for data sorted by station and
+        start_time, where duplicates are within runs of equal station and start_time.
+
+        :return: increasing index, keeping the data sorted
+        """
+        codes = data.station_codes()[1]
+        start_times = data.start_times
+        keep = np.ones(len(data), dtype=bool)
+        # rows continuing a run of equal station and start_time
+        continues = (codes[1:] == codes[:-1]) & (start_times[1:] == start_times[:-1])
+        if not np.any(continues):
+            return np.flatnonzero(keep)
+        run_ids = np.cumsum(np.concatenate([[True], ~continues]))
+        in_run = np.zeros(len(data), dtype=bool)
+        in_run[1:] = continues
+        in_run[:-1] |= continues
+        # compare the end_times only within the runs, first occurrences stay first
+        rows = np.flatnonzero(in_run)
+        end_times = data.end_times[rows]
+        order = np.lexsort((end_times, run_ids[rows]))
+        duplicate = (run_ids[rows][order][1:] == run_ids[rows][order][:-1]) & (
+            end_times[order][1:] == end_times[order][:-1]
+        )
+        keep[rows[order][1:][duplicate]] = False
+        return np.flatnonzero(keep)
+
 
 @registered_filter
 class TimeResolutionFilter(DataIndexFilter):
@@ -862,6 +1312,8 @@ class TimeResolutionFilter(DataIndexFilter):
         year=(360 * 24 * 60 * 60, 370 * 24 * 60 * 60),
     )
 
+    row_columns = ("start_times", "end_times")
+
     def __init__(self, resolutions: list[str] = []):
         self._resolutions = resolutions
         self._minmax = self._resolve_resolutions()
@@ -935,28 +1387,19 @@ class AltitudeFilter(StationReductionFilter):
     def name(self):
         return "altitude"
 
-    def filter_stations(self, stations: dict[str, Station]) -> dict[str, Station]:
+    def station_mask(self, stations: StationTable) -> npt.NDArray[np.bool_]:
+        altitudes = stations.altitudes
+        mask = np.ones(altitudes.shape, dtype=bool)
         if self._min_altitude is not None:
-            stations = {
-                n: s
-                for n, s in stations.items()
-                if (
-                    not math.isnan(s["altitude"])
-                    and s["altitude"] >= self._min_altitude
-                )
-            }
-
+            mask &= altitudes >= self._min_altitude
         if self._max_altitude is not None:
-            stations = {
-                n: s
-                for n, s in stations.items()
-                if (
-                    not math.isnan(s["altitude"])
-                    and s["altitude"] <= self._max_altitude
-                )
-            }
+            mask &= altitudes <= self._max_altitude
+        return mask
 
-        return stations
+    def filter_stations(self, stations: dict[str, Station]) -> dict[str, Station]:
+        if self._min_altitude is None and self._max_altitude is None:
+            return stations
+        return self._filter_stations_by_mask(stations)
 
 
 @registered_filter
@@ -1003,11 +1446,11 @@ class RelativeAltitudeFilter(StationFilter):
         topo_var: str = "topography",
         rdiff: float = 0,
     ):
-        if "cf_units" not in sys.modules:
+        if not _module_available("cf_units"):
             logger.info(
                 "relaltitude filter is missing dependency 'cf-units'. Please install to use."
             )
-        if "xarray" not in sys.modules:
+        if not _module_available("xarray"):
             logger.info(
                 "relaltitude filter is missing dependency 'xarray'. Please install to use."
             )
@@ -1028,7 +1471,10 @@ class RelativeAltitudeFilter(StationFilter):
         :meta private:
         """
         if self._UNITS_METER is None:
-            self._UNITS_METER = Unit("m")
+            cf_units = _import_optional("cf_units", "cf-units", "relaltitude")
+            with self._lock:
+                if self._UNITS_METER is None:
+                    self._UNITS_METER = cf_units.Unit("m")
         return self._UNITS_METER
 
     @property
@@ -1041,30 +1487,27 @@ class RelativeAltitudeFilter(StationFilter):
 
         :meta private:
         """
-        if "cf_units" not in sys.modules:
-            raise ModuleNotFoundError(
-                "relaltitude filter is missing required dependency 'cf-units'. Please install to use this filter."
-            )
-        if "xarray" not in sys.modules:
-            raise ModuleNotFoundError(
-                "relaltitude filter is missing required dependency 'xarray'. Please install to use this filter."
-            )
+        _import_optional("cf_units", "cf-units", self.name())
+        xr = _import_optional("xarray", "xarray", self.name())
 
         if self._topography is None:
             if self._topo_file is None:
                 raise FilterException(
                     f"No topography data provided (topo_file='{self._topo_file}'). Relative elevation filtering will not be applied."
                 )
-            else:
-                try:
-                    with xr.open_dataset(self._topo_file) as topo:
-                        self._topography = self._convert_altitude_to_meters(topo)
-                        lat, lon = self._find_lat_lon_variables(topo)
-                        self._extract_bounding_box(lat, lon)
-                except Exception as ex:
-                    raise FilterException(
-                        f"Cannot read topography from '{self._topo_file}:{self._topo_var}' : {ex}"
-                    )
+            with self._lock:
+                if self._topography is None:
+                    try:
+                        with xr.open_dataset(self._topo_file) as topo:
+                            topography = self._convert_altitude_to_meters(topo)
+                            lat, lon = self._find_lat_lon_variables(topo, topography)
+                            self._extract_bounding_box(lat, lon)
+                    except Exception as ex:
+                        raise FilterException(
+                            f"Cannot read topography from '{self._topo_file}:{self._topo_var}' : {ex}"
+                        )
+                    # set last, other threads use the bounding box once this is set
+                    self._topography = topography
         return self._topography
 
     def _convert_altitude_to_meters(self, topo_xr):
@@ -1078,7 +1521,8 @@ class RelativeAltitudeFilter(StationFilter):
         :return xr.DataArray
         """
         # Convert altitude to meters
-        units = Unit(topo_xr[self._topo_var].units)
+        cf_units = _import_optional("cf_units", "cf-units", self.name())
+        units = cf_units.Unit(topo_xr[self._topo_var].units)
         if units.is_convertible(self.UNITS_METER):
             topography = topo_xr[self._topo_var]
             topography.values = self.UNITS_METER.convert(
@@ -1091,7 +1535,7 @@ class RelativeAltitudeFilter(StationFilter):
             )
         return topography
 
-    def _find_lat_lon_variables(self, topo_xr):
+    def _find_lat_lon_variables(self, topo_xr, topography):
         """
         Find and load DataArrays from topo which represent the latitude and longitude
         dimensions in the topography data.
@@ -1099,10 +1543,11 @@ class RelativeAltitudeFilter(StationFilter):
         These are assigned to self._lat, self._lon, respectively for later use.
 
         :param topo_xr: xr.Dataset of topography
+        :param topography: topography converted to meters
         :return: lat, lon DataArrays
         """
-        for var_name in self._topography.coords:
-            unit_str = self._topography[var_name].attrs.get("units", None)
+        for var_name in topography.coords:
+            unit_str = topography[var_name].attrs.get("units", None)
             if unit_str in self._UNITS_LAT:
                 lat = topo_xr[var_name]
                 continue
@@ -1137,6 +1582,7 @@ class RelativeAltitudeFilter(StationFilter):
     def _gridded_altitude_from_lat_lon(
         self, lat: np.ndarray, lon: np.ndarray
     ) -> np.ndarray:
+        xr = _import_optional("xarray", "xarray", self.name())
         altitude = self.topography.sel(
             {
                 "lat": xr.DataArray(lat, dims="latlon"),
@@ -1173,21 +1619,13 @@ class RelativeAltitudeFilter(StationFilter):
     def name(self):
         return "relaltitude"
 
-    def filter_stations(self, stations: dict[str, Station]) -> dict[str, Station]:
+    def station_mask(self, stations: StationTable) -> npt.NDArray[np.bool_]:
         if self.topography is None:
-            return stations
-
-        names = np.ndarray(len(stations), dtype=np.dtypes.StrDType)
-        lats = np.ndarray(len(stations), dtype=np.float64)
-        lons = np.ndarray(len(stations), dtype=np.float64)
-        alts = np.ndarray(len(stations), dtype=np.float64)
+            return np.ones(len(stations), dtype=bool)
 
-        for i, name in enumerate(stations):
-            station = stations[name]
-            names[i] = name
-            lats[i] = station["latitude"]
-            lons[i] = station["longitude"]
-            alts[i] = station["altitude"]
+        lats = stations.latitudes
+        lons = stations.longitudes
+        alts = stations.altitudes
 
         out_of_bounds_mask = np.logical_or(
             np.logical_or(lons < self._boundary_west, lons > self._boundary_east),
@@ -1202,11 +1640,7 @@ class RelativeAltitudeFilter(StationFilter):
 
         within_rdiff_mask = self._is_close(topo, alts)
 
-        mask = np.logical_and(~out_of_bounds_mask, within_rdiff_mask)
-
-        selected_names = names[mask]
-
-        return {name: stations[name] for name in selected_names}
+        return np.logical_and(~out_of_bounds_mask, within_rdiff_mask)
 
 
 @registered_filter
@@ -1275,11 +1709,11 @@ class ValleyFloorRelativeAltitudeFilter(StationFilter):
         upper: float | None = None,
         keep_nan: bool = True,
     ):
-        if "cf_units" not in sys.modules:
+        if not _module_available("cf_units"):
             logger.info(
                 "valleyfloor_relaltitude filter is missing required dependency 'cf-units'. Please install to use this filter."
             )
-        if "xarray" not in sys.modules:
+        if not _module_available("xarray"):
             logger.info(
                 "valleyfloor_relaltitude filter is missing required dependency 'xarray'. Please install to use this filter."
             )
@@ -1367,76 +1801,70 @@ class ValleyFloorRelativeAltitudeFilter(StationFilter):
 
         return file_path
 
-    def _batch_stations(
-        self, stations: dict[str, Station]
-    ) -> dict[pathlib.Path, dict[str, Station]]:
-        """Batches a stations dict according to the topography file that needs to be read in order
+    def _batch_stations(self, stations: StationTable) -> dict[pathlib.Path, np.ndarray]:
+        """Batches a StationTable according to the topography file that needs to be read in order
         to calculate relative altitude.
 
-        :param stations: Dict mapping of str id to Station (as passed to .filter_stations()).
+        :param stations: StationTable (as passed to .station_mask()).
 
-        :return: A dict mapping the topography file path to a Stations dict.
+        :return: A dict mapping the topography file path to the row-indices of the stations.
         """
         result = {}
-        for k, v in stations.items():
-            topo_file = self._get_topo_file_path(v.latitude, v.longitude)
+        for i, (lat, lon) in enumerate(
+            zip(stations.latitudes.tolist(), stations.longitudes.tolist())
+        ):
+            topo_file = self._get_topo_file_path(lat, lon)
 
             if topo_file not in result:
-                result[topo_file] = {}
+                result[topo_file] = []
 
-            result[topo_file][k] = v
+            result[topo_file].append(i)
 
-        return result
+        return {k: np.array(v, dtype=np.intp) for k, v in result.items()}
 
-    def filter_stations(self, stations: dict[str, Station]) -> dict[str, Station]:
+    def station_mask(self, stations: StationTable) -> npt.NDArray[np.bool_]:
         if self._topo is None or (self._upper is None and self._lower is None):
-            # Default initialized filter should not do anything, so return unfiltered stations.
-            return stations
+            # Default initialized filter should not do anything, so keep all stations.
+            return np.ones(len(stations), dtype=bool)
 
-        if "cf_units" not in sys.modules:
-            raise ModuleNotFoundError(
-                "valleyfloor_relaltitude filter is missing required dependency 'cf-units'. Please install to use this filter."
-            )
-        if "xarray" not in sys.modules:
-            raise ModuleNotFoundError(
-                "valleyfloor_relaltitude filter is missing required dependency 'xarray'. Please install to use this filter."
-            )
+        _import_optional("cf_units", "cf-units", self.name())
+        xr = _import_optional("xarray", "xarray", self.name())
         if not self._topo.exists():
             raise FileNotFoundError(
                 f"Provided location for topography data ({self._topo}) does not exist. It should be either a .nc file, or a folder with several .nc files and a metadata.json file."
             )
 
-        filtered_stations = {}
+        mask = np.zeros(len(stations), dtype=bool)
 
         batches = self._batch_stations(stations)
-        for topo_file, stations in batches.items():
+        for topo_file, idx in batches.items():
             topo = xr.load_dataset(topo_file)
-            names = np.array([k for k in stations.keys()])
-            latitudes = np.array([s.latitude for s in stations.values()])
-            longitudes = np.array([s.longitude for s in stations.values()])
-            altitudes = np.array([s.altitude for s in stations.values()])
-            stats = np.array(list(stations.values()))
 
             ralt = self._calculate_relative_altitude(
-                latitudes,
-                longitudes,
+                stations.latitudes[idx],
+                stations.longitudes[idx],
                 radius=self._radius,
-                altitudes=altitudes,
+                altitudes=stations.altitudes[idx],
                 topo=topo,
             )
 
-            mask = np.ones_like(ralt)
+            batch_mask = np.ones_like(ralt, dtype=bool)
             if self._lower is not None:
-                mask = np.logical_and(mask, (ralt >= self._lower))
+                batch_mask = np.logical_and(batch_mask, (ralt >= self._lower))
             if self._upper is not None:
-                mask = np.logical_and(mask, (ralt <= self._upper))
+                batch_mask = np.logical_and(batch_mask, (ralt <= self._upper))
             if self._keep_nan:
-                mask = np.logical_or(mask, np.isnan(ralt))
+                batch_mask = np.logical_or(batch_mask, np.isnan(ralt))
 
-            for name, stat in zip(names[mask], stats[mask]):
-                filtered_stations[name] = stat
+            mask[idx] = batch_mask
 
-        return filtered_stations
+        return mask
+
+    def filter_stations(self, stations: dict[str, Station]) -> dict[str, Station]:
+        if self._topo is None or (self._upper is None and self._lower is None):
+            # Default initialized filter should not do anything, so return unfiltered stations.
+            return stations
+        return self._filter_stations_by_mask(stations)
 
     def _calculate_relative_altitude(
         self,
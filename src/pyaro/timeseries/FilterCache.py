@@ -0,0 +1,360 @@
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import pathlib
+import threading
+import weakref
+
+import numpy as np
+
+from .Concurrency import SingleFlight
+from .Data import Data
+from .Filter import DataIndexFilter, Filter
+from .Station import Station, StationTable
+
+# stations-dicts can't be weakly referenced, the fingerprints of the last few
+# dicts are kept with a strong reference
+_MAX_DICT_FINGERPRINTS = 8
+
+
+def _hash_array(h, array: np.ndarray) -> None:
+    array = np.ascontiguousarray(array)
+    h.update(f"{array.dtype.str}{array.shape}".encode())
+    # datetime64 doesn't support the buffer protocol, so hash the raw bytes
+    h.update(array.reshape(-1).view(np.uint8))
+
+
+class FilterCache:
+    """Size-bounded cache of the results of filter_data_idx and filter_stations.
+
+    Results are keyed by the filter name, the canonicalized init_kwargs of the filter
+    and a fingerprint of the data and stations, so identical filters, e.g. relaltitude
+    or valleyfloor_relaltitude, are not recomputed for the same data. Results are kept
+    in an in-memory LRU, and optionally in a directory on disk to share them between
+    sessions.
+
+    The fingerprint of unfiltered data is a hash of its content, computed once per data
+    object. Data returned by a cached filter gets a fingerprint derived from the filter
+    and its input, so filter chains are hashed only once. Data must therefore not be
+    modified in place after it has been filtered.
+
+    The cache is thread-safe and can be shared by readers used from several threads.
+    Concurrent requests of the same result are computed only once.
+
+    :param maxsize: maximum number of results kept in memory, defaults to 128
+    :param max_bytes: maximum total size of the results kept in memory, defaults to 1GB
+    :param cache_dir: directory to store results on disk, defaults to None, meaning memory only
+    :param max_disk_bytes: maximum total size of the results on disk, the least recently
+        used files are removed first, defaults to None, meaning unlimited
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        max_bytes: int = 2**30,
+        cache_dir: str | pathlib.Path | None = None,
+        max_disk_bytes: int | None = None,
+    ):
+        self._maxsize = maxsize
+        self._max_bytes = max_bytes
+        self._cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._nbytes = 0
+        self._cache_dir = None
+        if cache_dir is not None:
+            self._cache_dir = pathlib.Path(cache_dir)
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+        self._max_disk_bytes = max_disk_bytes
+        self._fingerprints = weakref.WeakKeyDictionary()
+        self._dict_fingerprints: OrderedDict[int, tuple[dict, int, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        """Number of results in memory"""
+        return len(self._cache)
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the results in memory"""
+        return self._nbytes
+
+    def clear(self, disk: bool = False) -> None:
+        """Remove all results from memory.
+
+        :param disk: remove also the results on disk, defaults to False
+        """
+        with self._lock:
+            self._cache.clear()
+            self._nbytes = 0
+        if disk and self._cache_dir is not None:
+            for file in self._cache_dir.glob("*.npy"):
+                file.unlink(missing_ok=True)
+
+    def key(self, filter: Filter, method: str, *fingerprints: str) -> str:
+        """Cache key of a filter method applied to fingerprinted data or stations.
+
+        :param filter: the filter
+        :param method: the filter method
+        :param fingerprints: fingerprints of the arguments, see fingerprint
+        :return: a hex digest
+        """
+        kwargs = json.dumps(filter.init_kwargs(), sort_keys=True, default=str)
+        h = hashlib.sha256()
+        for part in (filter.name(), method, kwargs, *fingerprints):
+            h.update(part.encode())
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def fingerprint(self, obj: Data | dict[str, Station]) -> str:
+        """Fingerprint of data or stations, remembered for each object.
+
+        :param obj: Data or a stations-dict
+        :return: a string identifying the content
+        """
+        fp = self._remembered(obj)
+        if fp is not None:
+            return fp
+        h = hashlib.blake2b(digest_size=20)
+        if isinstance(obj, Data):
+            h.update(f"{obj.variable}\0{obj.units}\0".encode())
+            for key in obj.keys():
+                h.update(key.encode())
+                _hash_array(h, getattr(obj, key))
+        else:
+            # the keys identify the stations, not the station-field of each station
+            _hash_array(h, np.array(list(obj.keys()), dtype=str))
+            table = StationTable.from_stations(obj)
+            for key in table._field_dtypes:
+                _hash_array(h, table.column(key))
+        fp = h.hexdigest()
+        self._remember(obj, fp)
+        return fp
+
+    def _remembered(self, obj) -> str | None:
+        with self._lock:
+            try:
+                length, fp = self._fingerprints[obj]
+            except KeyError:
+                return None
+            except TypeError:
+                entry = self._dict_fingerprints.get(id(obj))
+                if entry is None or entry[0] is not obj:
+                    return None
+                self._dict_fingerprints.move_to_end(id(obj))
+                _, length, fp = entry
+        return fp if length == len(obj) else None
+
+    def _remember(self, obj, fp: str) -> None:
+        with self._lock:
+            try:
+                self._fingerprints[obj] = (len(obj), fp)
+            except TypeError:
+                # e.g. dicts can't be weakly referenced
+                self._dict_fingerprints[id(obj)] = (obj, len(obj), fp)
+                self._dict_fingerprints.move_to_end(id(obj))
+                while len(self._dict_fingerprints) > _MAX_DICT_FINGERPRINTS:
+                    self._dict_fingerprints.popitem(last=False)
+
+    def _derive(self, result, key: str) -> None:
+        if isinstance(result, Data):
+            self._remember(result, f"{key}:{result.variable}:{result.units}")
+
+    def _get(self, key: str) -> np.ndarray | None:
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+        if self._cache_dir is not None:
+            file = self._cache_dir / f"{key}.npy"
+            try:
+                result = np.load(file, allow_pickle=False)
+            except (FileNotFoundError, ValueError, OSError):
+                pass
+            else:
+                file.touch()
+                with self._lock:
+                    self.hits += 1
+                self._put_memory(key, result)
+                return result
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _put_memory(self, key: str, result: np.ndarray) -> None:
+        with self._lock:
+            old = self._cache.pop(key, None)
+            if old is not None:
+                self._nbytes -= old.nbytes
+            self._cache[key] = result
+            self._nbytes += result.nbytes
+            while self._cache and (
+                len(self._cache) > self._maxsize or self._nbytes > self._max_bytes
+            ):
+                _, old = self._cache.popitem(last=False)
+                self._nbytes -= old.nbytes
+
+    def _put(self, key: str, result: np.ndarray) -> None:
+        self._put_memory(key, result)
+        if self._cache_dir is None:
+            return
+        # write to a temporary file first, so concurrent readers never see partial results
+        file = self._cache_dir / f"{key}.npy"
+        tmp_file = self._cache_dir / f"{key}.{os.getpid()}.tmp"
+        with open(tmp_file, "wb") as fh:
+            np.save(fh, result, allow_pickle=False)
+        os.replace(tmp_file, file)
+        if self._max_disk_bytes is not None:
+            self._trim_disk()
+
+    def _trim_disk(self) -> None:
+        files = []
+        for file in self._cache_dir.glob("*.npy"):
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, file))
+        total = sum(size for _, size, _ in files)
+        for _, size, file in sorted(files, key=lambda x: x[0]):
+            if total <= self._max_disk_bytes:
+                break
+            file.unlink(missing_ok=True)
+            total -= size
+
+    def filter_data_idx(
+        self,
+        filter: DataIndexFilter,
+        data: Data,
+        stations: dict[str, Station],
+        variables: list[str],
+    ) -> np.ndarray:
+        """Cached version of filter.filter_data_idx.
+
+        :return: a index for Data.slice(idx)
+        """
+        key = self._data_idx_key(filter, data, stations, variables)
+        return self._filter_data_idx(filter, data, stations, variables, key)
+
+    def _data_idx_key(self, filter, data, stations, variables) -> str:
+        return self.key(
+            filter,
+            "filter_data_idx",
+            self.fingerprint(data),
+            self.fingerprint(stations),
+            json.dumps(list(variables)),
+        )
+
+    def _filter_data_idx(self, filter, data, stations, variables, key) -> np.ndarray:
+        def compute():
+            idx = self._get(key)
+            if idx is None:
+                idx = np.asarray(filter.filter_data_idx(data, stations, variables))
+                self._put(key, idx)
+            return idx
+
+        return self._flight.do(key, compute)
+
+    def filter_data(
+        self,
+        filter: Filter,
+        data: Data,
+        stations: dict[str, Station],
+        variables: list[str],
+    ) -> Data:
+        """Cached version of filter.filter_data. Only the data-index of DataIndexFilters
+        is cached, other filters are applied directly.
+
+        :return: filtered data
+        """
+        if isinstance(filter, DataIndexFilter):
+            key = self._data_idx_key(filter, data, stations, variables)
+            idx = self._filter_data_idx(filter, data, stations, variables, key)
+            result = data.slice(idx)
+        else:
+            key = self.key(filter, "filter_data", self.fingerprint(data))
+            result = filter.filter_data(data, stations, variables)
+        if result is not data:
+            self._derive(result, key)
+        return result
+
+    def filter_stations(
+        self, filter: Filter, stations: dict[str, Station]
+    ) -> dict[str, Station]:
+        """Cached version of filter.filter_stations.
+
+        :return: dict of filtered stations, a StationTable if stations is a StationTable
+        """
+        key = self.key(filter, "filter_stations", self.fingerprint(stations))
+
+        def compute():
+            names = self._get(key)
+            if names is not None:
+                return names, None
+            result = filter.filter_stations(stations)
+            if isinstance(result, StationTable):
+                names = result.names
+            else:
+                names = np.array(list(result.keys()), dtype=str)
+            self._put(key, names)
+            return names, result
+
+        names, result = self._flight.do(key, compute)
+        if result is not None:
+            return result
+        if isinstance(stations, StationTable):
+            return stations.take(np.isin(stations.names, names))
+        return {name: stations[name] for name in names.tolist()}
+
+    def cached(self, filter: Filter) -> Filter:
+        """Get a filter using this cache for filter_data and filter_stations.
+
+        :param filter: the filter
+        :return: a filter with the same name and init_kwargs
+        """
+        if isinstance(filter, _CachedFilter):
+            filter = filter._filter
+        return _CachedFilter(filter, self)
+
+
+class _CachedFilter(Filter):
+    """A filter applying another filter through a FilterCache, see FilterCache.cached
+
+    :param filter: the original filter
+    :param cache: the cache
+    """
+
+    def __init__(self, filter: Filter, cache: FilterCache):
+        self._filter = filter
+        self._cache = cache
+        self.row_columns = filter.row_columns
+        self.relative_cost = filter.relative_cost
+
+    def init_kwargs(self):
+        return self._filter.init_kwargs()
+
+    def name(self):
+        return self._filter.name()
+
+    def filter_data(
+        self, data: Data, stations: dict[str, Station], variables: list[str]
+    ) -> Data:
+        return self._cache.filter_data(self._filter, data, stations, variables)
+
+    def filter_stations(self, stations: dict[str, Station]) -> dict[str, Station]:
+        return self._cache.filter_stations(self._filter, stations)
+
+    def filter_variables(self, variables: list[str]) -> list[str]:
+        return self._filter.filter_variables(variables)
+
+    def prepare(self, stations: dict[str, Station], variables: list[str]) -> Filter:
+        return self._cache.cached(self._filter.prepare(stations, variables))
+
+    def commutes_with(self, other: Filter) -> bool:
+        return self._filter.commutes_with(other)
+
+    def __repr__(self):
+        return repr(self._filter)
@@ -0,0 +1,113 @@
+import logging
+import math
+
+import numpy as np
+
+from .Data import Data
+from .Filter import Filter
+from .Station import Station
+
+logger = logging.getLogger(__name__)
+
+
+class FilterPlanner:
+    """Reorder filters to run the cheapest and most selective filters first.
+
+    Only filters which commute (see Filter.commutes_with) are reordered, e.g. row-wise
+    filters like flags, time_bounds or station-reduction filters. Filters like
+    VariableNameFilter or other order-sensitive filters keep their position relative
+    to all filters they don't commute with, so the filtered data is the same as without
+    planning.
+
+    The selectivity of each filter is estimated by applying it to a small random sample
+    of the data, the cost from the filter's relative_cost. Filters are then ordered
+    greedily by cost / (1 - selectivity).
+
+    :param sample_size: number of data rows used to estimate the selectivity, defaults to 1000
+    :param min_rows: don't reorder data with fewer rows, where estimation costs more
+        than it gains, defaults to 100000
+    :param seed: seed of the random sample, defaults to 0
+    """
+
+    def __init__(self, sample_size: int = 1000, min_rows: int = 100_000, seed: int = 0):
+        self._sample_size = sample_size
+        self._min_rows = min_rows
+        self._seed = seed
+
+    def _sample(self, data: Data) -> Data:
+        rng = np.random.default_rng(self._seed)
+        idx = rng.choice(
+            len(data), size=min(self._sample_size, len(data)), replace=False
+        )
+        idx.sort()
+        return data.slice(idx)
+
+    def estimate(
+        self,
+        filter: Filter,
+        sample: Data,
+        stations: dict[str, Station],
+        variables: list[str],
+    ) -> tuple[float, float]:
+        """Estimate cost and selectivity of a filter.
+
+        :param filter: the filter
+        :param sample: a sample of the data to filter
+        :param stations: stations-dict of the reader
+        :param variables: variables of the reader
+        :return: relative cost per row and selectivity, the fraction of rows kept
+        """
+        if filter.row_columns is None or len(sample) == 0:
+            return filter.relative_cost, 1.0
+        kept = len(filter.filter_data(sample, stations, variables))
+        return filter.relative_cost, kept / len(sample)
+
+    def plan(
+        self,
+        filters: list[Filter],
+        data: Data,
+        stations: dict[str, Station],
+        variables: list[str],
+    ) -> list[Filter]:
+        """Get the filters in the order they should be applied to the data.
+
+        The filters are prepared for the stations and variables, see Filter.prepare.
+
+        :param filters: filters in the order given by the user
+        :param data: data to filter
+        :param stations: stations-dict of the reader
+        :param variables: variables of the reader
+        :return: prepared filters in planned order
+        """
+        filters = [fi.prepare(stations, variables) for fi in filters]
+        if len(filters) < 2 or len(data) < self._min_rows:
+            return filters
+
+        sample = self._sample(data)
+        rank = []
+        for fi in filters:
+            cost, selectivity = self.estimate(fi, sample, stations, variables)
+            if selectivity >= 1:
+                rank.append(math.inf)
+            else:
+                rank.append(cost / (1 - selectivity))
+
+        planned = []
+        remaining = list(range(len(filters)))
+        while remaining:
+            ready = [
+                j
+                for k, j in enumerate(remaining)
+                if all(
+                    filters[i].commutes_with(filters[j])
+                    or filters[j].commutes_with(filters[i])
+                    for i in remaining[:k]
+                )
+            ]
+            # ties keep the user's order
+            best = min(ready, key=lambda j: (rank[j], j))
+            planned.append(best)
+            remaining.remove(best)
+
+        logger.debug("planned filter order: %s", [filters[i].name() for i in planned])
+        return [filters[i] for i in planned]
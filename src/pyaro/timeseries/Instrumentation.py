@@ -0,0 +1,151 @@
+from dataclasses import asdict, dataclass
+import logging
+import time
+import tracemalloc
+from typing import Any, Callable
+
+import numpy as np
+
+from .Data import Data
+from .Filter import Filter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FilterMeasurement:
+    """Timing and cardinality of one filter application.
+
+    :param filter: name of the filter
+    :param method: filter method applied, e.g. filter_data, filter_stations, filter_variables
+    :param variable: variable of the data, None for stations and variables
+    :param seconds: wall time
+    :param rows_in: number of data rows before filtering, None if not applicable
+    :param rows_out: number of data rows after filtering, None if not applicable
+    :param stations_in: number of stations before filtering, for filter_data the
+        stations present in the data, None if not applicable
+    :param stations_out: number of stations after filtering, None if not applicable
+    :param bytes_allocated: peak memory allocated while filtering, None if not traced
+    """
+
+    filter: str
+    method: str
+    variable: str | None
+    seconds: float
+    rows_in: int | None = None
+    rows_out: int | None = None
+    stations_in: int | None = None
+    stations_out: int | None = None
+    bytes_allocated: int | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def _station_count(data: Data) -> int:
+    """number of stations present in the data, from the data's station codes"""
+    ids, codes = data.station_codes()
+    return int(np.count_nonzero(np.bincount(codes, minlength=len(ids))))
+
+
+class FilterInstrumentation:
+    """Opt-in instrumentation of filters, used by AutoFilterReader and FilterCollection.
+
+    Each filter application is recorded as a FilterMeasurement in the report, logged
+    at debug level to the pyaro.timeseries.Instrumentation logger, and sent to the
+    callback, e.g. to push it into a metrics system.
+
+    :param callback: function called with each FilterMeasurement, defaults to None
+    :param trace_memory: measure the memory allocated by each filter with tracemalloc,
+        this slows down filtering considerably, defaults to False. Tracing started by
+        the instrumentation is stopped by close().
+    """
+
+    def __init__(
+        self,
+        callback: Callable[[FilterMeasurement], None] | None = None,
+        trace_memory: bool = False,
+    ):
+        self._callback = callback
+        self._trace_memory = trace_memory
+        self._report: list[FilterMeasurement] = []
+        self._started_tracing = False
+
+    @property
+    def report(self) -> list[FilterMeasurement]:
+        """All measurements recorded so far"""
+        return self._report
+
+    def clear(self) -> None:
+        """Remove all measurements from the report"""
+        self._report = []
+
+    def close(self) -> None:
+        """Stop memory tracing if started by this instrumentation. The report is kept,
+        and tracing restarts if the instrumentation is used again."""
+        if self._started_tracing:
+            self._started_tracing = False
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+    def summary(self) -> dict[str, dict[str, float | int]]:
+        """Sum up the report by filter name.
+
+        :return: dict of filter name to calls, seconds, rows_removed (by filter_data)
+            and stations_removed (by filter_stations)
+        """
+        summary = {}
+        for m in self._report:
+            s = summary.setdefault(
+                m.filter,
+                {"calls": 0, "seconds": 0.0, "rows_removed": 0, "stations_removed": 0},
+            )
+            s["calls"] += 1
+            s["seconds"] += m.seconds
+            if m.rows_in is not None:
+                s["rows_removed"] += m.rows_in - m.rows_out
+            if m.method == "filter_stations" and m.stations_in is not None:
+                s["stations_removed"] += m.stations_in - m.stations_out
+        return summary
+
+    def apply(self, filter: Filter, method: str, *args, variable: str | None = None):
+        """Apply a filter method and record a measurement.
+
+        :param filter: the filter
+        :param method: name of the filter method, the first argument is the filtered object
+        :param args: arguments of the filter method
+        :param variable: variable name of the data, if any
+        :return: result of the filter method
+        """
+        if self._trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            mem_before = tracemalloc.get_traced_memory()[0]
+        start_time = time.perf_counter()
+        result = getattr(filter, method)(*args)
+        seconds = time.perf_counter() - start_time
+        measurement = FilterMeasurement(
+            filter=filter.name(), method=method, variable=variable, seconds=seconds
+        )
+        if self._trace_memory:
+            measurement.bytes_allocated = (
+                tracemalloc.get_traced_memory()[1] - mem_before
+            )
+        if isinstance(args[0], Data):
+            measurement.rows_in = len(args[0])
+            measurement.rows_out = len(result)
+            measurement.stations_in = _station_count(args[0])
+            measurement.stations_out = _station_count(result)
+        if method == "filter_stations":
+            measurement.stations_in = len(args[0])
+            measurement.stations_out = len(result)
+        self._record(measurement)
+        return result
+
+    def _record(self, measurement: FilterMeasurement) -> None:
+        self._report.append(measurement)
+        logger.debug("%s", measurement)
+        if self._callback is not None:
+            self._callback(measurement)
@@ -0,0 +1,210 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from .AutoFilterReaderEngine import AutoFilterReader
+from .Concurrency import SingleFlight
+from .Data import Data, NpStructuredData, _structured_array
+from .Reader import Reader
+from .Station import Station, StationTable
+
+
+class MultiReaderException(Exception):
+    pass
+
+
+class _LoadedSource:
+    """variables, stations, metadata and data of all variables of one reader"""
+
+    def __init__(self, reader: Reader):
+        self.metadata = reader.metadata()
+        self.variables = list(reader.variables())
+        self.stations = StationTable.from_stations(reader.stations())
+        self.data = reader.data_many(self.variables)
+
+
+def _open(source) -> tuple[Reader, bool]:
+    """the reader of a source, and whether it was opened here"""
+    if isinstance(source, Reader):
+        return source, False
+    # lazy import, pyaro.plugins imports pyaro.timeseries
+    from pyaro.plugins import open_timeseries
+
+    engine, filename_or_obj_or_url, *kwargs = source
+    kwargs = kwargs[0] if kwargs else {}
+    return open_timeseries(engine, filename_or_obj_or_url, **kwargs), True
+
+
+def _load(source) -> tuple[Reader, _LoadedSource]:
+    reader, opened = _open(source)
+    try:
+        loaded = _LoadedSource(reader)
+    finally:
+        if opened:
+            reader.close()
+    return (None if opened else reader), loaded
+
+
+def _load_source(source) -> _LoadedSource:
+    """load in a worker process, only the loaded data is sent back"""
+    return _load(source)[1]
+
+
+def _merge_stations(tables: list[StationTable]) -> StationTable:
+    """union of station tables, the first table containing a station wins"""
+    tables = [table for table in tables if len(table) > 0]
+    if len(tables) <= 1:
+        return tables[0] if tables else StationTable()
+    seen = np.array([], dtype=str)
+    parts = []
+    for table in tables:
+        table = table.take(~np.isin(table.names, seen))
+        seen = np.concatenate([seen, table.names])
+        parts.append(table)
+    return StationTable.from_columns(
+        seen,
+        np.concatenate([table.latitudes for table in parts]),
+        np.concatenate([table.longitudes for table in parts]),
+        np.concatenate([table.altitudes for table in parts]),
+        country=np.concatenate([table.countries for table in parts]),
+        long_name=np.concatenate([table.column("long_name") for table in parts]),
+        url=np.concatenate([table.column("url") for table in parts]),
+        metadata=[table[name].metadata for table in parts for name in table],
+    )
+
+
+class MultiReader(AutoFilterReader):
+    """A pyaro.timeseries.Reader combining several readers into one. Example:
+
+        with MultiReader(
+            [
+                ("csv_timeseries", "institute1.csv"),
+                ("csv_timeseries", "institute2.csv.gz", {"filters": []}),
+            ],
+            filters={"flags": {"include": [0]}},
+        ) as ts:
+            data = ts.data("SOx")
+
+    All readers are opened and loaded on initialization, concurrently in a thread-
+    or process-pool. The variables and stations are the union of all readers, with
+    the station of the first reader if several readers contain the same station.
+    The data of a variable is the concatenation of the data of all readers,
+    in the order of the readers. The filters are applied once on the merged data.
+    """
+
+    def __init__(
+        self,
+        readers: list,
+        filters=[],
+        max_workers: int | None = None,
+        processes: bool = False,
+    ):
+        """Open and load all readers.
+
+        :param readers: list of pyaro.timeseries.Reader instances or tuples of
+            (engine, filename_or_obj_or_url) or (engine, filename_or_obj_or_url,
+            kwargs) which are opened with pyaro.open_timeseries
+        :param filters: list of filters, or dict of (name, kwargs) for FilterFactory,
+            applied on the merged data
+        :param max_workers: load the readers with this many threads or processes,
+            defaults to None, meaning one per reader, limited by the number of cpus,
+            0 loads the readers sequentially
+        :param processes: load in a process pool instead of a thread pool, only
+            possible with tuples, since opened readers cannot be sent to another
+            process, defaults to False
+        :raises MultiReaderException: on opened readers with processes
+        """
+        self._set_filters(filters)
+        readers = list(readers)
+        if processes and any(isinstance(x, Reader) for x in readers):
+            raise MultiReaderException(
+                "processes require readers as (engine, filename_or_obj_or_url) tuples"
+            )
+        if max_workers is None:
+            max_workers = min(len(readers), os.cpu_count() or 1)
+        if processes and max_workers > 0:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                loaded = list(executor.map(_load_source, readers))
+            self._readers = []
+        else:
+            if max_workers > 0:
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    results = list(executor.map(_load, readers))
+            else:
+                results = [_load(x) for x in readers]
+            self._readers = [reader for reader, _ in results if reader is not None]
+            loaded = [source for _, source in results]
+        self._sources = loaded
+        self._variables = list(
+            dict.fromkeys(var for source in loaded for var in source.variables)
+        )
+        self._stations = _merge_stations([source.stations for source in loaded])
+        self._metadata = {}
+        for source in reversed(loaded):
+            self._metadata.update(source.metadata)
+        self._data: dict[str, Data] = {}
+        self._merging = SingleFlight()
+
+    def _merge_data(self, varname: str) -> Data:
+        parts = [source.data.get(varname) for source in self._sources]
+        parts = [part for part in parts if part is not None]
+        units = {part.units for part in parts}
+        if len(units) > 1:
+            raise MultiReaderException(f"different units of {varname}: {units}")
+        if len(parts) == 1:
+            return parts[0]
+        # copy all parts into a single preallocated array
+        array = np.empty(sum(len(part) for part in parts), NpStructuredData._dtype)
+        start = 0
+        for part in parts:
+            _structured_array(part, array[start : start + len(part)])
+            start += len(part)
+        data = NpStructuredData()
+        data.set_data(varname, parts[0].units, array)
+        return data
+
+    def _merged_data(self, varname: str) -> Data:
+        if varname not in self._data:
+            if varname not in self._variables:
+                raise MultiReaderException(f"unknown variable {varname}")
+            self._data[varname] = self._merge_data(varname)
+            # the parts are not needed anymore
+            for source in self._sources:
+                source.data.pop(varname, None)
+        return self._data[varname]
+
+    def _unfiltered_data(self, varname) -> Data:
+        data = self._data.get(varname)
+        if data is None:
+            # merge each variable only once, also with concurrent calls
+            data = self._merging.do(varname, self._merged_data, varname)
+        return data
+
+    def _variables_memory_usage(self) -> dict[str, int]:
+        # merged variables, or the loaded parts of variables not merged yet
+        memory = {}
+        for var in self._variables:
+            if var in self._data:
+                memory[var] = self._data[var].memory_usage()
+            else:
+                parts = [source.data.get(var) for source in self._sources]
+                memory[var] = sum(
+                    part.memory_usage() for part in parts if part is not None
+                )
+        return memory
+
+    def _unfiltered_stations(self) -> dict[str, Station]:
+        return self._stations
+
+    def _unfiltered_variables(self) -> list[str]:
+        return list(self._variables)
+
+    def metadata(self) -> dict[str, str]:
+        """merged metadata, the first reader wins on conflicting keys"""
+        return dict(self._metadata)
+
+    def close(self) -> None:
+        for reader in self._readers:
+            reader.close()
+        self._readers = []
@@ -1,9 +1,16 @@
 import abc
+from concurrent.futures import ThreadPoolExecutor
 from .Data import Data
-from .Station import Station
+from .Station import Station, stations_memory_usage
 from .Filter import Filter, filters
 
 
+def _memory_report(variables: dict[str, int], stations: int, **other: int) -> dict:
+    report = {"variables": variables, "stations": stations, **other}
+    report["total"] = sum(variables.values()) + stations + sum(other.values())
+    return report
+
+
 class Reader(abc.ABC):
     """Baseclass for timeseries. This can be used with a context manager"""
 
@@ -38,6 +45,39 @@ class Reader(abc.ABC):
         """
         pass
 
+    def data_many(self, varnames: list[str], max_workers: int = 0) -> dict[str, Data]:
+        """Return all data for several variables.
+
+        The default implementation calls data for each variable. Readers may
+        overwrite this to share work between the variables.
+
+        :param varnames: variable names as returned from variables
+        :param max_workers: evaluate the variables in a thread pool with this many
+            threads, defaults to 0, meaning sequential evaluation
+        :return: a dictionary from variable name to data object
+        """
+        varnames = list(varnames)
+        if max_workers > 0:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                return dict(zip(varnames, executor.map(self.data, varnames)))
+        return {var: self.data(var) for var in varnames}
+
+    def memory_report(self) -> dict:
+        """Memory used by the reader in bytes, see Data.memory_usage.
+
+        The default implementation reports the memory of the data returned from
+        data() for each variable, which reads all data. Readers keeping data in memory
+        should overwrite this to report the memory they hold.
+
+        :return: dictionary with the memory of each variable as "variables",
+            of the stations as "stations" and the sum as "total"
+        """
+        variables = {
+            var: data.memory_usage()
+            for var, data in self.data_many(self.variables()).items()
+        }
+        return _memory_report(variables, stations_memory_usage(self.stations()))
+
     @abc.abstractmethod
     def stations(self) -> dict[str, Station]:
         """Dictionary of all stations available for this reader.
@@ -0,0 +1,279 @@
+"""Transport of Data and stations between processes in shared memory.
+
+Example, computing per station in a process pool without copying the data into each
+worker::
+
+    def station_mean(descriptor):
+        with SharedData.attach(descriptor) as shared:
+            return float(np.nanmean(shared.data.values))
+
+    data = ts.data("SOx").sorted()
+    with SharedData.create(data, ts.stations()) as shared:
+        parts = [shared.descriptor.slice(x) for x in data.station_slices().values()]
+        with ProcessPoolExecutor() as executor:
+            means = list(executor.map(station_mean, parts))
+
+Pickling a SharedData sends only its SharedDataDescriptor, and unpickling attaches
+to the same memory.
+"""
+
+from dataclasses import dataclass, replace
+import json
+import mmap
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .Data import Data, NpStructuredData, _structured_array
+from .Station import Station, StationTable, _stations_array, _stations_from_array
+
+# alignment of the parts of a block
+_ALIGNMENT = 64
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _attach_block(name: str) -> shared_memory.SharedMemory:
+    # python >= 3.13 can attach without registering the block for removal at exit
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name)
+
+
+def _detach_mapping(block: shared_memory.SharedMemory) -> mmap.mmap:
+    """Take the memory-map out of a block. SharedMemory.close() unmaps the memory
+    also while numpy views on it exist, since numpy doesn't keep a buffer export,
+    while the detached map is unmapped only once the last view referencing it is gone.
+    """
+    # private attributes of SharedMemory, unchanged since python 3.8
+    mapping = block._mmap
+    block._buf.release()
+    block._buf = None
+    block._mmap = None
+    # closes only the file-descriptor, the block can still be unlinked
+    block.close()
+    return mapping
+
+
+@dataclass(frozen=True)
+class SharedDataDescriptor:
+    """Location of data and stations in a shared memory block, cheap to pickle.
+
+    :param name: name of the shared memory block
+    :param variable: variable name of the data
+    :param units: units of the data
+    :param rows: number of data rows in the block
+    :param start: first row of the data
+    :param stop: end of the rows of the data
+    :param is_sorted: the data is sorted, see Data.is_sorted
+    :param stations_offset: position of the stations in the block
+    :param stations_dtype: numpy dtype description of the stations, None without stations
+    :param station_count: number of stations
+    :param metadata_offset: position of the json-encoded station metadata in the block
+    :param metadata_size: length of the station metadata
+    """
+
+    name: str
+    variable: str
+    units: str
+    rows: int
+    start: int
+    stop: int
+    is_sorted: bool
+    stations_offset: int = 0
+    stations_dtype: list | None = None
+    station_count: int = 0
+    metadata_offset: int = 0
+    metadata_size: int = 0
+
+    def slice(self, rows: slice) -> "SharedDataDescriptor":
+        """Descriptor of a contiguous range of the rows, e.g. from
+        Data.station_slices(), attaching to a view without copying.
+
+        :param rows: slice with step 1 relative to the rows of this descriptor
+        :return: a new descriptor
+        """
+        start, stop, step = rows.indices(self.stop - self.start)
+        if step != 1:
+            raise ValueError(f"slice with step {step}, only contiguous rows supported")
+        return replace(
+            self, start=self.start + start, stop=self.start + max(start, stop)
+        )
+
+
+class SharedData:
+    """Data and optionally stations in a multiprocessing.shared_memory block.
+
+    Create a block with SharedData.create in one process, and attach to it with
+    SharedData.attach(descriptor) in others, or by pickling the SharedData. The data
+    and stations are read-only numpy views on the shared memory, which stays open while
+    any view exists.
+
+    The owner removes the block on close, so it can't be attached anymore. The memory
+    is released once all processes closed the block and no views on it are left.
+    To return results from a worker, create the block with owner=False in the worker
+    and attach to it with owner=True in the receiving process.
+    """
+
+    def __init__(
+        self,
+        block: shared_memory.SharedMemory,
+        descriptor: SharedDataDescriptor,
+        owner: bool,
+    ):
+        """use create or attach"""
+        self._block = block
+        self._mapping = _detach_mapping(block)
+        self._descriptor = descriptor
+        self._owner = owner
+        self._data = None
+        self._stations = None
+
+    @classmethod
+    def create(
+        cls,
+        data: Data,
+        stations: dict[str, Station] | None = None,
+        owner: bool = True,
+    ) -> "SharedData":
+        """Copy data, and optionally stations, into a new shared memory block.
+
+        :param data: the data
+        :param stations: stations of the data, defaults to None
+        :param owner: remove the block on close, defaults to True
+        :return: a SharedData on the new block
+        """
+        dtype = np.dtype(NpStructuredData._dtype)
+        size = len(data) * dtype.itemsize
+        stations_array = None
+        metadata = b""
+        stations_offset = 0
+        if stations is not None:
+            table = StationTable.from_stations(stations)
+            stations_array = _stations_array(table)
+            metadata = json.dumps(table._metadata, default=str).encode()
+            stations_offset = _aligned(size)
+            size = stations_offset + stations_array.nbytes
+        metadata_offset = size
+        size += len(metadata)
+
+        block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        try:
+            rows = np.ndarray(len(data), dtype=dtype, buffer=block.buf)
+            _structured_array(data, rows)
+            del rows
+            if stations_array is not None:
+                shared_stations = np.ndarray(
+                    len(stations_array),
+                    dtype=stations_array.dtype,
+                    buffer=block.buf,
+                    offset=stations_offset,
+                )
+                shared_stations[:] = stations_array
+                del shared_stations
+                block.buf[metadata_offset : metadata_offset + len(metadata)] = metadata
+        except BaseException:
+            block.close()
+            block.unlink()
+            raise
+        descriptor = SharedDataDescriptor(
+            name=block.name,
+            variable=data.variable,
+            units=data.units,
+            rows=len(data),
+            start=0,
+            stop=len(data),
+            is_sorted=data.is_sorted,
+            stations_offset=stations_offset,
+            stations_dtype=(
+                None if stations_array is None else stations_array.dtype.descr
+            ),
+            station_count=0 if stations_array is None else len(stations_array),
+            metadata_offset=metadata_offset,
+            metadata_size=len(metadata),
+        )
+        return cls(block, descriptor, owner)
+
+    @classmethod
+    def attach(
+        cls, descriptor: SharedDataDescriptor, owner: bool = False
+    ) -> "SharedData":
+        """Attach to an existing shared memory block.
+
+        :param descriptor: descriptor of the block, see SharedData.descriptor
+        :param owner: take over the removal of the block on close, defaults to False
+        :return: a SharedData on the block
+        """
+        return cls(_attach_block(descriptor.name), descriptor, owner)
+
+    def __reduce__(self):
+        # pickle only the descriptor, unpickling attaches to the block
+        return (SharedData.attach, (self._descriptor,))
+
+    @property
+    def descriptor(self) -> SharedDataDescriptor:
+        """The picklable descriptor of the block"""
+        return self._descriptor
+
+    def _array(self, count: int, dtype, offset: int) -> np.ndarray:
+        if self._mapping is None:
+            raise ValueError("SharedData is closed")
+        array = np.ndarray(count, dtype=dtype, buffer=self._mapping, offset=offset)
+        array.flags.writeable = False
+        return array
+
+    @property
+    def data(self) -> NpStructuredData:
+        """The data, a view on the shared memory
+
+        :raises ValueError: if closed
+        """
+        if self._data is None:
+            d = self._descriptor
+            rows = self._array(d.rows, NpStructuredData._dtype, 0)[d.start : d.stop]
+            data = NpStructuredData()
+            data.set_data(d.variable, d.units, rows, is_sorted=d.is_sorted)
+            self._data = data
+        return self._data
+
+    @property
+    def stations(self) -> StationTable | None:
+        """The stations, with columns on the shared memory, or None without stations
+
+        :raises ValueError: if closed
+        """
+        d = self._descriptor
+        if self._stations is None and d.stations_dtype is not None:
+            array = self._array(
+                d.station_count,
+                np.dtype([tuple(field) for field in d.stations_dtype]),
+                d.stations_offset,
+            )
+            start = d.metadata_offset
+            metadata = json.loads(self._mapping[start : start + d.metadata_size])
+            self._stations = _stations_from_array(array, metadata)
+        return self._stations
+
+    def close(self) -> None:
+        """Close the block, and remove it if this is the owner. Data and stations
+        still in use keep the memory open until they are garbage collected."""
+        self._data = None
+        self._stations = None
+        if self._mapping is None:
+            return
+        # unmapped when the last view is gone
+        self._mapping = None
+        if self._owner:
+            try:
+                self._block.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
@@ -1,3 +1,27 @@
+from collections.abc import Mapping
+import sys
+
+import numpy as np
+
+from .Data import _buffers_nbytes
+
+
+def _dict_memory(d: dict) -> int:
+    """estimated size of a dict and its values, the keys are usually shared"""
+    return sys.getsizeof(d) + sum(sys.getsizeof(value) for value in d.values())
+
+
+def _fields_equal(fields: dict, other: dict) -> bool:
+    """equality of station fields, with NaN equal to NaN, e.g. for unknown altitudes"""
+    if fields.keys() != other.keys():
+        return False
+    for key, value in fields.items():
+        value2 = other[key]
+        if not (value == value2 or (value != value and value2 != value2)):
+            return False
+    return True
+
+
 class Station:
     """Baseclass for a station returned from a pyaro.timeseries.Reader.
 
@@ -14,6 +38,8 @@ class Station:
 
     """
 
+    __slots__ = ("_fields", "_metadata")
+
     def __init__(self, fields: dict = None, metadata: dict = None) -> None:
         self._fields = {
             "station": "",
@@ -133,8 +159,390 @@ class Station:
         """
         return {"fields": self._fields, "metadata": self.metadata}
 
+    def memory_usage(self) -> int:
+        """Estimated memory of the station with its fields and metadata in bytes
+
+        :return: number of bytes
+        """
+        return (
+            sys.getsizeof(self)
+            + _dict_memory(self._fields)
+            + _dict_memory(self._metadata)
+        )
+
     def __rep__(self):
         return f'Station("fields": {self._fields}, "metadata": {self.metadata})'
 
     def __str__(self) -> str:
         return str((self._fields, self.metadata))
+
+
+class StationRow(Station):
+    """A lightweight Station view on a row of a StationTable.
+
+    The fields are read from the columns of the table, so creating a row does not
+    copy any data.
+    """
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: "StationTable", index: int) -> None:
+        self._table = table
+        self._index = index
+
+    def _field(self, key):
+        return self._table._columns[key][self._index].item()
+
+    @property
+    def _fields(self) -> dict:
+        return {key: self._field(key) for key in self._table._columns}
+
+    @property
+    def _metadata(self) -> dict:
+        return self._table._metadata[self._index]
+
+    def __getitem__(self, key):
+        """access the data as a dict"""
+        if key in self._table._columns:
+            return self._field(key)
+        return super().__getitem__(key)
+
+    def keys(self):
+        return self._table._columns.keys()
+
+    def set_fields(self, fields: dict):
+        raise TypeError("StationRow is a read-only view of a StationTable")
+
+    def __reduce__(self):
+        # pickle and copy as a plain Station, without the table
+        return (Station, (self._fields, dict(self._metadata)))
+
+    def __eq__(self, other) -> bool:
+        """rows are created on each access, so compare by content, also with Stations"""
+        if not isinstance(other, Station):
+            return NotImplemented
+        return _fields_equal(self._fields, other._fields) and (
+            self._metadata == other._metadata
+        )
+
+    __hash__ = None
+
+    @property
+    def station(self) -> str:
+        return self._field("station")
+
+    @property
+    def latitude(self) -> float:
+        return self._field("latitude")
+
+    @property
+    def longitude(self) -> float:
+        return self._field("longitude")
+
+    @property
+    def altitude(self) -> float:
+        return self._field("altitude")
+
+    @property
+    def long_name(self) -> str:
+        return self._field("long_name")
+
+    @property
+    def country(self) -> str:
+        return self._field("country")
+
+    @property
+    def url(self) -> str:
+        return self._field("url")
+
+
+class StationTable(Mapping):
+    """A columnar table of stations, with numpy arrays for each station field.
+
+    The table can be used as a read-only dict of station-id to Station, i.e. as
+    returned from Reader.stations(). The Stations are lightweight StationRow views
+    on the table. Filters can work directly on the columns, e.g. names, latitudes,
+    longitudes, altitudes and countries.
+
+    :param stations: dictionary of station-id to Station, defaults to None, meaning no stations
+    """
+
+    _field_dtypes = {
+        "station": str,
+        "latitude": np.float64,
+        "longitude": np.float64,
+        "altitude": np.float64,
+        "long_name": str,
+        "country": str,
+        "url": str,
+    }
+
+    def __init__(self, stations: Mapping[str, Station] | None = None) -> None:
+        if stations is None:
+            stations = {}
+        if isinstance(stations, StationTable):
+            self._set_columns(stations._names, stations._columns, stations._metadata)
+            return
+        columns = {key: [] for key in self._field_dtypes}
+        metadata = []
+        for station in stations.values():
+            for key in columns:
+                columns[key].append(station[key])
+            metadata.append(station.metadata)
+        self._set_columns(list(stations.keys()), columns, metadata)
+
+    @classmethod
+    def from_stations(cls, stations: Mapping[str, Station]) -> "StationTable":
+        """Get a StationTable for a stations-dict, without copying if the stations
+        are already a StationTable.
+
+        :param stations: dictionary of station-id to Station
+        :return: a StationTable
+        """
+        if isinstance(stations, StationTable):
+            return stations
+        return cls(stations)
+
+    @classmethod
+    def from_columns(
+        cls,
+        station,
+        latitude,
+        longitude,
+        altitude,
+        country="",
+        long_name=None,
+        url="",
+        metadata: list[dict] | None = None,
+    ) -> "StationTable":
+        """Create a StationTable from column-arrays. Scalars are broadcast to all stations.
+
+        :param station: station-ids
+        :param latitude: latitudes in range [-90, 90]
+        :param longitude: longitudes in range [-180, 180]
+        :param altitude: altitudes in m
+        :param country: countries as ISO 3166-2 code, defaults to ""
+        :param long_name: long station names, defaults to None, meaning station
+        :param url: urls, defaults to ""
+        :param metadata: list of metadata-dicts, one per station, defaults to None
+        :return: a StationTable
+        """
+        names = np.asarray(station, dtype=str)
+        if long_name is None:
+            long_name = names
+        columns = dict(
+            station=names,
+            latitude=latitude,
+            longitude=longitude,
+            altitude=altitude,
+            long_name=long_name,
+            country=country,
+            url=url,
+        )
+        for key, value in columns.items():
+            columns[key] = np.broadcast_to(value, names.shape)
+        if metadata is None:
+            metadata = [{} for _ in range(len(names))]
+        table = cls.__new__(cls)
+        table._set_columns(names, columns, metadata)
+        return table
+
+    def _set_columns(self, names, columns, metadata):
+        self._names = np.asarray(names, dtype=str)
+        self._columns = {
+            key: np.asarray(columns[key], dtype=dtype)
+            for key, dtype in self._field_dtypes.items()
+        }
+        self._metadata = list(metadata)
+        self._index = None
+        self._country_codes = None
+        for key, column in self._columns.items():
+            if column.shape != self._names.shape:
+                raise Exception(f"station-ids and {key} not of same size")
+        if np.any(np.abs(self.latitudes) > 90):
+            raise Exception(f"latitude out of bounds: {self.latitudes.max()}")
+        if np.any(np.abs(self.longitudes) > 180):
+            raise Exception(f"longitude out of bounds: {self.longitudes.max()}")
+
+    @property
+    def names(self) -> np.ndarray:
+        """station-ids, i.e. the keys of this table
+
+        :return: 1dim array of strings
+        """
+        return self._names
+
+    @property
+    def latitudes(self) -> np.ndarray:
+        """latitudes of the stations
+
+        :return: 1dim array of floats
+        """
+        return self._columns["latitude"]
+
+    @property
+    def longitudes(self) -> np.ndarray:
+        """longitudes of the stations
+
+        :return: 1dim array of floats
+        """
+        return self._columns["longitude"]
+
+    @property
+    def altitudes(self) -> np.ndarray:
+        """altitudes of the stations
+
+        :return: 1dim array of floats
+        """
+        return self._columns["altitude"]
+
+    @property
+    def countries(self) -> np.ndarray:
+        """countries of the stations as ISO 3166-2 code
+
+        :return: 1dim array of strings
+        """
+        return self._columns["country"]
+
+    @property
+    def country_codes(self) -> np.ndarray:
+        """countries of the stations as integer codes into unique_countries
+
+        :return: 1dim array of ints
+        """
+        if self._country_codes is None:
+            self._country_codes = np.unique(self.countries, return_inverse=True)
+        return self._country_codes[1]
+
+    @property
+    def unique_countries(self) -> np.ndarray:
+        """sorted unique countries of the stations, see country_codes
+
+        :return: 1dim array of strings
+        """
+        self.country_codes
+        return self._country_codes[0]
+
+    def column(self, key: str) -> np.ndarray:
+        """Get the column of any station field, see Station.keys()
+
+        :param key: station field
+        :return: 1dim array
+        """
+        return self._columns[key]
+
+    def index(self, name: str) -> int:
+        """Position of a station in the columns.
+
+        :param name: station-id
+        :raises KeyError: if the station is not in the table
+        :return: row-index
+        """
+        if self._index is None:
+            self._index = {name: i for i, name in enumerate(self._names.tolist())}
+        return self._index[name]
+
+    def take(self, index) -> "StationTable":
+        """Get a new table with a subset of the stations.
+
+        :param index: a boolean mask or integer index array, as for numpy arrays
+        :return: a new StationTable
+        """
+        index = np.asarray(index)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        table = StationTable.__new__(StationTable)
+        table._set_columns(
+            self._names[index],
+            {key: column[index] for key, column in self._columns.items()},
+            [self._metadata[i] for i in index.tolist()],
+        )
+        return table
+
+    def __getitem__(self, name) -> StationRow:
+        return StationRow(self, self.index(name))
+
+    def __contains__(self, name) -> bool:
+        try:
+            self.index(name)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def __iter__(self):
+        return iter(self._names.tolist())
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __eq__(self, other) -> bool:
+        """equal to tables with the same stations, columns and metadata in the same
+        order, or to stations-dicts with equal stations"""
+        if not isinstance(other, StationTable):
+            return super().__eq__(other)
+        if not np.array_equal(self._names, other._names):
+            return False
+        for key, column in self._columns.items():
+            equal_nan = column.dtype.kind == "f"
+            if not np.array_equal(column, other._columns[key], equal_nan=equal_nan):
+                return False
+        return self._metadata == other._metadata
+
+    def memory_usage(self) -> int:
+        """Estimated memory of the table with columns, metadata and cached index
+        in bytes
+
+        :return: number of bytes
+        """
+        arrays = [self._names, *self._columns.values()]
+        if self._country_codes is not None:
+            arrays.extend(self._country_codes)
+        size = _buffers_nbytes(arrays) + sys.getsizeof(self._metadata)
+        size += sum(_dict_memory(metadata) for metadata in self._metadata)
+        if self._index is not None:
+            # the keys are str-copies of the names
+            size += sys.getsizeof(self._index)
+            size += sum(sys.getsizeof(name) for name in self._index)
+        return size
+
+    def __repr__(self):
+        return f"{type(self).__name__}({len(self)} stations)"
+
+
+def stations_memory_usage(stations: Mapping[str, Station]) -> int:
+    """Estimated memory of stations, as returned from Reader.stations(), in bytes
+
+    :param stations: dict of stations or a StationTable
+    :return: number of bytes
+    """
+    if isinstance(stations, StationTable):
+        return stations.memory_usage()
+    return sys.getsizeof(stations) + sum(
+        sys.getsizeof(name) + station.memory_usage()
+        for name, station in stations.items()
+    )
+
+
+def _stations_array(stations: StationTable) -> np.ndarray:
+    """structured array of the station fields of a StationTable"""
+    fields = list(StationTable._field_dtypes)
+    columns = [stations.column(key) for key in fields]
+    dtype = [(key, column.dtype) for key, column in zip(fields, columns)]
+    array = np.empty(len(stations), dtype=dtype)
+    for key, column in zip(fields, columns):
+        array[key] = column
+    return array
+
+
+def _stations_from_array(array: np.ndarray, metadata: list[dict]) -> StationTable:
+    """StationTable on the columns of a structured array from _stations_array"""
+    return StationTable.from_columns(
+        array["station"],
+        array["latitude"],
+        array["longitude"],
+        array["altitude"],
+        country=array["country"],
+        long_name=array["long_name"],
+        url=array["url"],
+        metadata=metadata,
+    )
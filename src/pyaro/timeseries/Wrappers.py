@@ -3,7 +3,12 @@ from .Data import Data
 
 
 class VariableNameChangingReaderData(Data):
+    """Data of another variable name, for Data implementations without rename,
+    see Data.rename. Nested wrappers are collapsed to a single wrapper."""
+
     def __init__(self, data: Data, varname: str):
+        if isinstance(data, VariableNameChangingReaderData):
+            data = data._data
         self._data = data
         self._variable = varname
 
@@ -11,7 +16,14 @@ class VariableNameChangingReaderData(Data):
         return self._data.keys()
 
     def slice(self, index):
-        return VariableNameChangingReaderData(self._data.slice(index), self._variable)
+        return self._data.slice(index).rename(self._variable)
+
+    def rename(self, variable: str):
+        if variable == self._variable:
+            return self
+        if variable == self._data.variable:
+            return self._data
+        return VariableNameChangingReaderData(self._data, variable)
 
     def __len__(self) -> int:
         return len(self._data)
@@ -32,13 +44,33 @@ class VariableNameChangingReaderData(Data):
     def stations(self):
         return self._data.stations
 
+    def station_codes(self):
+        return self._data.station_codes()
+
+    @property
+    def nbytes(self) -> int:
+        return self._data.nbytes
+
+    def memory_usage(self) -> int:
+        return self._data.memory_usage()
+
+    def station_index(self, compute: bool = True):
+        return self._data.station_index(compute)
+
+    @property
+    def is_sorted(self) -> bool:
+        return self._data.is_sorted
+
+    def sorted(self):
+        return self._data.sorted().rename(self._variable)
+
     @property
     def latitudes(self):
         return self._data.latitudes
 
     @property
     def longitudes(self):
-        return self._data.altitudes
+        return self._data.longitudes
 
     @property
     def altitudes(self):
@@ -101,11 +133,38 @@ class VariableNameChangingReader(Reader):
         :return: data with new variable name
         """
         data = self.reader.data(self._new_to_reader.get(varname, varname))
-        return VariableNameChangingReaderData(data, varname)
+        return data.rename(varname)
+
+    def data_many(self, varnames: list[str], max_workers: int = 0) -> dict[str, Data]:
+        """Get the data from the reader for several of the new variable names.
+
+        :param varnames: new variable names
+        :param max_workers: see Reader.data_many
+        :return: dictionary from new variable name to data with new variable name
+        """
+        varnames = list(varnames)
+        reader_varnames = [self._new_to_reader.get(x, x) for x in varnames]
+        data = self.reader.data_many(reader_varnames, max_workers=max_workers)
+        return {
+            var: data[reader_var].rename(var)
+            for var, reader_var in zip(varnames, reader_varnames)
+        }
 
     def stations(self):
         return self._reader.stations()
 
+    def memory_report(self) -> dict:
+        """Memory report of the original reader, with new variable names
+
+        :return: see Reader.memory_report
+        """
+        report = self._reader.memory_report()
+        report["variables"] = {
+            self._reader_to_new.get(var, var): size
+            for var, size in report["variables"].items()
+        }
+        return report
+
     def metadata(self):
         return self._reader.metadata()
 
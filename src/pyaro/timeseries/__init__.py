@@ -1,5 +1,6 @@
 from .Data import Data, NpStructuredData, Flag
 from .Engine import Engine
 from .Reader import Reader
-from .Station import Station
+from .Station import Station, StationTable
 from .Filter import filters, FilterCollection
+from .MultiReader import MultiReader
@@ -0,0 +1,33 @@
+import numpy as np
+
+from pyaro.timeseries import Flag, NpStructuredData, StationTable
+
+
+def data_and_stations(rows=5000, nstations=50):
+    """random NOx data of stations s0..s{nstations-1}, the first 5 stations in NO,
+    the others in SE, with 5% invalid flags"""
+    rng = np.random.default_rng(1)
+    stations = StationTable.from_columns(
+        [f"s{i}" for i in range(nstations)],
+        np.zeros(nstations),
+        np.zeros(nstations),
+        np.zeros(nstations),
+        country=np.where(np.arange(nstations) < 5, "NO", "SE"),
+    )
+    station_idx = rng.integers(0, nstations, rows)
+    start = np.datetime64("2020-01-01") + rng.integers(0, 100, rows).astype(
+        "timedelta64[h]"
+    )
+    data = NpStructuredData("NOx", "ug")
+    data.append(
+        value=rng.normal(size=rows),
+        station=stations.names[station_idx],
+        latitude=np.zeros(rows),
+        longitude=np.zeros(rows),
+        altitude=np.zeros(rows),
+        start_time=start,
+        end_time=start + np.timedelta64(1, "h"),
+        flag=rng.choice([Flag.VALID, Flag.INVALID], rows, p=[0.95, 0.05]),
+        standard_deviation=np.full(rows, np.nan),
+    )
+    return data, stations
@@ -1,15 +1,31 @@
+import bz2
+import copy
+import csv
 import datetime
+import gzip
 import logging
+import lzma
+import shutil
 import sys
+import tempfile
+import tracemalloc
 import unittest
+import unittest.mock
 import os
+import pickle
 
 import numpy as np
 
 import pyaro
 import pyaro.timeseries
+from pyaro.csvreader.CountryLookup import CountryLookup
+from pyaro.csvreader.CSVTimeseriesReader import CSVTimeseriesReader
+from pyaro.timeseries.Data import NpStructuredData
 from pyaro.timeseries.Filter import FilterException
-from pyaro.timeseries.Wrappers import VariableNameChangingReader
+from pyaro.timeseries.Wrappers import (
+    VariableNameChangingReader,
+    VariableNameChangingReaderData,
+)
 
 try:
     import pandas
@@ -18,6 +34,13 @@ try:
 except ImportError:
     has_pandas = False
 
+try:
+    import pyarrow
+
+    has_pyarrow = True
+except ImportError:
+    has_pyarrow = False
+
 try:
     import geocoder_reverse_natural_earth
 
@@ -106,6 +129,33 @@ class TestCSVTimeSeriesReader(unittest.TestCase):
             self.assertEqual(count, 208)
             self.assertEqual(len(ts.stations()), 2)
 
+    def test_init_positional(self):
+        # arguments in the order of earlier versions, new arguments are appended
+        with CSVTimeseriesReader(
+            self.file,
+            {
+                "variable": 0,
+                "station": 1,
+                "longitude": 2,
+                "latitude": 3,
+                "value": 4,
+                "units": 5,
+                "start_time": 6,
+                "end_time": 7,
+                "altitude": "0",
+                "country": "NO",
+                "standard_deviation": "NaN",
+                "flag": "0",
+            },
+            {},
+            False,
+            {"delimiter": ","},
+            0,
+            {"stations": {"include": ["station1"]}},
+        ) as ts:
+            self.assertEqual(list(ts.stations()), ["station1"])
+            self.assertEqual(len(ts.data("SOx")), 52)
+
     def test_init_extra_columns(self):
         columns = {
             "variable": 0,
@@ -185,8 +235,159 @@ class TestCSVTimeSeriesReader(unittest.TestCase):
                     standard_deviation=data.standard_deviations,
                 )
             self.assertEqual(
-                (2 ** rounds) * old_size, len(data), "data append by array"
+                (2**rounds) * old_size, len(data), "data append by array"
+            )
+
+    def test_data_many(self):
+        engine = pyaro.list_timeseries_engines()["csv_timeseries"]
+        filters = {
+            "stations": {"exclude": ["station1"]},
+            "flags": {"include": [pyaro.timeseries.Flag.VALID]},
+            "time_variable_station": {
+                "exclude": [
+                    ("1997-01-11 00:00:00", "1997-01-12 23:59:59", "SOx", "station2")
+                ]
+            },
+            "variables": {"reader_to_new": {"SOx": "oxidised_sulphur"}},
+        }
+        with engine.open(self.file, filters=filters) as ts:
+            variables = ts.variables()
+            for max_workers in (0, 2):
+                many = ts.data_many(variables, max_workers=max_workers)
+                self.assertEqual(list(many.keys()), list(variables))
+                for var in variables:
+                    data = ts.data(var)
+                    self.assertEqual(many[var].variable, var)
+                    self.assertTrue(np.all(many[var].values == data.values))
+                    self.assertTrue(np.all(many[var].stations == data.stations))
+            self.assertEqual(len(many["oxidised_sulphur"]), 50)
+
+    def test_stations_pickle_copy(self):
+        engine = pyaro.list_timeseries_engines()["csv_timeseries"]
+        with engine.open(self.file, filters=[]) as ts:
+            stations = ts.stations()
+            station = stations["station1"]
+            for copied in (
+                pickle.loads(pickle.dumps(station)),
+                copy.copy(station),
+                copy.deepcopy(station),
+            ):
+                self.assertIsInstance(copied, pyaro.timeseries.Station)
+                self.assertEqual(copied._fields, station._fields)
+                self.assertEqual(copied.metadata, station.metadata)
+                self.assertEqual(copied.latitude, station.latitude)
+            copied = pickle.loads(pickle.dumps(dict(stations)))
+            self.assertEqual(list(copied), list(stations))
+            self.assertEqual(copied["station2"].country, stations["station2"].country)
+            copied = pickle.loads(pickle.dumps(stations))
+            self.assertEqual(list(copied), list(stations))
+
+    def test_station_codes(self):
+        engine = pyaro.list_timeseries_engines()["csv_timeseries"]
+        with engine.open(self.file, filters=[]) as ts:
+            data = ts.data("SOx")
+            ids, codes = data.station_codes()
+            self.assertEqual(list(ids), sorted(set(data.stations)))
+            self.assertTrue(np.all(ids[codes] == data.stations))
+            # codes are kept in slices
+            subset = data.slice(data.values > 0.5)
+            self.assertIs(subset.station_codes()[0], ids)
+            self.assertTrue(np.all(ids[subset.station_codes()[1]] == subset.stations))
+
+    def test_station_index(self):
+        engine = pyaro.list_timeseries_engines()["csv_timeseries"]
+        with engine.open(self.file, filters=[]) as ts:
+            data = ts.data("SOx")
+            # interleave the stations
+            data = data.slice(np.argsort(data.start_times, kind="stable"))
+            self.assertIsNone(data.station_index(compute=False))
+            ids, order, offsets = data.station_index()
+            self.assertIs(data.station_index(compute=False)[1], order)
+            self.assertEqual(offsets[-1], len(data))
+            for i, station in enumerate(ids):
+                rows = order[offsets[i] : offsets[i + 1]]
+                self.assertTrue(np.all(data.stations[rows] == station))
+                self.assertTrue(np.all(np.diff(rows) > 0))
+            slices = data.station_slices()
+            self.assertEqual(list(slices), ["station1", "station2"])
+            station1 = data.for_station("station1")
+            self.assertEqual(len(station1), np.sum(data.stations == "station1"))
+            self.assertTrue(
+                np.all(station1.values == data.slice(slices["station1"]).values)
             )
+            self.assertEqual(len(data.for_station("unknown")), 0)
+            # contiguous rows are views
+            sorted_data = data.slice(order)
+            rows = sorted_data.station_slices()["station2"]
+            self.assertIsInstance(rows, slice)
+            self.assertTrue(
+                np.shares_memory(
+                    sorted_data.for_station("station2").values, sorted_data.values
+                )
+            )
+            # station filters select by ranges with an index
+            sfilter = pyaro.timeseries.filters.get("stations", include=["station2"])
+            for fraction in (0, 1):
+                with unittest.mock.patch.object(
+                    pyaro.timeseries.Filter, "_STATION_RANGES_FRACTION", fraction
+                ):
+                    idx = sfilter.filter_data_idx(data, ts.stations(), ts.variables())
+                self.assertTrue(np.all(data.slice(idx).stations == "station2"))
+                self.assertEqual(len(data.slice(idx)), len(slices["station2"]))
+
+    def test_time_format(self):
+        with pyaro.open_timeseries("csv_timeseries", self.file, filters=[]) as ts:
+            expected = ts.data("SOx")
+        formats = {
+            "epoch": lambda dt: str(int(dt.timestamp())),
+            "%d.%m.%Y %H:%M": lambda dt: dt.strftime("%d.%m.%Y %H:%M"),
+            "%Y-%m-%dT%H:%M:%S%z": lambda dt: dt.strftime("%Y-%m-%dT%H:%M:%S+0000"),
+        }
+        with open(self.file, newline="") as fh:
+            rows = list(csv.reader(fh))
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for time_format, to_str in formats.items():
+                path = os.path.join(tmpdir, "data.csv")
+                with open(path, "w", newline="") as fh:
+                    writer = csv.writer(fh)
+                    for row in rows:
+                        row = list(row)
+                        for i in (6, 7):
+                            dt = datetime.datetime.fromisoformat(row[i])
+                            row[i] = to_str(dt.replace(tzinfo=datetime.timezone.utc))
+                        writer.writerow(row)
+                with pyaro.open_timeseries(
+                    "csv_timeseries", path, filters=[], time_format=time_format
+                ) as ts:
+                    data = ts.data("SOx")
+                self.assertTrue(np.all(data.start_times == expected.start_times))
+                self.assertTrue(np.all(data.end_times == expected.end_times))
+
+    def test_compressed(self):
+        with pyaro.open_timeseries("csv_timeseries", self.file, filters=[]) as ts:
+            expected = ts.data("SOx")
+        with open(self.file, "rb") as fh:
+            content = fh.read()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            files = {
+                "data.csv.gz": gzip.compress(content),
+                "data.csv.bz2": bz2.compress(content),
+                "data.csv.xz": lzma.compress(content),
+                # detected by magic bytes
+                "data_gz.csv": gzip.compress(content),
+            }
+            for name, compressed in files.items():
+                path = os.path.join(tmpdir, name)
+                with open(path, "wb") as fh:
+                    fh.write(compressed)
+                with pyaro.open_timeseries("csv_timeseries", path, filters=[]) as ts:
+                    data = ts.data("SOx")
+                self.assertTrue(np.all(data.values == expected.values), name)
+                self.assertTrue(np.all(data.start_times == expected.start_times))
+
+            shutil.copy(self.file, tmpdir)
+            with pyaro.open_timeseries("csv_timeseries", tmpdir, filters=[]) as ts:
+                self.assertEqual(len(ts.data("SOx")), (len(files) + 1) * len(expected))
 
     def test_stationfilter(self):
         engine = pyaro.list_timeseries_engines()["csv_timeseries"]
@@ -225,6 +426,51 @@ class TestCSVTimeSeriesReader(unittest.TestCase):
             self.assertEqual(len(ts.stations()), 1)
             self.assertEqual(count, 104)
 
+    def test_within_radius_filter(self):
+        engine = pyaro.list_timeseries_engines()["csv_timeseries"]
+        # station1 is about 200km from Oslo, station2 more than 600km
+        sfilter = pyaro.timeseries.filters.get(
+            "within_radius", points=[(59.91, 10.75)], radius=300_000
+        )
+        with engine.open(self.file, filters=[sfilter]) as ts:
+            count = 0
+            for var in ts.variables():
+                count += len(ts.data(var))
+            self.assertEqual(list(ts.stations()), ["station1"])
+            self.assertEqual(count, 104)
+        sfilter = pyaro.timeseries.filters.get(
+            "within_radius", points=[(59.91, 10.75)], radius=300_000, exclude=True
+        )
+        with engine.open(self.file, filters=[sfilter]) as ts:
+            self.assertEqual(list(ts.stations()), ["station2"])
+        # without points, the filter keeps everything
+        with engine.open(self.file, filters={"within_radius": {}}) as ts:
+            self.assertEqual(list(ts.stations()), ["station1", "station2"])
+            self.assertEqual(len(ts.data("SOx")), 104)
+
+    def test_colocated_stations_filter(self):
+        engine = pyaro.list_timeseries_engines()["csv_timeseries"]
+        # station1 and station2 are about 550km apart
+        sfilter = pyaro.timeseries.filters.get(
+            "colocated_stations", distance=100_000, altitude=1000
+        )
+        with engine.open(self.file, filters=[sfilter]) as ts:
+            self.assertEqual(len(ts.stations()), 2)
+            self.assertEqual(len(ts.data("SOx")), 104)
+        sfilter = pyaro.timeseries.filters.get(
+            "colocated_stations", distance=1_000_000, altitude=1000
+        )
+        with engine.open(self.file, filters=[sfilter]) as ts:
+            self.assertEqual(list(ts.stations()), ["station1"])
+            data = ts.data("SOx")
+            self.assertEqual(len(data), 104)
+            self.assertEqual(set(data.stations), {"station1"})
+            self.assertTrue(np.all(data.longitudes == 8.0))
+            self.assertEqual(data.station_codes()[0].tolist(), ["station1"])
+            self.assertEqual(
+                len(ts.data_many(["SOx", "NOx"])["NOx"].stations), len(data)
+            )
+
     def test_timebounds_exception(self):
         with self.assertRaises(pyaro.timeseries.Filter.TimeBoundsException):
             pyaro.timeseries.filters.get(
@@ -344,6 +590,31 @@ class TestCSVTimeSeriesReader(unittest.TestCase):
             self.assertEqual(ts.data(newsox).variable, newsox)
         pass
 
+    def test_rename_flattening(self):
+        engine = pyaro.list_timeseries_engines()["csv_timeseries"]
+        vfilter = pyaro.timeseries.filters.get(
+            "variables", reader_to_new={"SOx": "sox1"}
+        )
+        with engine.open(self.file, filters=[vfilter]) as ts:
+            original = ts._unfiltered_data("SOx")
+            with VariableNameChangingReader(ts, {"sox1": "sox2"}) as renamed:
+                data = renamed.data("sox2")
+                self.assertIsInstance(data, NpStructuredData)
+                self.assertEqual(data.variable, "sox2")
+                self.assertIs(data.values.base, original.values.base)
+                self.assertTrue(np.array_equal(data.longitudes, original.longitudes))
+                part = data.slice(data.stations == "station1")
+                self.assertIsInstance(part, NpStructuredData)
+                self.assertEqual(part.variable, "sox2")
+
+        wrapped = VariableNameChangingReaderData(
+            VariableNameChangingReaderData(original, "sox1"), "sox2"
+        )
+        self.assertIs(wrapped._data, original)
+        self.assertTrue(np.array_equal(wrapped.longitudes, original.longitudes))
+        self.assertIs(wrapped.rename("SOx"), original)
+        self.assertIsInstance(wrapped.slice(slice(0, 5)), NpStructuredData)
+
     def test_duplicate_filter(self):
         engine = pyaro.list_timeseries_engines()["csv_timeseries"]
         with engine.open(
@@ -359,6 +630,74 @@ class TestCSVTimeSeriesReader(unittest.TestCase):
         ) as ts:
             self.assertEqual(len(ts.data("NOx")), 10)
 
+    def test_sort_data(self):
+        engine = pyaro.list_timeseries_engines()["csv_timeseries"]
+        file = self.multifile_dir + "/csvReader_testdata2.csv"
+        with engine.open(file, filters=[]) as ts:
+            unsorted = ts.data("NOx")
+        with engine.open(file, sort_data=True, filters=[]) as ts:
+            data = ts.data("NOx")
+            self.assertFalse(unsorted.is_sorted)
+            self.assertTrue(data.is_sorted)
+            order = np.lexsort((unsorted.start_times, unsorted.stations))
+            np.testing.assert_array_equal(data.values, unsorted.values[order])
+            self.assertIs(data.sorted(), data)
+            self.assertTrue(data.slice(data.values > 0).is_sorted)
+            self.assertTrue(data.slice(slice(1, None)).is_sorted)
+            self.assertFalse(data.slice(np.arange(len(data))[::-1]).is_sorted)
+            np.testing.assert_array_equal(data.station_index()[1], np.arange(len(data)))
+            # the duplicates fast path keeps the same rows, in sorted order
+            duplicates = pyaro.timeseries.filters.get("duplicates")
+            filtered = duplicates.filter_data(data, ts.stations(), ts.variables())
+            self.assertEqual(len(filtered), 8)
+            self.assertTrue(filtered.is_sorted)
+            expected = duplicates.filter_data(unsorted, ts.stations(), ts.variables())
+            keys = ["stations", "start_times", "end_times", "values"]
+            np.testing.assert_array_equal(
+                np.sort(filtered[keys]), np.sort(expected[keys])
+            )
+            self.assertTrue(data.aggregate("daily").is_sorted)
+        with engine.open(
+            file, sort_data=True, filters={"duplicates": {}, "flags": {}}
+        ) as ts:
+            self.assertEqual(len(ts.data("NOx")), 8)
+
+    def test_memory_report(self):
+        data = pyaro.timeseries.NpStructuredData("SOx", "Gg")
+        for i in range(11):
+            data.append(
+                float(i),
+                "station1",
+                58.0,
+                8.0,
+                0.0,
+                np.datetime64("2020-01-01"),
+                np.datetime64("2020-01-02"),
+            )
+        self.assertEqual(data.nbytes, 11 * data._data.dtype.itemsize)
+        # the over-allocated capacity is included, also in views
+        self.assertGreater(data.memory_usage(), data.nbytes)
+        self.assertEqual(len(data.values), 11)
+        self.assertGreater(data.memory_usage(), data.nbytes)
+        size = data.memory_usage()
+        data.station_codes()
+        self.assertGreater(data.memory_usage(), size)
+
+        engine = pyaro.list_timeseries_engines()["csv_timeseries"]
+        with engine.open(self.file, filters=[]) as ts:
+            report = ts.memory_report()
+            self.assertEqual(list(report["variables"]), list(ts.variables()))
+            for var, size in report["variables"].items():
+                self.assertGreaterEqual(size, ts.data(var).nbytes)
+            self.assertGreater(report["stations"], 0)
+            self.assertEqual(report["filter_cache"], 0)
+            self.assertEqual(
+                report["total"],
+                sum(report["variables"].values()) + report["stations"],
+            )
+            renamed = VariableNameChangingReader(ts, {"SOx": "oxidised_sulphur"})
+            self.assertIn("oxidised_sulphur", renamed.memory_report()["variables"])
+
     def test_time_resolution_filter(self):
         engine = pyaro.list_timeseries_engines()["csv_timeseries"]
         with self.assertRaises(FilterException):
@@ -405,6 +744,60 @@ class TestCSVTimeSeriesReader(unittest.TestCase):
             data2 = filters.filter(ts, "SOx")
             self.assertEqual(len(data1), 2 * len(data2))
 
+    def test_instrumentation(self):
+        measurements = []
+        was_tracing = tracemalloc.is_tracing()
+        with pyaro.open_timeseries(
+            "csv_timeseries",
+            self.file,
+            filters={
+                "stations": {"exclude": ["station1"]},
+                "flags": {"include": [pyaro.timeseries.Flag.VALID]},
+            },
+        ) as ts:
+            instrumentation = ts.enable_instrumentation(
+                callback=measurements.append, trace_memory=True
+            )
+            self.addCleanup(tracemalloc.stop)
+            ts.data("SOx")
+            ts.stations()
+            report = ts.instrumentation.report
+            self.assertEqual(len(report), 4)
+            self.assertEqual(report, measurements)
+            self.assertEqual(
+                [(m.filter, m.method) for m in report],
+                [
+                    ("stations", "filter_data"),
+                    ("flags", "filter_data"),
+                    ("stations", "filter_stations"),
+                    ("flags", "filter_stations"),
+                ],
+            )
+            self.assertEqual((report[0].rows_in, report[0].rows_out), (104, 52))
+            self.assertEqual((report[0].stations_in, report[0].stations_out), (2, 1))
+            self.assertEqual((report[1].stations_in, report[1].stations_out), (1, 1))
+            self.assertEqual(report[0].variable, "SOx")
+            self.assertIsNotNone(report[0].bytes_allocated)
+            self.assertEqual((report[2].stations_in, report[2].stations_out), (2, 1))
+            summary = instrumentation.summary()["stations"]
+            self.assertEqual(summary["rows_removed"], 52)
+            self.assertEqual(summary["stations_removed"], 1)
+
+            ts.disable_instrumentation()
+            self.assertEqual(tracemalloc.is_tracing(), was_tracing)
+            ts.data("SOx")
+            self.assertEqual(len(report), 4)
+
+            collection = pyaro.timeseries.FilterCollection(
+                {"stations": {"include": ["station1"]}},
+                instrumentation=instrumentation,
+            )
+            collection.filter(ts, "NOx")
+            self.assertEqual(report[-1].rows_out, 0)
+            self.assertEqual(report[-1].stations_out, 0)
+            instrumentation.close()
+            self.assertEqual(tracemalloc.is_tracing(), was_tracing)
+
     @unittest.skipUnless(has_pandas, "no pandas installed")
     def test_timeseries_data_to_pd(self):
         with pyaro.open_timeseries(
@@ -417,6 +810,37 @@ class TestCSVTimeSeriesReader(unittest.TestCase):
             self.assertEqual(len(df), len(data))
             self.assertEqual(len(df["values"]), len(data["values"]))
             self.assertEqual(df["values"][3], data["values"][3])
+            self.assertEqual(df["values"].dtype, data.values.dtype)
+            self.assertEqual(df["start_times"].dtype, data.start_times.dtype)
+
+            df = pyaro.timeseries_data_to_pd(data, categorical_stations=True)
+            self.assertIsInstance(df["stations"].dtype, pandas.CategoricalDtype)
+            self.assertEqual(list(df["stations"]), list(data.stations))
+
+            # copies by default, changing the dataframe doesn't change the data
+            df = pyaro.timeseries_data_to_pd(data)
+            self.assertFalse(np.shares_memory(df["values"].to_numpy(), data.values))
+            expected = np.array(data.values)
+            df["values"] *= 2
+            np.testing.assert_array_equal(ts.data(vars[0]).values, expected)
+            df = pyaro.timeseries_data_to_pd(data, copy=False)
+            self.assertTrue(np.shares_memory(df["values"].to_numpy(), data.values))
+
+    @unittest.skipUnless(has_pyarrow, "no pyarrow installed")
+    def test_timeseries_data_to_arrow(self):
+        with pyaro.open_timeseries(
+            "csv_timeseries", *[self.file], **{"filters": []}
+        ) as ts:
+            data = ts.data("SOx")
+            table = pyaro.timeseries_data_to_arrow(data)
+            self.assertEqual(table.num_rows, len(data))
+            self.assertEqual(table.column_names, list(data.keys()))
+            self.assertEqual(table.schema.metadata[b"variable"], b"SOx")
+            self.assertTrue(np.all(table.column("values").to_numpy() == data.values))
+            self.assertTrue(
+                np.all(table.column("start_times").to_numpy() == data.start_times)
+            )
+            self.assertEqual(table.column("stations").to_pylist(), list(data.stations))
 
     @unittest.skipUnless(has_geocode, "geocode-reverse-natural-earth not available")
     def test_country_lookup(self):
@@ -428,6 +852,37 @@ class TestCSVTimeSeriesReader(unittest.TestCase):
             data = ts.data(vars[0])
         self.assertTrue(False)
 
+    def test_country_lookup_cache(self):
+        calls = []
+
+        def lookup(lat, lon):
+            calls.append((lat, lon))
+            return "XX"
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache_file = os.path.join(tmpdir, "countries.json")
+            with pyaro.open_timeseries("csv_timeseries", self.file, filters=[]) as ts:
+                stations = ts.stations()
+                countries = CountryLookup(cache_file, lookup=lookup).lookup(
+                    [s.latitude for s in stations.values()],
+                    [s.longitude for s in stations.values()],
+                )
+            self.assertEqual(len(countries), len(stations))
+            coords = {(s.latitude, s.longitude) for s in stations.values()}
+            self.assertEqual(len(calls), len(coords))
+
+            # all coordinates cached, no geocoder needed
+            with pyaro.open_timeseries(
+                "csv_timeseries",
+                self.file,
+                filters={"countries": {"include": ["XX"]}},
+                country_lookup=True,
+                country_lookup_cache=cache_file,
+            ) as ts:
+                self.assertEqual(len(ts.stations()), len(stations))
+                self.assertEqual(ts.stations()["station1"].country, "XX")
+            self.assertEqual(len(calls), len(set(calls)))
+
     def test_altitude_filter_1(self):
         engines = pyaro.list_timeseries_engines()
         with engines["csv_timeseries"].open(
@@ -747,12 +1202,12 @@ class TestCSVTimeSeriesReader(unittest.TestCase):
     def test_valley_floor_filter_multi_use(self):
         engines = pyaro.list_timeseries_engines()
         filter = pyaro.timeseries.filters.get(
-                    "valleyfloor_relaltitude",
-                    topo="tests/testdata/datadir_elevation/gtopo30_subset.nc",
-                    radius=5000,
-                    lower=150,
-                    upper=250,
-                )
+            "valleyfloor_relaltitude",
+            topo="tests/testdata/datadir_elevation/gtopo30_subset.nc",
+            radius=5000,
+            lower=150,
+            upper=250,
+        )
         with engines["csv_timeseries"].open(
             filename=self.elevation_file,
             filters=[filter],
@@ -793,5 +1248,6 @@ class TestCSVTimeSeriesReader(unittest.TestCase):
         ) as ts:
             self.assertEqual(len(ts.stations()), 3)
 
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,174 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import pyaro
+from pyaro.npyreader import NpyTimeseriesEngine, write_timeseries
+from pyaro.npyreader.NpyTimeseriesReader import NpyTimeseriesException
+from pyaro.npyreader.export import main
+
+
+class TestNpyTimeseriesReader(unittest.TestCase):
+    file = os.path.join(
+        os.path.dirname(os.path.realpath(__file__)),
+        "testdata",
+        "datadir",
+        "csvReader_testdata.csv",
+    )
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.store = os.path.join(tmpdir.name, "store")
+        with pyaro.open_timeseries("csv_timeseries", self.file, filters=[]) as ts:
+            write_timeseries(ts, self.store)
+
+    def test_engine(self):
+        engine = pyaro.list_timeseries_engines()["npy_timeseries"]
+        self.assertIsInstance(engine, NpyTimeseriesEngine)
+        self.assertIn("mmap", engine.args())
+
+    def test_roundtrip(self):
+        with pyaro.open_timeseries("csv_timeseries", self.file, filters=[]) as csv_ts:
+            with pyaro.open_timeseries("npy_timeseries", self.store) as ts:
+                self.assertEqual(list(ts.variables()), list(csv_ts.variables()))
+                self.assertEqual(list(ts.stations()), list(csv_ts.stations()))
+                station = ts.stations()["station1"]
+                self.assertEqual(station.country, csv_ts.stations()["station1"].country)
+                self.assertEqual(
+                    station.latitude, csv_ts.stations()["station1"].latitude
+                )
+                for var in ts.variables():
+                    data = ts.data(var)
+                    expected = csv_ts.data(var)
+                    self.assertEqual(data.units, expected.units)
+                    for key in expected.keys():
+                        np.testing.assert_array_equal(data[key], expected[key])
+                self.assertIsInstance(ts.data("SOx")["values"], np.memmap)
+
+    def test_filters(self):
+        filters = {
+            "stations": {"exclude": ["station1"]},
+            "flags": {"include": [pyaro.timeseries.Flag.VALID]},
+            "time_bounds": {
+                "start_include": [("1997-01-11 00:00:00", "1997-02-01 00:00:00")]
+            },
+        }
+        with pyaro.open_timeseries(
+            "csv_timeseries", self.file, filters=filters
+        ) as csv_ts:
+            with pyaro.open_timeseries(
+                "npy_timeseries", self.store, filters=filters
+            ) as ts:
+                self.assertEqual(list(ts.stations()), list(csv_ts.stations()))
+                data = ts.data("SOx")
+                self.assertEqual(len(data), len(csv_ts.data("SOx")))
+                self.assertTrue(np.all(data.stations != "station1"))
+
+    def test_write_filtered(self):
+        with pyaro.open_timeseries(
+            "csv_timeseries", self.file, filters={"stations": {"include": ["station1"]}}
+        ) as csv_ts:
+            with self.assertRaises(NpyTimeseriesException):
+                write_timeseries(csv_ts, self.store)
+            write_timeseries(csv_ts, self.store, variables=["SOx"], overwrite=True)
+        with pyaro.open_timeseries("npy_timeseries", self.store, mmap=False) as ts:
+            self.assertEqual(list(ts.variables()), ["SOx"])
+            self.assertEqual(list(ts.stations()), ["station1"])
+            self.assertTrue(np.all(ts.data("SOx").stations == "station1"))
+        # the files of the overwritten store are removed
+        files = sorted(os.listdir(self.store))
+        self.assertEqual(len(files), 3)
+        self.assertTrue(files[0].startswith("data-"))
+        self.assertTrue(files[2].startswith("stations-"))
+
+    def test_append(self):
+        start_include = {
+            "time_bounds": {
+                "start_include": [
+                    ("1997-01-01 00:00:00", "1997-01-05 00:00:00"),
+                    ("1997-01-10 00:00:00", "1997-01-15 00:00:00"),
+                ]
+            }
+        }
+        # the old store contains only some of the first days and station1
+        with pyaro.open_timeseries(
+            "csv_timeseries",
+            self.file,
+            filters={**start_include, "stations": {"include": ["station1"]}},
+        ) as csv_ts:
+            write_timeseries(csv_ts, self.store, overwrite=True)
+        with pyaro.open_timeseries("npy_timeseries", self.store) as ts:
+            first = ts.data("SOx")
+            first_len = len(first)
+            first_values = np.array(first.values)
+
+        # the full history is appended, including late data of station1 and the
+        # earlier data of the new station2, without duplicating data
+        with pyaro.open_timeseries("csv_timeseries", self.file, filters=[]) as csv_ts:
+            write_timeseries(csv_ts, self.store, append=True)
+            with pyaro.open_timeseries("npy_timeseries", self.store) as ts:
+                self.assertEqual(list(ts.stations()), ["station1", "station2"])
+                data = ts.data("SOx")
+                expected = csv_ts.data("SOx")
+                self.assertEqual(len(data), len(expected))
+                np.testing.assert_array_equal(data.values[:first_len], first_values)
+                np.testing.assert_array_equal(
+                    data.sorted().values, expected.sorted().values
+                )
+                np.testing.assert_array_equal(
+                    data.sorted().start_times, expected.sorted().start_times
+                )
+            # appending again doesn't add data-files
+            files = os.listdir(self.store)
+            write_timeseries(csv_ts, self.store, append=True)
+            self.assertEqual(sorted(os.listdir(self.store)), sorted(files))
+
+    def test_sorted(self):
+        with pyaro.open_timeseries("csv_timeseries", self.file, filters=[]) as csv_ts:
+            write_timeseries(csv_ts, self.store, overwrite=True, sort=True)
+            with pyaro.open_timeseries("npy_timeseries", self.store) as ts:
+                data = ts.data("SOx")
+                self.assertTrue(data.is_sorted)
+                np.testing.assert_array_equal(
+                    data.values, csv_ts.data("SOx").sorted().values
+                )
+        # appended data is not sorted with the existing data
+        first_days = {
+            "time_bounds": {
+                "start_include": [("1997-01-01 00:00:00", "1997-01-15 00:00:00")]
+            }
+        }
+        with pyaro.open_timeseries(
+            "csv_timeseries", self.file, filters=first_days
+        ) as csv_ts:
+            write_timeseries(csv_ts, self.store, overwrite=True, sort=True)
+        with pyaro.open_timeseries("npy_timeseries", self.store) as ts:
+            self.assertTrue(ts.data("SOx").is_sorted)
+        with pyaro.open_timeseries("csv_timeseries", self.file, filters=[]) as csv_ts:
+            write_timeseries(csv_ts, self.store, append=True, sort=True)
+        with pyaro.open_timeseries("npy_timeseries", self.store) as ts:
+            self.assertFalse(ts.data("SOx").is_sorted)
+
+    def test_export_cli(self):
+        store = self.store + "_cli"
+        filters = json.dumps({"stations": {"include": ["station2"]}})
+        self.assertEqual(
+            main(["csv_timeseries", self.file, store, "--filters", filters]), 0
+        )
+        with self.assertRaises(NpyTimeseriesException):
+            main(["csv_timeseries", self.file, store])
+        main(["csv_timeseries", self.file, store, "--append"])
+        with pyaro.open_timeseries("npy_timeseries", store) as ts:
+            self.assertEqual(list(ts.stations()), ["station2", "station1"])
+
+    def test_not_a_store(self):
+        with self.assertRaises(NpyTimeseriesException):
+            pyaro.open_timeseries("npy_timeseries", os.path.dirname(self.file))
+
+
+if __name__ == "__main__":
+    unittest.main()
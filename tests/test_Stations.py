@@ -1,7 +1,10 @@
 import json
 import unittest
 
-from pyaro.timeseries.Station import Station
+import numpy as np
+
+from pyaro.timeseries import filters
+from pyaro.timeseries.Station import Station, StationTable, stations_memory_usage
 
 
 class TestStations(unittest.TestCase):
@@ -33,3 +36,131 @@ class TestStations(unittest.TestCase):
         station2 = Station(**station.init_kwargs())
         self.assertDictEqual(station._fields, station2._fields)
         self.assertDictEqual(station.metadata, station2.metadata)
+
+
+class TestStationTable(unittest.TestCase):
+    stations = {
+        f"stat{i}": Station(
+            {
+                "station": f"stat{i}",
+                "longitude": 10.0 * i,
+                "latitude": 60.0 - i,
+                "altitude": 100.0 * i,
+                "long_name": f"Station {i}",
+                "country": "NO" if i % 2 else "SE",
+                "url": "",
+            },
+            {"revision": str(i)},
+        )
+        for i in range(5)
+    }
+
+    def test_mapping(self):
+        table = StationTable(self.stations)
+        self.assertEqual(len(table), 5)
+        self.assertEqual(list(table.keys()), list(self.stations.keys()))
+        self.assertIn("stat3", table)
+        self.assertNotIn("stat7", table)
+        for name, station in table.items():
+            self.assertIsInstance(station, Station)
+            self.assertDictEqual(station._fields, self.stations[name]._fields)
+            self.assertEqual(station["revision"], self.stations[name]["revision"])
+            self.assertEqual(station.country, self.stations[name].country)
+            station2 = Station(**station.init_kwargs())
+            self.assertDictEqual(station2.metadata, station.metadata)
+
+    def test_columns(self):
+        table = StationTable(self.stations)
+        np.testing.assert_array_equal(table.altitudes, [0, 100, 200, 300, 400])
+        np.testing.assert_array_equal(table.countries[:2], ["SE", "NO"])
+        subset = table.take(table.altitudes > 150)
+        self.assertEqual(list(subset), ["stat2", "stat3", "stat4"])
+        self.assertEqual(subset["stat3"].latitude, 57.0)
+
+    def test_country_codes(self):
+        table = StationTable(self.stations)
+        np.testing.assert_array_equal(table.unique_countries, ["NO", "SE"])
+        np.testing.assert_array_equal(
+            table.unique_countries[table.country_codes], table.countries
+        )
+
+    def test_memory_usage(self):
+        table = StationTable(self.stations)
+        size = table.memory_usage()
+        columns = sum(table.column(key).nbytes for key in table._field_dtypes)
+        self.assertGreater(size, columns + table.names.nbytes)
+        self.assertEqual(stations_memory_usage(table), size)
+        # the cached index is included
+        table.index("stat1")
+        self.assertGreater(table.memory_usage(), size)
+        self.assertGreater(
+            stations_memory_usage(self.stations),
+            sum(station.memory_usage() for station in self.stations.values()),
+        )
+
+    def test_from_columns(self):
+        table = StationTable.from_columns(
+            ["a", "b"], [60.0, 61.0], [10.0, 11.0], [0.0, np.nan], country="NO"
+        )
+        self.assertEqual(table["b"].country, "NO")
+        self.assertEqual(table["b"].long_name, "b")
+        self.assertTrue(np.isnan(table["b"].altitude))
+        with self.assertRaises(Exception):
+            StationTable.from_columns(["a"], [91.0], [10.0], [0.0])
+
+    def test_filters(self):
+        table = StationTable(self.stations)
+        for name, kwargs in {
+            "countries": {"include": ["NO"]},
+            "stations": {"exclude": ["stat1", "stat4"]},
+            "altitude": {"min_altitude": 100, "max_altitude": 300},
+            "bounding_boxes": {"include": [(59.5, 25, 55, 5)]},
+        }.items():
+            filt = filters.get(name, **kwargs)
+            from_dict = filt.filter_stations(self.stations)
+            from_table = filt.filter_stations(table)
+            self.assertIsInstance(from_dict, dict)
+            self.assertIsInstance(from_table, StationTable)
+            self.assertEqual(list(from_dict.keys()), list(from_table.keys()), name)
+
+    def test_filters_long_names(self):
+        # include/exclude values longer than all names in the table must not match
+        table = StationTable(self.stations)
+        for name, kwargs, expected in [
+            ("stations", {"exclude": ["stat1_extra"]}, list(self.stations)),
+            ("stations", {"include": ["stat1_extra"]}, []),
+            ("stations", {"include": ["stat1_extra", "stat2"]}, ["stat2"]),
+            ("countries", {"include": ["NOR"]}, []),
+            ("countries", {"exclude": ["NOR"]}, list(self.stations)),
+        ]:
+            filt = filters.get(name, **kwargs)
+            self.assertEqual(list(filt.filter_stations(table)), expected, kwargs)
+            self.assertEqual(list(filt.filter_stations(self.stations)), expected)
+
+    def test_equality(self):
+        table = StationTable(self.stations)
+        self.assertEqual(table, table)
+        self.assertEqual(table, StationTable(self.stations))
+        self.assertEqual(table, self.stations)
+        self.assertEqual(dict(table), dict(table))
+        self.assertNotEqual(table, table.take([0, 1]))
+        changed = dict(self.stations)
+        changed["stat1"] = Station(
+            {**self.stations["stat1"]._fields, "altitude": 1.0}, {"revision": "1"}
+        )
+        self.assertNotEqual(table, StationTable(changed))
+        changed["stat1"] = Station(self.stations["stat1"]._fields, {"revision": "x"})
+        self.assertNotEqual(table, StationTable(changed))
+
+        row = table["stat1"]
+        self.assertEqual(row, table["stat1"])
+        self.assertEqual(row, self.stations["stat1"])
+        self.assertEqual(self.stations["stat1"], row)
+        self.assertNotEqual(row, table["stat2"])
+        with self.assertRaises(TypeError):
+            hash(row)
+
+        # unknown altitudes are equal
+        nan_table = StationTable.from_columns(["a"], [60.0], [10.0], [np.nan])
+        self.assertEqual(nan_table, StationTable(dict(nan_table)))
+        self.assertEqual(nan_table["a"], StationTable(dict(nan_table))["a"])
@@ -0,0 +1,111 @@
+import unittest
+
+import numpy as np
+
+from pyaro.timeseries import Flag, NpStructuredData
+from pyaro.timeseries.Aggregation import AggregationException
+
+try:
+    import pandas
+
+    has_pandas = True
+except ImportError:
+    has_pandas = False
+
+
+def hourly_data(stations=("a", "b"), hours=72):
+    data = NpStructuredData("SOx", "ug/m3")
+    start = np.datetime64("2020-01-30 00:00:00")
+    for i, station in enumerate(stations):
+        start_times = start + np.arange(hours).astype("timedelta64[h]")
+        values = np.arange(hours, dtype=np.float64) + 100 * i
+        data.append(
+            values,
+            np.full(hours, station),
+            np.full(hours, 60.0 + i),
+            np.full(hours, 10.0),
+            np.full(hours, 100.0),
+            start_times,
+            start_times + np.timedelta64(1, "h"),
+            np.full(hours, Flag.VALID),
+            np.full(hours, np.nan),
+        )
+    return data
+
+
+class TestAggregation(unittest.TestCase):
+    def test_aggregate_daily(self):
+        data = hourly_data()
+        daily = data.aggregate("daily")
+        self.assertEqual(len(daily), 6)
+        self.assertEqual(daily.variable, "SOx")
+        self.assertEqual(daily.units, "ug/m3")
+        np.testing.assert_array_equal(daily.stations, ["a"] * 3 + ["b"] * 3)
+        np.testing.assert_allclose(
+            daily.values, [11.5, 35.5, 59.5, 111.5, 135.5, 159.5]
+        )
+        np.testing.assert_array_equal(daily.latitudes, [60.0] * 3 + [61.0] * 3)
+        self.assertEqual(daily.start_times[1], np.datetime64("2020-01-31 00:00:00"))
+        self.assertEqual(daily.end_times[1], np.datetime64("2020-02-01 00:00:00"))
+        np.testing.assert_allclose(
+            daily.standard_deviations, np.std(np.arange(24), ddof=1)
+        )
+
+        np.testing.assert_array_equal(
+            data.aggregate("daily", "min").values[:3], [0, 24, 48]
+        )
+        np.testing.assert_array_equal(
+            data.aggregate("daily", "max").values[:3], [23, 47, 71]
+        )
+        np.testing.assert_array_equal(data.aggregate("daily", "count").values, 24)
+        np.testing.assert_allclose(
+            data.aggregate("daily", "std").values, np.std(np.arange(24), ddof=1)
+        )
+
+    def test_aggregate_monthly_coverage(self):
+        data = hourly_data(stations=("a",))
+        values = data["values"]
+        values[30:] = np.nan
+        # 30 valid hours on 2020-01-30 and 2020-01-31, none in february
+        monthly = data.aggregate("monthly", "count")
+        np.testing.assert_array_equal(monthly.values, [30])
+        self.assertEqual(monthly.start_times[0], np.datetime64("2020-01-01 00:00:00"))
+        self.assertEqual(monthly.end_times[0], np.datetime64("2020-02-01 00:00:00"))
+
+        daily = data.aggregate("daily", min_coverage=0.75)
+        np.testing.assert_array_equal(daily.start_times, [np.datetime64("2020-01-30")])
+        self.assertEqual(len(data.aggregate("daily", min_coverage=0.2)), 2)
+        self.assertEqual(len(data.aggregate("yearly", min_coverage=0.01)), 0)
+
+    def test_aggregate_empty_and_errors(self):
+        data = hourly_data(hours=0)
+        self.assertEqual(len(data.aggregate("yearly")), 0)
+        with self.assertRaises(AggregationException):
+            data.aggregate("weekly")
+        with self.assertRaises(AggregationException):
+            data.aggregate("daily", "median")
+
+    @unittest.skipUnless(has_pandas, "no pandas installed")
+    def test_aggregate_as_pandas(self):
+        rng = np.random.default_rng(1)
+        data = hourly_data(stations=("a", "b", "c"), hours=24 * 40)
+        values = data["values"]
+        values[:] = rng.normal(10, 3, len(values))
+        values[rng.random(len(values)) < 0.2] = np.nan
+        df = pandas.DataFrame(
+            {"stations": data.stations, "time": data.start_times, "values": data.values}
+        )
+        grouped = df.groupby(["stations", pandas.Grouper(key="time", freq="MS")])[
+            "values"
+        ]
+        for how in ("mean", "min", "max", "count", "std"):
+            monthly = data.aggregate("monthly", how)
+            expected = getattr(grouped, how)()
+            index = pandas.MultiIndex.from_arrays(
+                [monthly.stations, monthly.start_times]
+            )
+            np.testing.assert_allclose(monthly.values, expected[index].values)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import os
+import tempfile
+import unittest
+import unittest.mock
+
+import numpy as np
+
+import pyaro
+from pyaro.timeseries import Flag, filters
+from pyaro.timeseries.Filter import FilterCollection
+from pyaro.timeseries.FilterCache import FilterCache
+
+from synthetic_data import data_and_stations
+
+
+FILTERS = {
+    "countries": {"include": ["NO"]},
+    "flags": {"include": [Flag.VALID]},
+    "duplicates": {},
+}
+
+
+class TestFilterCache(unittest.TestCase):
+    file = os.path.join(
+        os.path.dirname(os.path.realpath(__file__)),
+        "testdata",
+        "datadir",
+        "csvReader_testdata.csv",
+    )
+
+    def test_cached_results_equal(self):
+        data, stations = data_and_stations()
+        expected = FilterCollection(FILTERS).filter_data(data, stations, ["NOx"])
+        cache = FilterCache()
+        collection = FilterCollection(FILTERS, cache=cache)
+        first = collection.filter_data(data, stations, ["NOx"])
+        self.assertEqual((cache.hits, cache.misses), (0, 3))
+        second = collection.filter_data(data, stations, ["NOx"])
+        self.assertEqual((cache.hits, cache.misses), (3, 3))
+        for result in (first, second):
+            self.assertTrue(np.all(result.values == expected.values))
+            self.assertTrue(np.all(result.stations == expected.stations))
+
+    def test_cache_key(self):
+        cache = FilterCache()
+        fp = "0"
+        key = cache.key(
+            filters.get("stations", include=["a", "b"]), "filter_stations", fp
+        )
+        self.assertEqual(
+            key,
+            cache.key(
+                filters.get("stations", include=["b", "a"]), "filter_stations", fp
+            ),
+        )
+        self.assertNotEqual(
+            key,
+            cache.key(filters.get("stations", include=["a"]), "filter_stations", fp),
+        )
+        self.assertNotEqual(
+            key,
+            cache.key(
+                filters.get("countries", include=["a", "b"]), "filter_stations", fp
+            ),
+        )
+
+    def test_fingerprint_changes_with_data(self):
+        data, stations = data_and_stations()
+        other, _ = data_and_stations(rows=4999)
+        cache = FilterCache()
+        self.assertEqual(cache.fingerprint(data), cache.fingerprint(data))
+        self.assertNotEqual(cache.fingerprint(data), cache.fingerprint(other))
+        self.assertEqual(
+            cache.fingerprint(stations), FilterCache().fingerprint(dict(stations))
+        )
+
+    def test_fingerprint_stations_dict(self):
+        _, stations = data_and_stations(nstations=3)
+        cache = FilterCache()
+        by_name = dict(stations)
+        fp = cache.fingerprint(by_name)
+        # same stations under other keys
+        renamed = {f"x{i}": station for i, station in enumerate(by_name.values())}
+        self.assertNotEqual(fp, cache.fingerprint(renamed))
+
+        # dicts are hashed only once
+        with unittest.mock.patch(
+            "pyaro.timeseries.FilterCache.StationTable.from_stations"
+        ) as from_stations:
+            self.assertEqual(cache.fingerprint(by_name), fp)
+            from_stations.assert_not_called()
+        by_name.pop("s0")
+        self.assertNotEqual(cache.fingerprint(by_name), fp)
+
+    def test_lru_bounds(self):
+        data, stations = data_and_stations()
+        cache = FilterCache(maxsize=2)
+        for country in ("NO", "SE", "DK"):
+            cache.filter_data(
+                filters.get("countries", include=[country]), data, stations, ["NOx"]
+            )
+        self.assertEqual(len(cache), 2)
+        cache = FilterCache(max_bytes=len(data))
+        fi = filters.get("flags", include=[Flag.VALID])
+        cache.filter_data(fi, data, stations, ["NOx"])
+        cache.filter_data(fi, data.slice(np.arange(10)), stations, ["NOx"])
+        self.assertEqual(len(cache), 1)
+        self.assertLessEqual(cache.nbytes, len(data))
+
+    def test_disk_cache(self):
+        data, stations = data_and_stations()
+        fi = filters.get("countries", include=["NO"])
+        with tempfile.TemporaryDirectory() as cache_dir:
+            filtered_stations = FilterCache(cache_dir=cache_dir).filter_stations(
+                fi, stations
+            )
+            expected = FilterCache(cache_dir=cache_dir).filter_data(
+                fi, data, stations, ["NOx"]
+            )
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+            cache = FilterCache(cache_dir=cache_dir)
+            self.assertEqual(
+                list(cache.filter_stations(fi, stations)), list(filtered_stations)
+            )
+            self.assertTrue(
+                np.all(
+                    cache.filter_data(fi, data, stations, ["NOx"]).values
+                    == expected.values
+                )
+            )
+            self.assertEqual((cache.hits, cache.misses), (2, 0))
+            cache.clear(disk=True)
+            self.assertEqual(len(os.listdir(cache_dir)), 0)
+
+    def test_reader_filter_cache(self):
+        with pyaro.open_timeseries(
+            "csv_timeseries",
+            self.file,
+            filters={"stations": {"exclude": ["station1"]}, "flags": {}},
+        ) as ts:
+            expected = ts.data("SOx")
+            cache = FilterCache()
+            ts.set_filter_cache(cache)
+            instrumentation = ts.enable_instrumentation()
+            for _ in range(2):
+                data = ts.data("SOx")
+                self.assertTrue(np.all(data.values == expected.values))
+            self.assertEqual(list(ts.stations()), list(ts.stations()))
+            # two filters, each hit in the second data and stations call
+            self.assertEqual(cache.hits, 4)
+            self.assertEqual(instrumentation.report[0].filter, "stations")
+
+
+if __name__ == "__main__":
+    unittest.main()
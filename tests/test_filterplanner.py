@@ -0,0 +1,62 @@
+import unittest
+
+import numpy as np
+
+from pyaro.timeseries import Flag, filters
+from pyaro.timeseries.Filter import FilterCollection
+from pyaro.timeseries.FilterPlanner import FilterPlanner
+from pyaro.timeseries.Instrumentation import FilterInstrumentation
+
+from synthetic_data import data_and_stations
+
+
+class TestFilterPlanner(unittest.TestCase):
+    def test_plan_order(self):
+        data, stations = data_and_stations()
+        filterlist = [
+            filters.get("duplicates"),
+            filters.get("flags", include=[Flag.VALID]),
+            filters.get("countries", include=["NO"]),
+        ]
+        planned = FilterPlanner(min_rows=0).plan(filterlist, data, stations, ["NOx"])
+        # countries is cheap and selective and commutes with duplicates, flags does not
+        self.assertEqual(
+            [f.name() for f in planned], ["countries", "duplicates", "flags"]
+        )
+
+    def test_variables_filter_fixed(self):
+        data, stations = data_and_stations()
+        filterlist = [
+            filters.get("flags", include=[Flag.VALID]),
+            filters.get("variables", reader_to_new={"NOx": "nox"}),
+            filters.get("countries", include=["NO"]),
+        ]
+        planned = FilterPlanner(min_rows=0).plan(filterlist, data, stations, ["NOx"])
+        self.assertEqual(
+            [f.name() for f in planned], ["flags", "variables", "countries"]
+        )
+
+    def test_planned_results_equal(self):
+        data, stations = data_and_stations()
+        filterlist = {
+            "duplicates": {},
+            "time_bounds": {
+                "startend_include": [("2020-01-01 00:00:00", "2020-01-03 00:00:00")]
+            },
+            "flags": {"include": [Flag.VALID]},
+            "countries": {"include": ["NO"]},
+        }
+        instrumentation = FilterInstrumentation()
+        unplanned = FilterCollection(filterlist).filter_data(data, stations, ["NOx"])
+        planned = FilterCollection(
+            filterlist,
+            instrumentation=instrumentation,
+            planner=FilterPlanner(min_rows=0),
+        ).filter_data(data, stations, ["NOx"])
+        self.assertEqual(instrumentation.report[0].filter, "countries")
+        self.assertEqual(len(planned), len(unplanned))
+        self.assertTrue(np.all(np.sort(planned.values) == np.sort(unplanned.values)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+
+class TestImports(unittest.TestCase):
+    heavy_modules = ["pandas", "pyarrow", "xarray", "cf_units", "netCDF4"]
+    file = os.path.join(
+        os.path.dirname(os.path.realpath(__file__)),
+        "testdata",
+        "datadir",
+        "csvReader_testdata.csv",
+    )
+
+    def loaded_modules(self, code: str) -> list[str]:
+        """run code in a fresh interpreter and return which heavy modules are loaded"""
+        code += f"\nimport json, sys\nprint(json.dumps([m for m in {self.heavy_modules!r} if m in sys.modules]))"
+        out = subprocess.run(
+            [sys.executable, "-c", code], check=True, capture_output=True, text=True
+        )
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+    def test_import_pyaro(self):
+        self.assertEqual(self.loaded_modules("import pyaro"), [])
+
+    def test_open_csv_timeseries(self):
+        code = f"""
+import pyaro
+with pyaro.open_timeseries("csv_timeseries", {self.file!r}, filters=[]) as ts:
+    ts.data("SOx")
+"""
+        self.assertEqual(self.loaded_modules(code), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+import unittest.mock
+
+import numpy as np
+
+import pyaro.mathutils
+from pyaro.mathutils import SpatialIndex, cluster_points, haversine
+from pyaro.timeseries import Station
+
+try:
+    import scipy
+
+    has_scipy = True
+except ImportError:
+    has_scipy = False
+
+
+def random_points(n, seed):
+    rng = np.random.default_rng(seed)
+    return rng.uniform(-90, 90, n), rng.uniform(-180, 180, n)
+
+
+class TestSpatialIndex(unittest.TestCase):
+    """SpatialIndex with a scipy cKDTree, see TestSpatialIndexBruteForce"""
+
+    def setUp(self):
+        if not has_scipy:
+            self.skipTest("no scipy installed")
+
+    def test_query(self):
+        lats, lons = random_points(1000, 1)
+        qlats, qlons = random_points(50, 2)
+        index = SpatialIndex(lats, lons)
+        expected = haversine(qlons[:, None], qlats[:, None], lons, lats)
+
+        distances, indices = index.query(qlats, qlons, k=3)
+        self.assertEqual(distances.shape, (50, 3))
+        np.testing.assert_array_equal(indices, np.argsort(expected, axis=1)[:, :3])
+        np.testing.assert_allclose(
+            distances, np.sort(expected, axis=1)[:, :3], rtol=1e-9
+        )
+
+        distances, indices = index.query(qlats, qlons)
+        self.assertEqual(distances.shape, (50,))
+        np.testing.assert_array_equal(indices, np.argmin(expected, axis=1))
+
+        # short distances and the date-line
+        distances, indices = index.query(lats[:3] + 1e-6, lons[:3])
+        np.testing.assert_array_equal(indices, [0, 1, 2])
+        np.testing.assert_allclose(distances, 0.111, rtol=1e-2)
+        index = SpatialIndex([0, 0], [179.999, 90])
+        distances, indices = index.query([0], [-179.999])
+        self.assertEqual(indices[0], 0)
+        np.testing.assert_allclose(distances[0], 222.6, rtol=1e-3)
+
+    def test_query_radius(self):
+        lats, lons = random_points(1000, 3)
+        qlats, qlons = random_points(50, 4)
+        index = SpatialIndex(lats, lons)
+        expected = haversine(qlons[:, None], qlats[:, None], lons, lats)
+        for idx, dists in zip(index.query_radius(qlats, qlons, 1e6), expected):
+            np.testing.assert_array_equal(idx, np.flatnonzero(dists <= 1e6))
+        np.testing.assert_array_equal(
+            index.within_radius(qlats, qlons, 1e6), expected.min(axis=0) <= 1e6
+        )
+
+    def test_empty(self):
+        index = SpatialIndex([], [])
+        distances, indices = index.query([10], [10], k=2)
+        self.assertTrue(np.all(np.isinf(distances)))
+        self.assertEqual(index.query_radius([10], [10], 1e3)[0].size, 0)
+        self.assertFalse(SpatialIndex([10], [10]).within_radius([], [], 1e3).any())
+
+
+class TestSpatialIndexBruteForce(TestSpatialIndex):
+    """SpatialIndex without scipy, also if scipy is installed"""
+
+    def setUp(self):
+        patcher = unittest.mock.patch.object(pyaro.mathutils, "_cKDTree", lambda: None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestMathUtils(unittest.TestCase):
+    def test_from_stations(self):
+        stations = {
+            name: Station(
+                {
+                    "station": name,
+                    "latitude": lat,
+                    "longitude": lon,
+                    "altitude": 0,
+                    "long_name": name,
+                    "country": "NO",
+                    "url": "",
+                }
+            )
+            for name, lat, lon in [("oslo", 59.91, 10.75), ("bergen", 60.39, 5.32)]
+        }
+        index = SpatialIndex.from_stations(stations)
+        self.assertEqual(len(index), 2)
+        distances, indices = index.query([60.3], [5.5])
+        self.assertEqual(index.names[indices[0]], "bergen")
+        self.assertLess(distances[0], 20_000)
+
+    def test_cluster_points(self):
+        rng = np.random.default_rng(5)
+        lats, lons = random_points(2000, 6)
+        # every fourth point gets a twin within a few meters
+        lats = np.concatenate([lats, lats[::4] + rng.normal(0, 2e-5, 500)])
+        lons = np.concatenate([lons, lons[::4]])
+        labels = cluster_points(lats, lons, 10)
+        expected = np.arange(len(lats))
+        twins = haversine(lons[:2000:4], lats[:2000:4], lons[2000:], lats[2000:]) <= 10
+        expected[2000:][twins] = np.arange(0, 2000, 4)[twins]
+        np.testing.assert_array_equal(labels, expected)
+
+        # transitive groups along a line, and altitude differences
+        labels = cluster_points([0, 0, 0, 0], [0, 0.00005, 0.0001, 1], 6)
+        np.testing.assert_array_equal(labels, [0, 0, 0, 3])
+        labels = cluster_points(
+            [0, 0, 0],
+            [0, 0, 0],
+            1,
+            altitudes=[0, 100, np.nan],
+            max_altitude_difference=10,
+        )
+        np.testing.assert_array_equal(labels, [0, 0, 0])
+        labels = cluster_points([0, 0], [0, 0], 1, [0, 100], max_altitude_difference=10)
+        np.testing.assert_array_equal(labels, [0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,143 @@
+import os
+import unittest
+
+import numpy as np
+
+import pyaro
+from pyaro.timeseries import MultiReader, NpStructuredData
+from pyaro.timeseries.MultiReader import MultiReaderException
+
+DATADIR = os.path.join(os.path.dirname(__file__), "testdata", "datadir")
+FILE1 = os.path.join(DATADIR, "csvReader_testdata.csv")
+FILE2 = os.path.join(DATADIR, "csvReader_testdata2.csv")
+
+
+def open_csv(file, filters=[]):
+    return pyaro.open_timeseries("csv_timeseries", file, filters=filters)
+
+
+def single(variable, units, station, lat):
+    data = NpStructuredData(variable, units)
+    data.append(
+        1.0,
+        station,
+        lat,
+        10.0,
+        100.0,
+        np.datetime64("2020-01-01"),
+        np.datetime64("2020-01-02"),
+    )
+    return data
+
+
+class SingleReader(pyaro.timeseries.Reader):
+    """reader of a single Data"""
+
+    def __init__(self, data, metadata):
+        self._data = data
+        self._metadata = metadata
+
+    def data(self, varname):
+        return self._data
+
+    def stations(self):
+        station = self._data.stations[0]
+        return {
+            station: pyaro.timeseries.Station(
+                {
+                    "station": station,
+                    "latitude": self._data.latitudes[0],
+                    "longitude": 10.0,
+                    "altitude": 100.0,
+                    "long_name": station,
+                    "country": "NO",
+                    "url": "",
+                }
+            )
+        }
+
+    def variables(self):
+        return [self._data.variable]
+
+    def metadata(self):
+        return self._metadata
+
+    def close(self):
+        pass
+
+
+class TestMultiReader(unittest.TestCase):
+    def test_multireader(self):
+        sources = [
+            ("csv_timeseries", FILE1),
+            ("csv_timeseries", FILE2, {"filters": []}),
+        ]
+        for kwargs in [{}, {"max_workers": 0}, {"max_workers": 2, "processes": True}]:
+            with self.subTest(**kwargs):
+                with open_csv(FILE1) as ts1, open_csv(FILE2) as ts2:
+                    with MultiReader(sources, **kwargs) as ts:
+                        self.assertEqual(ts.variables(), list(ts1.variables()))
+                        self.assertEqual(list(ts.stations()), list(ts1.stations()))
+                        for var in ts.variables():
+                            data = ts.data(var)
+                            parts = [
+                                x.data(var) for x in (ts1, ts2) if var in x.variables()
+                            ]
+                            self.assertEqual(data.variable, var)
+                            self.assertEqual(data.units, parts[0].units)
+                            self.assertEqual(
+                                len(data), sum(len(part) for part in parts)
+                            )
+                            for key in (
+                                "values",
+                                "stations",
+                                "start_times",
+                                "latitudes",
+                            ):
+                                expected = np.concatenate([part[key] for part in parts])
+                                self.assertTrue(np.array_equal(data[key], expected))
+
+    def test_multireader_filters(self):
+        filters = {"stations": {"include": ["station1"]}}
+        with open_csv(FILE1) as ts1, open_csv(FILE2) as ts2:
+            with MultiReader([ts1, ts2], filters=filters) as ts:
+                self.assertEqual(list(ts.stations()), ["station1"])
+                data = ts.data("NOx")
+                self.assertGreater(len(data), len(ts1.data("NOx")) / 2)
+                self.assertTrue(np.all(data.stations == "station1"))
+                expected = sum(
+                    np.count_nonzero(x.data("NOx").stations == "station1")
+                    for x in (ts1, ts2)
+                )
+                self.assertEqual(len(data), expected)
+                with self.assertRaises(MultiReaderException):
+                    ts.data("unknown")
+
+    def test_multireader_merge(self):
+        readers = [
+            SingleReader(single("SOx", "Gg", "a", 60.0), {"source": "1"}),
+            SingleReader(single("NOx", "Gg", "a", 61.0), {"source": "2", "x": "2"}),
+            SingleReader(single("SOx", "Gg", "b", 62.0), {}),
+        ]
+        with MultiReader(readers) as ts:
+            self.assertEqual(ts.variables(), ["SOx", "NOx"])
+            self.assertEqual(ts.metadata(), {"source": "1", "x": "2"})
+            stations = ts.stations()
+            self.assertEqual(list(stations), ["a", "b"])
+            self.assertEqual(stations["a"].latitude, 60.0)
+            unmerged = ts.memory_report()["variables"]["SOx"]
+            self.assertEqual(len(ts.data("SOx")), 2)
+            self.assertEqual(len(ts.data("NOx")), 1)
+            self.assertGreater(unmerged, 0)
+            self.assertGreater(ts.memory_report()["variables"]["SOx"], 0)
+
+        readers.append(SingleReader(single("NOx", "ppb", "c", 63.0), {}))
+        with MultiReader(readers, max_workers=0) as ts:
+            with self.assertRaises(MultiReaderException):
+                ts.data("NOx")
+        with self.assertRaises(MultiReaderException):
+            MultiReader(readers, processes=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import sys
+import unittest
+import unittest.mock
+import warnings
+
+if sys.version_info >= (3, 10):
+    from importlib.metadata import EntryPoint
+else:
+    from importlib_metadata import EntryPoint
+
+import pyaro
+from pyaro.plugins import build_timeseries_engines
+from pyaro.csvreader import CSVTimeseriesEngine
+
+
+class TestPlugins(unittest.TestCase):
+    group = "pyaro.timeseries"
+
+    def test_lazy_engines(self):
+        engines = build_timeseries_engines(
+            [
+                EntryPoint("csv", "pyaro.csvreader:CSVTimeseriesEngine", self.group),
+                EntryPoint("broken", "pyaro_not_installed_xyz:Engine", self.group),
+            ]
+        )
+        with unittest.mock.patch.object(
+            EntryPoint, "load", autospec=True, side_effect=EntryPoint.load
+        ) as load:
+            self.assertEqual(list(engines), ["csv", "broken"])
+            self.assertEqual(len(engines), 2)
+            self.assertIn("csv", engines)
+            load.assert_not_called()
+            self.assertNotIn("pyaro_not_installed_xyz", sys.modules)
+
+            self.assertIsInstance(engines["csv"], CSVTimeseriesEngine)
+            self.assertIs(engines["csv"], engines["csv"])
+            self.assertEqual(load.call_count, 1)
+            self.assertEqual(load.call_args.args[0].name, "csv")
+
+        with warnings.catch_warnings(record=True) as warns:
+            warnings.simplefilter("always")
+            self.assertIsNone(engines.get("broken"))
+            self.assertEqual(len(warns), 1)
+        self.assertNotIn("broken", engines)
+        self.assertEqual(list(engines), ["csv"])
+
+    def test_list_timeseries_engines(self):
+        engines = pyaro.list_timeseries_engines()
+        self.assertIn("csv_timeseries", engines)
+        self.assertIsInstance(engines["csv_timeseries"], CSVTimeseriesEngine)
+        self.assertIn("csv_timeseries", dict(engines))
+
+
+if __name__ == "__main__":
+    unittest.main()
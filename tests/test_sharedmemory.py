@@ -0,0 +1,92 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import pickle
+import unittest
+
+import numpy as np
+
+import pyaro
+from pyaro.timeseries import filters
+from pyaro.timeseries.SharedMemory import SharedData
+
+TEST_FILE = os.path.join(
+    os.path.dirname(__file__), "testdata", "datadir", "csvReader_testdata.csv"
+)
+
+
+def station_mean(descriptor):
+    with SharedData.attach(descriptor) as shared:
+        return shared.data.stations[0], float(np.mean(shared.data.values))
+
+
+def filter_in_worker(shared):
+    stations = shared.stations
+    data = filters.get("stations", include=["station1"]).filter_data(
+        shared.data, stations, []
+    )
+    result = SharedData.create(data, owner=False)
+    descriptor = result.descriptor
+    result.close()
+    return descriptor
+
+
+class TestSharedMemory(unittest.TestCase):
+    def setUp(self):
+        self.reader = pyaro.open_timeseries(
+            "csv_timeseries", TEST_FILE, filters=[], sort_data=True
+        )
+        self.addCleanup(self.reader.close)
+
+    def test_shared_data(self):
+        reader = self.reader
+        data = reader.data("SOx")
+        with data.share(reader.stations()) as shared:
+            attached = pickle.loads(pickle.dumps(shared))
+            self.assertLess(len(pickle.dumps(shared)), 1000)
+            for key in data.keys():
+                np.testing.assert_array_equal(attached.data[key], data[key])
+            self.assertEqual(attached.data.variable, "SOx")
+            self.assertEqual(attached.data.units, data.units)
+            self.assertTrue(attached.data.is_sorted)
+            with self.assertRaises(ValueError):
+                attached.data.values[0] = 1
+            stations = attached.stations
+            expected_station = reader.stations()["station2"]
+            self.assertEqual(list(stations), list(reader.stations()))
+            self.assertEqual(stations["station2"].latitude, expected_station.latitude)
+            self.assertEqual(stations["station2"].metadata, expected_station.metadata)
+
+            part = SharedData.attach(shared.descriptor.slice(slice(5, 10)))
+            np.testing.assert_array_equal(part.data.values, data.values[5:10])
+            part.close()
+            with self.assertRaises(ValueError):
+                part.data
+
+            # data still in use keeps the memory open after closing
+            values = attached.data.values
+            attached.close()
+        np.testing.assert_array_equal(values, data.values)
+        with self.assertRaises(FileNotFoundError):
+            SharedData.attach(shared.descriptor)
+
+    def test_shared_data_processes(self):
+        reader = self.reader
+        data = reader.data("SOx")
+        with SharedData.create(data, reader.stations()) as shared:
+            parts = [shared.descriptor.slice(x) for x in data.station_slices().values()]
+            with ProcessPoolExecutor(max_workers=2) as executor:
+                means = dict(executor.map(station_mean, parts))
+                descriptor = executor.submit(filter_in_worker, shared).result()
+        for station, rows in data.station_slices().items():
+            self.assertAlmostEqual(means[station], np.mean(data.values[rows]))
+
+        with SharedData.attach(descriptor, owner=True) as result:
+            expected = data.values[data.stations == "station1"]
+            np.testing.assert_array_equal(result.data.values, expected)
+            self.assertIsNone(result.stations)
+        with self.assertRaises(FileNotFoundError):
+            SharedData.attach(descriptor)
+
+
+if __name__ == "__main__":
+    unittest.main()
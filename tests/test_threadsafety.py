@@ -0,0 +1,198 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import contextlib
+import os
+import pickle
+import threading
+import time
+import unittest
+import unittest.mock
+
+import numpy as np
+
+import pyaro
+import pyaro.timeseries.Concurrency
+import pyaro.timeseries.Filter
+from pyaro.timeseries import filters
+from pyaro.timeseries.Concurrency import SingleFlight
+from pyaro.timeseries.FilterCache import FilterCache
+
+TEST_FILE = os.path.join(
+    os.path.dirname(__file__), "testdata", "datadir", "csvReader_testdata.csv"
+)
+THREADS = 16
+# maximum time to wait for other threads, only reached if a test fails
+TIMEOUT = 30
+
+
+def run_concurrently(func, calls: int = THREADS):
+    """call func from many threads at once, returning all results"""
+    barrier = threading.Barrier(calls)
+
+    def call(i):
+        barrier.wait()
+        return func(i)
+
+    with ThreadPoolExecutor(max_workers=calls) as executor:
+        return list(executor.map(call, range(calls)))
+
+
+@contextlib.contextmanager
+def followers_waiting(followers: int = THREADS - 1):
+    """event set once the given number of SingleFlight callers wait for the result
+    of a running evaluation, i.e. have entered SingleFlight.do after the leader"""
+    waiting = threading.Event()
+    lock = threading.Lock()
+    count = 0
+
+    class CountingFuture(Future):
+        def result(self, timeout=None):
+            nonlocal count
+            with lock:
+                count += 1
+                if count >= followers:
+                    waiting.set()
+            return super().result(timeout)
+
+    with unittest.mock.patch.object(
+        pyaro.timeseries.Concurrency, "Future", CountingFuture
+    ):
+        yield waiting
+
+
+def counter(func, wait_for: threading.Event | None = None, delay: float = 0.05):
+    """wrap func counting its calls, which wait for the event or the delay, so that
+    concurrent calls overlap"""
+    lock = threading.Lock()
+
+    def wrapper(*args, **kwargs):
+        with lock:
+            wrapper.calls += 1
+        if wait_for is None:
+            time.sleep(delay)
+        else:
+            wait_for.wait(TIMEOUT)
+        return func(*args, **kwargs)
+
+    wrapper.calls = 0
+    return wrapper
+
+
+def raised(func, *args):
+    try:
+        func(*args)
+    except Exception as ex:
+        return ex
+    return None
+
+
+class TestThreadSafety(unittest.TestCase):
+    def test_single_flight(self):
+        flight = SingleFlight()
+        with followers_waiting() as waiting:
+            func = counter(lambda x: [x], wait_for=waiting)
+            results = run_concurrently(lambda i: flight.do("key", func, 1))
+        self.assertEqual(func.calls, 1)
+        self.assertTrue(all(result is results[0] for result in results))
+
+        # a finished evaluation is not kept
+        self.assertEqual(flight.do("key", func, 2), [2])
+
+        with followers_waiting() as waiting:
+
+            def fail():
+                waiting.wait(TIMEOUT)
+                raise ValueError("failed")
+
+            errors = run_concurrently(lambda i: raised(flight.do, "key", fail))
+        self.assertTrue(all(isinstance(error, ValueError) for error in errors))
+
+    def test_lazy_filter_state(self):
+        # threads block on the lock, and find the index once the first call is done
+        spatial_index = counter(pyaro.timeseries.Filter.SpatialIndex)
+        with unittest.mock.patch.object(
+            pyaro.timeseries.Filter, "SpatialIndex", spatial_index
+        ):
+            filt = filters.get("within_radius", points=[(58.0, 8.0)], radius=1000)
+            indices = run_concurrently(lambda i: filt.index)
+        self.assertEqual(spatial_index.calls, 1)
+        self.assertTrue(all(index is indices[0] for index in indices))
+
+        # the lock is not pickled
+        copy = pickle.loads(pickle.dumps(filt))
+        self.assertNotIn("_lazy_lock", copy.__dict__)
+        self.assertEqual(len(copy.index), 1)
+
+    def test_filter_cache_single_flight(self):
+        cache = FilterCache()
+        filt = filters.get("stations", include=["station1"])
+        with pyaro.open_timeseries("csv_timeseries", TEST_FILE, filters=[]) as ts:
+            data = ts.data("SOx")
+            stations = ts.stations()
+            variables = ts.variables()
+            with followers_waiting() as waiting:
+                filter_data_idx = counter(filt.filter_data_idx, wait_for=waiting)
+                with unittest.mock.patch.object(
+                    filt, "filter_data_idx", filter_data_idx
+                ):
+                    results = run_concurrently(
+                        lambda i: cache.filter_data_idx(filt, data, stations, variables)
+                    )
+        self.assertEqual(filter_data_idx.calls, 1)
+        self.assertTrue(all(np.array_equal(result, results[0]) for result in results))
+        self.assertEqual(len(cache), 1)
+
+    def test_reader_stress(self):
+        reader_filters = {
+            "stations": {"include": ["station1", "station2"]},
+            "within_radius": {
+                "points": [(58.0, 8.0), (60.0, 10.0)],
+                "radius": 100000,
+            },
+            "duplicates": {},
+        }
+        with pyaro.open_timeseries(
+            "csv_timeseries", TEST_FILE, filters=reader_filters
+        ) as ts:
+            expected = {var: ts.data(var) for var in ts.variables()}
+            expected_stations = list(ts.stations())
+
+        with pyaro.open_timeseries(
+            "csv_timeseries", TEST_FILE, filters=reader_filters
+        ) as ts:
+            ts.set_filter_cache(FilterCache())
+            ts.set_thread_safe()
+            self.assertTrue(ts.thread_safe)
+            variables = list(ts.variables())
+
+            def request(i):
+                results = []
+                for j in range(20):
+                    var = variables[(i + j) % len(variables)]
+                    results.append((var, ts.data(var), list(ts.stations())))
+                return results
+
+            for results in run_concurrently(request):
+                for var, data, stations in results:
+                    self.assertEqual(stations, expected_stations)
+                    self.assertEqual(len(data), len(expected[var]))
+                    for key in ("values", "stations", "start_times"):
+                        self.assertTrue(np.array_equal(data[key], expected[var][key]))
+
+    def test_reader_data_single_flight(self):
+        with pyaro.open_timeseries("csv_timeseries", TEST_FILE, filters=[]) as ts:
+            ts.set_thread_safe()
+            with followers_waiting() as waiting:
+                filtered_data = counter(ts._filtered_data, wait_for=waiting)
+                with unittest.mock.patch.object(ts, "_filtered_data", filtered_data):
+                    results = run_concurrently(lambda i: ts.data("SOx"))
+                    self.assertEqual(filtered_data.calls, 1)
+                    self.assertTrue(all(result is results[0] for result in results))
+
+                    ts.set_thread_safe(False)
+                    self.assertFalse(ts.thread_safe)
+                    run_concurrently(lambda i: ts.data("SOx"), calls=4)
+                    self.assertEqual(filtered_data.calls, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()